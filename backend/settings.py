@@ -85,6 +85,90 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Accusés de lecture/réception: regroupés en mémoire puis écrits en masse
+RECEIPTS_FLUSH_INTERVAL = 1.0  # secondes
+RECEIPTS_MAX_PENDING = 500  # flush immédiat au-delà
+
+# Présence en ligne (cache avec expiration, alimenté par les heartbeats WebSocket)
+PRESENCE_TTL = 60  # secondes sans heartbeat avant passage hors ligne
+PRESENCE_LOCAL_CACHE_TTL = 5  # cache local par processus des lectures
+
+# Indicateurs de frappe (en mémoire, jamais en base)
+TYPING_THROTTLE = 2.0  # au plus une diffusion par utilisateur et par intervalle
+TYPING_TIMEOUT = 6.0  # arrêt automatique sans nouvelle trame
+
+# Appels (signalisation WebSocket, état en mémoire jusqu'à la fin de l'appel)
+CALL_RING_TIMEOUT = 30  # secondes de sonnerie avant appel manqué
+
+# Modération automatique des messages (file en mémoire, analyse par lots en arrière-plan)
+MODERATION_WORKERS = 2  # threads d'analyse par processus
+MODERATION_BATCH_SIZE = 100  # messages par lot
+MODERATION_BATCH_WAIT = 0.5  # secondes d'attente max pour compléter un lot
+
+# Distribution des notifications (core.notifications)
+# 'local': file en mémoire du processus (développement, tests)
+# 'database': file durable NotificationIntent, vidée par "manage.py process_notifications"
+NOTIFICATION_QUEUE_BACKEND = os.environ.get('NOTIFICATION_QUEUE_BACKEND', 'local')
+NOTIFICATION_BATCH_SIZE = 500  # destinataires par bulk_create
+NOTIFICATION_MAX_ATTEMPTS = 5  # file durable: essais avant abandon
+NOTIFICATION_COLLAPSE_WINDOW = 24 * 3600  # likes/commentaires d'un même post regroupés (secondes)
+
+# Résumés email quotidiens/hebdomadaires (core.digests, "manage.py send_digests")
+DIGEST_BATCH_SIZE = 200  # destinataires par lot
+DIGEST_WORKERS = 4  # threads d'envoi, une connexion SMTP chacun
+
+# Rappels automatisés des baux (core.leases, "manage.py process_reminders")
+REMINDER_BATCH_SIZE = 100  # rappels réservés par lot
+REMINDER_CLAIM_TIMEOUT = 300  # rappel réservé par un worker arrêté: repris après (secondes)
+REMINDER_MAX_ATTEMPTS = 5  # essais avant abandon
+# Envoi des SMS: chemin d'une fonction send(numero, texte), ex. 'myapp.sms.send'.
+# Sans backend, le canal SMS est ignoré (compté dans les statistiques).
+SMS_BACKEND = os.environ.get('SMS_BACKEND', '')
+
+# Quittances et documents des baux (core.documents, "manage.py generate_quittances")
+QUITTANCE_WORKERS = 0  # processus de rendu (0: dans le processus courant)
+QUITTANCE_CHUNK_SIZE = 200  # quittances lues, rendues et écrites par lot
+
+# Caches
+# Un alias par sous-système, instrumentés (succès/échecs, latence: page admin des caches).
+# REDIS_URL (ex: redis://localhost:6379/1) active un cache partagé entre processus;
+# sans lui, chaque processus a son propre cache local (développement).
+# CACHE_KEY_VERSION: incrémenter pour invalider toutes les clés après un changement
+# de format des valeurs (les anciennes clés expirent d'elles-mêmes).
+REDIS_URL = os.environ.get('REDIS_URL', '').strip()
+CACHE_KEY_VERSION = int(os.environ.get('CACHE_KEY_VERSION', '1'))
+
+
+def cache_config(prefix, timeout=300, shared=True):
+    """Configuration d'un alias: Redis si disponible et partagé, cache local sinon"""
+    if REDIS_URL and shared:
+        backend = {'BACKEND': 'core.cache_metrics.RedisCache', 'LOCATION': REDIS_URL}
+    else:
+        backend = {'BACKEND': 'core.cache_metrics.LocMemCache', 'LOCATION': prefix}
+    return {**backend, 'KEY_PREFIX': prefix, 'VERSION': CACHE_KEY_VERSION, 'TIMEOUT': timeout}
+
+
+CACHES = {
+    'default': cache_config('default'),
+    'sessions': cache_config('sessions', timeout=1209600),  # = SESSION_COOKIE_AGE
+    'ratelimit': cache_config('ratelimit', timeout=3600),
+    'counters': cache_config('counters', timeout=600),  # présence, compteurs des propriétaires
+}
+
+# Sessions lues dans le cache "sessions", écrites aussi en base (survivent à un vidage)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Présence en ligne: cache des compteurs
+PRESENCE_CACHE = 'counters'
+
+# Chiffres de l'en-tête "Gérer mes locations" (core.portfolio)
+OWNER_SUMMARY_CACHE = 'counters'
+OWNER_SUMMARY_TIMEOUT = 60  # secondes
+
+# Limitation de débit (fenêtre glissante, incréments atomiques)
+RATE_LIMIT_CACHE = 'ratelimit'
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -194,6 +278,25 @@ AUTH_USER_MODEL = 'core.CustomUser'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Pièces jointes des messages (téléversement fractionné et reprenable)
+MESSAGE_ATTACHMENT_MAX_SIZE = 100 * 1024 * 1024  # 100 Mo
+MESSAGE_UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024  # 8 Mo par morceau
+MESSAGE_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'uploads' / 'partial'
+
+# Archivage froid des messages (segments compressés par conversation)
+MESSAGE_ARCHIVE_AFTER_MONTHS = 12  # ancienneté avant sortie de la table Message
+MESSAGE_ARCHIVE_SEGMENT_SIZE = 5000  # messages par segment
+
+# Rétention des historiques (core.retention, "manage.py prune_retention")
+# Surcharges par politique, ex. {'notifications': {'max_age_days': 90}}
+RETENTION_POLICIES = {}
+RETENTION_BATCH_SIZE = 1000  # lignes visées par tranche d'identifiants
+RETENTION_SLEEP = 0.1  # pause entre deux tranches (secondes)
+
+# Métriques quotidiennes des statistiques admin (core.metrics, "manage.py rollup_metrics"
+# chaque nuit; "--backfill" à la mise en place)
+METRICS_RECOMPUTE_DAYS = 3  # derniers jours terminés recalculés chaque nuit
+
 # Email configuration (développement)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@transpareo.com'
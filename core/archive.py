@@ -0,0 +1,353 @@
+"""
+Archivage froid des messages anciens
+Les messages plus vieux que MESSAGE_ARCHIVE_AFTER_MONTHS sortent de la table
+Message vers des segments compressés par conversation (lignes JSON, zstd si
+disponible, gzip sinon) enregistrés sur le stockage de fichiers. La table chaude
+et ses index ne contiennent plus que l'historique récent ; api_get_messages et la
+recherche relisent les segments quand un curseur dépasse la fenêtre chaude.
+"""
+import gzip
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (
+    Conversation, ConversationStatus, CustomUser, Message, MessageArchive,
+    MessageAttachment,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Ancienneté (mois) à partir de laquelle un message est archivé
+MESSAGE_ARCHIVE_AFTER_MONTHS = getattr(settings, 'MESSAGE_ARCHIVE_AFTER_MONTHS', 12)
+
+# Nombre maximal de messages par segment d'archive
+MESSAGE_ARCHIVE_SEGMENT_SIZE = getattr(settings, 'MESSAGE_ARCHIVE_SEGMENT_SIZE', 5000)
+
+# Segments décompressés gardés en mémoire par processus
+MESSAGE_ARCHIVE_CACHE_SEGMENTS = getattr(settings, 'MESSAGE_ARCHIVE_CACHE_SEGMENTS', 32)
+
+ARCHIVE_CODEC = 'zstd' if zstandard else 'gzip'
+
+# Champs scalaires recopiés tels quels dans l'archive
+ARCHIVED_FIELDS = [
+    'id', 'sender_id', 'content', 'read', 'delivered', 'document_name',
+    'audio_duration', 'shared_logement_id', 'shared_document_id', 'call_id',
+    'is_spam', 'is_fraud', 'is_inappropriate', 'is_suspicious', 'security_score',
+    'reaction_counts',
+]
+ARCHIVED_DATES = ['created_at', 'read_at', 'delivered_at']
+ARCHIVED_FILES = ['image', 'document', 'audio']
+
+
+# ============================================
+# COMPRESSION
+# ============================================
+
+def compress(data, codec=ARCHIVE_CODEC):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Archive zstd illisible: installez le paquet zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# ============================================
+# FORMAT DES LIGNES
+# ============================================
+
+def message_to_line(message):
+    """Ligne JSON d'un message (réactions et pièces jointes préchargées)"""
+    line = {field: getattr(message, field) for field in ARCHIVED_FIELDS}
+    for field in ARCHIVED_DATES:
+        value = getattr(message, field)
+        line[field] = value.isoformat() if value else None
+    for field in ARCHIVED_FILES:
+        line[field] = getattr(message, field).name or None
+    line['reactions'] = [[r.user_id, r.emoji] for r in message.reactions.all()]
+    line['attachments'] = [
+        {
+            'id': a.id,
+            'kind': a.kind,
+            'file': a.file.name,
+            'original_name': a.original_name,
+            'content_type': a.content_type,
+            'size': a.size,
+            'checksum': a.checksum,
+            'position': a.position,
+        }
+        for a in message.attachments.all()
+    ]
+    return json.dumps(line, ensure_ascii=False, separators=(',', ':'))
+
+
+def line_to_message(line, conversation_id):
+    """
+    Message (non enregistré) reconstruit depuis une ligne d'archive.
+
+    Porte en plus:
+        - archived_attachments: MessageAttachment non enregistrées
+        - archived_reactions: [(user_id, emoji)]
+    """
+    values = {field: line.get(field) for field in ARCHIVED_FIELDS}
+    for field in ARCHIVED_DATES:
+        values[field] = datetime.fromisoformat(line[field]) if line.get(field) else None
+    for field in ARCHIVED_FILES:
+        values[field] = line.get(field)
+    values['reaction_counts'] = values['reaction_counts'] or {}
+
+    message = Message(conversation_id=conversation_id, **values)
+    message.is_archived = True
+    message.archived_attachments = [MessageAttachment(**a) for a in line.get('attachments', [])]
+    message.archived_reactions = [tuple(r) for r in line.get('reactions', [])]
+    return message
+
+
+# ============================================
+# ÉCRITURE
+# ============================================
+
+def archive_cutoff(months=None):
+    """Date limite: les messages antérieurs sont archivables"""
+    months = MESSAGE_ARCHIVE_AFTER_MONTHS if months is None else months
+    return timezone.now() - timedelta(days=30 * months)
+
+
+def archivable_messages(conversation, cutoff):
+    """
+    Messages archivables d'une conversation, du plus ancien au plus récent.
+
+    Restent dans la table chaude: messages épinglés, en quarantaine ou signalés,
+    messages avec mentions (MessageMention, interrogées par utilisateur mentionné
+    et absentes des segments), dernier message de la conversation et repères de
+    lecture/délivrance.
+    """
+    protected = {conversation.last_message_id}
+    for read_id, delivered_id in ConversationStatus.objects.filter(
+        conversation=conversation
+    ).values_list('last_read_message_id', 'last_delivered_message_id'):
+        protected.update((read_id, delivered_id))
+    protected.discard(None)
+
+    return Message.objects.filter(
+        conversation=conversation,
+        created_at__lt=cutoff,
+        is_pinned=False,
+        is_quarantined=False,
+    ).exclude(
+        id__in=protected
+    ).exclude(
+        signalements__isnull=False
+    ).exclude(
+        mentions__isnull=False
+    ).order_by('created_at', 'id')
+
+
+def write_segment(conversation, messages):
+    """Écrit un segment d'archive puis supprime les messages de la table chaude"""
+    lines = [message_to_line(message) for message in messages]
+    data = compress(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    archive = MessageArchive(
+        conversation=conversation,
+        codec=ARCHIVE_CODEC,
+        message_count=len(messages),
+        first_message_id=min(m.id for m in messages),
+        last_message_id=max(m.id for m in messages),
+        first_created_at=messages[0].created_at,
+        last_created_at=messages[-1].created_at,
+        size=len(data),
+    )
+    extension = 'zst' if ARCHIVE_CODEC == 'zstd' else 'gz'
+    archive.file.save(
+        f'conversation_{conversation.id}_{archive.first_message_id}.jsonl.{extension}',
+        ContentFile(data),
+        save=False,
+    )
+    try:
+        with transaction.atomic():
+            archive.save()
+            Message.objects.filter(id__in=[m.id for m in messages]).delete()
+    except Exception:
+        archive.file.delete(save=False)
+        raise
+    return archive
+
+
+def archive_conversation(conversation, cutoff=None, segment_size=None):
+    """
+    Archive les messages anciens d'une conversation.
+
+    Returns:
+        int: nombre de messages archivés
+    """
+    cutoff = cutoff or archive_cutoff()
+    segment_size = segment_size or MESSAGE_ARCHIVE_SEGMENT_SIZE
+    archived = 0
+    while True:
+        segment = list(
+            archivable_messages(conversation, cutoff).prefetch_related(
+                'reactions', 'attachments'
+            )[:segment_size]
+        )
+        if not segment:
+            break
+        write_segment(conversation, segment)
+        archived += len(segment)
+        if len(segment) < segment_size:
+            break
+    return archived
+
+
+def archive_old_messages(months=None, segment_size=None):
+    """
+    Archive les messages anciens de toutes les conversations.
+
+    Returns:
+        dict: {'conversations', 'messages'}
+    """
+    cutoff = archive_cutoff(months)
+    conversation_ids = Message.objects.filter(
+        created_at__lt=cutoff
+    ).order_by().values_list('conversation_id', flat=True).distinct()
+
+    stats = {'conversations': 0, 'messages': 0}
+    for conversation in Conversation.objects.filter(id__in=list(conversation_ids)).iterator():
+        count = archive_conversation(conversation, cutoff, segment_size)
+        if count:
+            stats['conversations'] += 1
+            stats['messages'] += count
+    return stats
+
+
+# ============================================
+# LECTURE
+# ============================================
+
+_segment_cache = OrderedDict()
+
+
+def load_segment(archive):
+    """Lignes d'un segment, triées par (created_at, id); cache LRU par processus"""
+    lines = _segment_cache.get(archive.id)
+    if lines is not None:
+        _segment_cache.move_to_end(archive.id)
+        return lines
+
+    with archive.file.open('rb') as f:
+        data = decompress(f.read(), archive.codec)
+    lines = [json.loads(raw) for raw in data.decode('utf-8').splitlines() if raw]
+    for line in lines:
+        line['_key'] = (datetime.fromisoformat(line['created_at']), line['id'])
+
+    _segment_cache[archive.id] = lines
+    while len(_segment_cache) > MESSAGE_ARCHIVE_CACHE_SEGMENTS:
+        _segment_cache.popitem(last=False)
+    return lines
+
+
+def attach_senders(messages):
+    """Charge les expéditeurs actifs (une requête) et écarte les autres messages"""
+    senders = CustomUser.objects.filter(
+        id__in={m.sender_id for m in messages}, is_active=True
+    ).in_bulk()
+    kept = []
+    for message in messages:
+        sender = senders.get(message.sender_id)
+        if sender is not None:
+            message.sender = sender
+            kept.append(message)
+    return kept
+
+
+def messages_before(conversation_id, anchor, count):
+    """
+    Messages archivés antérieurs au curseur (created_at, id), du plus ancien au
+    plus récent; au plus count messages d'expéditeurs actifs.
+    """
+    archives = MessageArchive.objects.filter(conversation_id=conversation_id)
+    if anchor:
+        archives = archives.filter(first_created_at__lte=anchor[0])
+
+    found = []
+    for archive in archives.order_by('-last_created_at'):
+        lines = [line for line in load_segment(archive) if not anchor or line['_key'] < anchor]
+        found = attach_senders([line_to_message(line, conversation_id) for line in lines]) + found
+        if len(found) >= count:
+            break
+    found.sort(key=lambda m: (m.created_at, m.id))
+    return found[-count:] if count else []
+
+
+def messages_after(conversation_id, anchor, count, inclusive=False):
+    """Messages archivés postérieurs au curseur, du plus ancien au plus récent"""
+    archives = MessageArchive.objects.filter(
+        conversation_id=conversation_id, last_created_at__gte=anchor[0]
+    ).order_by('last_created_at')
+
+    found = []
+    for archive in archives:
+        lines = [
+            line for line in load_segment(archive)
+            if line['_key'] > anchor or (inclusive and line['_key'] == anchor)
+        ]
+        found += attach_senders([line_to_message(line, conversation_id) for line in lines])
+        if len(found) >= count:
+            break
+    found.sort(key=lambda m: (m.created_at, m.id))
+    return found[:count]
+
+
+def find_archived(conversation_id, message_ids):
+    """Messages archivés d'une conversation par identifiant: {id: Message}"""
+    message_ids = set(message_ids)
+    if not message_ids:
+        return {}
+    archives = MessageArchive.objects.filter(
+        conversation_id=conversation_id,
+        first_message_id__lte=max(message_ids),
+        last_message_id__gte=min(message_ids),
+    )
+    found = {}
+    for archive in archives:
+        for line in load_segment(archive):
+            if line['id'] in message_ids:
+                found[line['id']] = line_to_message(line, conversation_id)
+    return {m.id: m for m in attach_senders(list(found.values()))}
+
+
+def archived_anchor(conversation_id, message_id):
+    """Curseur (created_at, id) d'un message archivé, ou None"""
+    archives = MessageArchive.objects.filter(
+        conversation_id=conversation_id,
+        first_message_id__lte=message_id,
+        last_message_id__gte=message_id,
+    )
+    for archive in archives:
+        for line in load_segment(archive):
+            if line['id'] == message_id:
+                return line['_key']
+    return None
+
+
+def latest_archived_at(conversation_id):
+    """Date du message archivé le plus récent de la conversation (None sans archive)"""
+    return MessageArchive.objects.filter(
+        conversation_id=conversation_id
+    ).aggregate(latest=Max('last_created_at'))['latest']
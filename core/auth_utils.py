@@ -14,8 +14,7 @@ from django.conf import settings
 from django.core.mail import send_mail
 from .models import (
     CustomUser, MagicLinkToken, TwoFactorBackupCode, 
-    Badge, UserBadge, UserNotification, SecurityAlert,
-    Bail, PaiementLoyer
+    Badge, UserBadge, UserNotification, SecurityAlert
 )
 
 
@@ -196,20 +195,16 @@ def create_notification(
     related_group=None,
     related_logement=None
 ):
-    """Crée une notification pour l'utilisateur avec tous les champs"""
-    # Vérifier les paramètres de notifications de l'utilisateur
-    notification_settings = user.notification_settings or {}
-    in_app_key = f'{notification_type}_in_app'
-    
-    # Vérifier si les notifications in-app sont activées (par défaut True)
-    if not notification_settings.get(in_app_key, True):
-        return None
-    
-    notification = UserNotification.objects.create(
-        user=user,
-        notification_type=notification_type,
-        title=title,
-        message=message,
+    """
+    Planifie une notification pour l'utilisateur (distribuée en arrière-plan par
+    core.notifications, selon ses préférences: in-app, WebSocket, email immédiat).
+    """
+    from .notifications import notify
+    return notify(
+        notification_type,
+        title,
+        message,
+        recipients=[user],
         icon=icon,
         action_url=action_url,
         from_user=from_user,
@@ -217,96 +212,14 @@ def create_notification(
         related_comment=related_comment,
         related_conversation=related_conversation,
         related_group=related_group,
-        related_logement=related_logement
+        related_logement=related_logement,
     )
-    
-    # Envoyer une notification push si activée
-    push_key = f'{notification_type}_push'
-    if notification_settings.get(push_key, True) and user.message_push_notifications:
-        # TODO: Implémenter l'envoi de notification push navigateur
-        pass
-    
-    # Envoyer un email si activé
-    email_key = f'{notification_type}_email'
-    if notification_settings.get(email_key, True) and user.message_email_notifications:
-        # Vérifier la fréquence des emails
-        if user.notification_email_frequency == 'immediate':
-            # TODO: Envoyer email immédiatement (implémenter avec Celery pour ne pas bloquer)
-            pass
-        # Pour daily et weekly, utiliser un système de résumé (à implémenter avec Celery)
-    
-    return notification
 
 
-def check_lease_notifications():
-    """Vérifie et envoie les notifications automatiques pour les baux"""
-    today = timezone.now().date()
-    
-    # Récupérer tous les baux actifs
-    baux_actifs = Bail.objects.filter(statut='actif')
-    
-    for bail in baux_actifs:
-        # 1. Notification loyer à payer (3 jours avant échéance)
-        prochain_paiement_date = bail.get_prochain_paiement()
-        jours_avant_echeance = (prochain_paiement_date - today).days
-        
-        if jours_avant_echeance == 3:
-            # Vérifier si le paiement existe et n'est pas encore payé
-            paiement = PaiementLoyer.objects.filter(
-                bail=bail,
-                date_echeance=prochain_paiement_date,
-                statut__in=['en_attente', 'en_retard']
-            ).first()
-            
-            if paiement:
-                create_notification(
-                    user=bail.locataire,
-                    notification_type='system',
-                    title='Rappel: Loyer à payer',
-                    message=f"Votre loyer de {bail.get_montant_total_mensuel()}€ est à payer dans 3 jours (le {prochain_paiement_date.strftime('%d/%m/%Y')})",
-                    icon='💰',
-                    action_url=f'/connect/lease/?tab=payments',
-                    related_logement=bail.logement
-                )
-        
-        # 2. Notification assurance habitation à renouveler (1 mois avant)
-        if bail.assurance_date_echeance:
-            jours_avant_echeance_assurance = (bail.assurance_date_echeance - today).days
-            
-            if jours_avant_echeance_assurance == 30:
-                create_notification(
-                    user=bail.locataire,
-                    notification_type='system',
-                    title='Rappel: Assurance habitation à renouveler',
-                    message=f"Votre assurance habitation expire dans 1 mois (le {bail.assurance_date_echeance.strftime('%d/%m/%Y')}). Pensez à la renouveler.",
-                    icon='🛡️',
-                    action_url=f'/connect/lease/?tab=contract',
-                    related_logement=bail.logement
-                )
-        
-        # 3. Notification fin de bail approchante (3 mois avant)
-        if bail.date_fin:
-            jours_avant_fin = (bail.date_fin - today).days
-            
-            if jours_avant_fin == 90:
-                create_notification(
-                    user=bail.locataire,
-                    notification_type='system',
-                    title='Rappel: Fin de bail dans 3 mois',
-                    message=f"Votre bail se termine dans 3 mois (le {bail.date_fin.strftime('%d/%m/%Y')}). Pensez à organiser votre départ si vous souhaitez quitter.",
-                    icon='📅',
-                    action_url=f'/connect/lease/?tab=termination',
-                    related_logement=bail.logement
-                )
-            
-            # 4. Notification fin de bail approchante (1 mois avant)
-            elif jours_avant_fin == 30:
-                create_notification(
-                    user=bail.locataire,
-                    notification_type='system',
-                    title='Rappel: Fin de bail dans 1 mois',
-                    message=f"Votre bail se termine dans 1 mois (le {bail.date_fin.strftime('%d/%m/%Y')}). Assurez-vous d'avoir organisé votre départ.",
-                    icon='📅',
-                    action_url=f'/connect/lease/?tab=termination',
-                    related_logement=bail.logement
-                )
+def check_lease_notifications(today=None):
+    """
+    Vérifie et envoie les notifications automatiques pour les baux (loyer,
+    assurance, fin de bail): voir core.leases, planifié par send_lease_reminders
+    """
+    from .leases import send_lease_reminders
+    return send_lease_reminders(today)
@@ -0,0 +1,189 @@
+"""
+Caches instrumentés de Transpareo
+Chaque alias de CACHES (sessions, ratelimit, counters) utilise
+l'un des backends ci-dessous: mêmes comportements que les backends Django, avec
+en plus des compteurs de succès/échecs de lecture et de latence par alias. Les
+compteurs sont propres au processus et affichés sur la page admin des caches.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache as DjangoLocMemCache
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache
+
+
+_MISSING = object()
+
+
+# ============================================
+# COMPTEURS
+# ============================================
+
+class CacheMetrics:
+    """Compteurs d'un alias de cache (par processus)"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.writes = 0
+            self.deletes = 0
+            self.errors = 0
+            self.calls = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+
+    def record(self, elapsed, hits=0, misses=0, writes=0, deletes=0, error=False):
+        with self._lock:
+            self.calls += 1
+            self.hits += hits
+            self.misses += misses
+            self.writes += writes
+            self.deletes += deletes
+            self.errors += int(error)
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            reads = self.hits + self.misses
+            return {
+                'name': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(100 * self.hits / reads, 1) if reads else None,
+                'writes': self.writes,
+                'deletes': self.deletes,
+                'errors': self.errors,
+                'calls': self.calls,
+                'avg_ms': round(1000 * self.total_seconds / self.calls, 3) if self.calls else None,
+                'max_ms': round(1000 * self.max_seconds, 3),
+            }
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def get_metrics(name):
+    with _metrics_lock:
+        if name not in _metrics:
+            _metrics[name] = CacheMetrics(name)
+        return _metrics[name]
+
+
+# ============================================
+# BACKENDS
+# ============================================
+
+class InstrumentedCacheMixin:
+    """
+    Mesure les opérations du backend parent.
+
+    L'alias est identifié par KEY_PREFIX (préfixe des clés, renseigné pour chaque
+    alias dans les settings); "default" sans préfixe. Seul l'appel extérieur est
+    compté quand le parent en compose plusieurs (get_many -> get sur LocMem, etc.).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = get_metrics(self.key_prefix or 'default')
+        self._local = threading.local()
+
+    def _call(self, method, *args, **kwargs):
+        """Appelle le parent; retourne (résultat, durée ou None si appel imbriqué)"""
+        if getattr(self._local, 'active', False):
+            return method(*args, **kwargs), None
+        self._local.active = True
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs), time.perf_counter() - started
+        except Exception:
+            self.metrics.record(time.perf_counter() - started, error=True)
+            raise
+        finally:
+            self._local.active = False
+
+    def _measure(self, method, *args, hits=0, misses=0, writes=0, deletes=0, **kwargs):
+        result, elapsed = self._call(method, *args, **kwargs)
+        if elapsed is not None:
+            self.metrics.record(elapsed, hits=hits, misses=misses, writes=writes, deletes=deletes)
+        return result
+
+    def get(self, key, default=None, version=None):
+        value, elapsed = self._call(super().get, key, _MISSING, version=version)
+        found = value is not _MISSING
+        if elapsed is not None:
+            self.metrics.record(elapsed, hits=int(found), misses=int(not found))
+        return value if found else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found, elapsed = self._call(super().get_many, keys, version=version)
+        if elapsed is not None:
+            self.metrics.record(elapsed, hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def set(self, *args, **kwargs):
+        return self._measure(super().set, *args, writes=1, **kwargs)
+
+    def add(self, *args, **kwargs):
+        return self._measure(super().add, *args, writes=1, **kwargs)
+
+    def set_many(self, data, *args, **kwargs):
+        return self._measure(super().set_many, data, *args, writes=len(data), **kwargs)
+
+    def touch(self, *args, **kwargs):
+        return self._measure(super().touch, *args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        return self._measure(super().incr, *args, writes=1, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        return self._measure(super().decr, *args, writes=1, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._measure(super().delete, *args, deletes=1, **kwargs)
+
+    def delete_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        return self._measure(super().delete_many, keys, *args, deletes=len(keys), **kwargs)
+
+    def has_key(self, *args, **kwargs):
+        return self._measure(super().has_key, *args, **kwargs)
+
+
+class LocMemCache(InstrumentedCacheMixin, DjangoLocMemCache):
+    """Cache local au processus (développement, ou données propres au processus)"""
+
+
+class RedisCache(InstrumentedCacheMixin, DjangoRedisCache):
+    """Cache Redis partagé entre processus"""
+
+
+# ============================================
+# LECTURE
+# ============================================
+
+def cache_metrics():
+    """Compteurs de chaque alias configuré (dans l'ordre de CACHES)"""
+    rows = []
+    for alias, config in settings.CACHES.items():
+        row = get_metrics(config.get('KEY_PREFIX') or 'default').snapshot()
+        row['alias'] = alias
+        row['backend'] = config['BACKEND'].rsplit('.', 1)[-1]
+        row['version'] = config.get('VERSION', 1)
+        row['timeout'] = config.get('TIMEOUT', 300)
+        rows.append(row)
+    return rows
+
+
+def reset_cache_metrics():
+    for metrics in list(_metrics.values()):
+        metrics.reset()
@@ -0,0 +1,307 @@
+"""
+Signalisation des appels vocaux et vidéo de Transpareo Connect
+Les échanges WebRTC (offre, réponse, candidats ICE, sonnerie, expiration) passent
+par la couche Channels vers les groupes user_<id> ; l'état de chaque appel en cours
+vit en mémoire et seul l'état final (terminé, rejeté, annulé, manqué) est écrit
+dans Call, en une transaction par appel.
+"""
+import asyncio
+import threading
+import time
+import uuid
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Call, CustomUser
+
+
+# Durée de sonnerie avant passage en appel manqué (secondes)
+CALL_RING_TIMEOUT = getattr(settings, 'CALL_RING_TIMEOUT', 30)
+
+CALL_TYPES = ('voice', 'video')
+
+TERMINAL_STATES = ('ended', 'rejected', 'cancelled', 'missed')
+
+
+class CallError(Exception):
+    """Action de signalisation refusée (message destiné au client, code HTTP associé)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ============================================
+# MACHINE À ÉTATS
+# ============================================
+
+class CallSession:
+    """
+    Appel en cours.
+
+    Transitions:
+        ringing --answer (appelé)--> answered
+        ringing --reject (appelé)--> rejected
+        ringing --cancel (appelant)--> cancelled
+        ringing --timeout--> missed
+        answered --hangup--> ended
+    """
+
+    def __init__(self, conversation_id, caller_id, callee_ids, call_type, timeout=None):
+        self.id = uuid.uuid4().hex
+        self.conversation_id = conversation_id
+        self.caller_id = caller_id
+        self.callee_ids = set(callee_ids)
+        self.call_type = call_type
+        self.state = 'ringing'
+        self.started_at = timezone.now()
+        self.answered_at = None
+        self.ended_at = None
+        self.answered_by = None
+        self.deadline = time.monotonic() + (timeout if timeout is not None else CALL_RING_TIMEOUT)
+
+    @property
+    def participant_ids(self):
+        return {self.caller_id} | self.callee_ids
+
+    @property
+    def is_terminal(self):
+        return self.state in TERMINAL_STATES
+
+    @property
+    def duration(self):
+        if self.answered_at and self.ended_at:
+            return int((self.ended_at - self.answered_at).total_seconds())
+        return None
+
+    def apply(self, user_id, action):
+        """Applique une action; lève CallError si la transition est invalide"""
+        if user_id not in self.participant_ids:
+            raise CallError('Accès refusé', status=403)
+        if self.is_terminal:
+            raise CallError('Appel terminé', status=409)
+
+        is_caller = user_id == self.caller_id
+        if action == 'hangup' and self.state == 'ringing':
+            action = 'cancel' if is_caller else 'reject'
+
+        if self.state == 'ringing' and action == 'answer' and not is_caller:
+            self.state = 'answered'
+            self.answered_at = timezone.now()
+            self.answered_by = user_id
+        elif self.state == 'ringing' and action == 'reject' and not is_caller:
+            self.state = 'rejected'
+        elif self.state == 'ringing' and action == 'cancel' and is_caller:
+            self.state = 'cancelled'
+        elif self.state == 'ringing' and action == 'timeout':
+            self.state = 'missed'
+        elif self.state == 'answered' and action == 'hangup':
+            self.state = 'ended'
+        else:
+            raise CallError('Action invalide pour cet appel', status=409)
+
+        if self.is_terminal:
+            self.ended_at = timezone.now()
+        return self.state
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'conversation_id': self.conversation_id,
+            'caller_id': self.caller_id,
+            'callee_ids': sorted(self.callee_ids),
+            'call_type': self.call_type,
+            'status': self.state,
+            'started_at': self.started_at.isoformat(),
+            'answered_at': self.answered_at.isoformat() if self.answered_at else None,
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
+            'duration': self.duration,
+        }
+
+
+class CallRegistry:
+    """Appels en cours du processus, indexés par identifiant et par utilisateur"""
+
+    def __init__(self):
+        self._calls = {}
+        self._user_calls = {}
+        self._lock = threading.Lock()
+
+    def start(self, conversation_id, caller_id, callee_ids, call_type):
+        with self._lock:
+            busy = [uid for uid in {caller_id, *callee_ids} if uid in self._user_calls]
+            if caller_id in busy:
+                raise CallError('Un appel est déjà en cours', status=409)
+            if busy:
+                raise CallError('Correspondant déjà en ligne', status=409)
+            session = CallSession(conversation_id, caller_id, callee_ids, call_type)
+            self._calls[session.id] = session
+            for user_id in session.participant_ids:
+                self._user_calls[user_id] = session.id
+            return session
+
+    def get(self, call_id):
+        session = self._calls.get(call_id)
+        if session is None:
+            raise CallError('Appel introuvable', status=404)
+        return session
+
+    def apply(self, call_id, user_id, action):
+        with self._lock:
+            session = self.get(call_id)
+            session.apply(user_id, action)
+            if session.is_terminal:
+                self._release(session)
+            return session
+
+    def overdue(self, now=None):
+        """Appels qui sonnent depuis plus que le délai"""
+        now = now if now is not None else time.monotonic()
+        return [s.id for s in list(self._calls.values()) if s.state == 'ringing' and now >= s.deadline]
+
+    def _release(self, session):
+        self._calls.pop(session.id, None)
+        for user_id in session.participant_ids:
+            if self._user_calls.get(user_id) == session.id:
+                del self._user_calls[user_id]
+
+    def __len__(self):
+        return len(self._calls)
+
+
+call_registry = CallRegistry()
+
+
+# ============================================
+# PERSISTANCE (ÉTATS FINAUX UNIQUEMENT)
+# ============================================
+
+def get_call_participants(conversation_id):
+    """Participants actifs d'une conversation"""
+    return set(CustomUser.objects.filter(
+        conversations__id=conversation_id, is_active=True
+    ).values_list('id', flat=True))
+
+
+def persist_call(session):
+    """Enregistre un appel terminé (une ligne Call et ses participants)"""
+    with transaction.atomic():
+        call = Call.objects.create(
+            conversation_id=session.conversation_id,
+            caller_id=session.caller_id,
+            call_type=session.call_type,
+            status=session.state,
+            started_at=session.started_at,
+            answered_at=session.answered_at,
+            ended_at=session.ended_at,
+            duration=session.duration,
+        )
+        call.participants.add(*session.callee_ids)
+    return call.id
+
+
+# ============================================
+# SIGNALISATION
+# ============================================
+
+async def _send(channel_layer, user_ids, payload):
+    for user_id in user_ids:
+        await channel_layer.group_send(
+            f'user_{user_id}',
+            {
+                'type': 'call_event',
+                'call': payload
+            }
+        )
+
+
+async def _finish(channel_layer, session):
+    """Persiste un appel terminé et notifie tous les participants"""
+    record_id = await database_sync_to_async(persist_call)(session)
+    await _send(channel_layer, session.participant_ids, {
+        'event': session.state,
+        'record_id': record_id,
+        **session.to_dict(),
+    })
+
+
+async def expire_overdue_calls(channel_layer):
+    """Passe en "manqué" les appels qui sonnent depuis trop longtemps"""
+    for call_id in call_registry.overdue():
+        try:
+            session = call_registry.apply(call_id, call_registry.get(call_id).caller_id, 'timeout')
+        except CallError:
+            continue  # Déjà décroché ou terminé entre-temps
+        await _finish(channel_layer, session)
+
+
+def _schedule_timeout(channel_layer, delay):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    loop.call_later(delay, lambda: asyncio.ensure_future(expire_overdue_calls(channel_layer)))
+
+
+async def handle_call_action(channel_layer, user_id, action, data):
+    """
+    Traite une action de signalisation d'un participant.
+
+    Actions: offer, answer, ice, reject, cancel, hangup.
+    Événements émis vers user_<id>: incoming, ringing, answered, ice, et l'état final
+    (ended, rejected, cancelled, missed).
+
+    Returns:
+        dict: état de l'appel après l'action
+    """
+    # Expiration paresseuse en plus du minuteur (utile hors boucle d'événements)
+    await expire_overdue_calls(channel_layer)
+
+    if action == 'offer':
+        try:
+            conversation_id = int(data.get('conversation_id'))
+        except (TypeError, ValueError):
+            raise CallError('Conversation requise')
+        call_type = data.get('call_type', 'voice')
+        if call_type not in CALL_TYPES:
+            raise CallError("Type d'appel invalide")
+
+        participants = await database_sync_to_async(get_call_participants)(conversation_id)
+        if user_id not in participants:
+            raise CallError('Accès refusé', status=403)
+        callee_ids = participants - {user_id}
+        if not callee_ids:
+            raise CallError('Aucun correspondant à appeler')
+
+        session = call_registry.start(conversation_id, user_id, callee_ids, call_type)
+        _schedule_timeout(channel_layer, CALL_RING_TIMEOUT + 0.1)
+        await _send(channel_layer, callee_ids, {
+            'event': 'incoming', 'sdp': data.get('sdp'), **session.to_dict()
+        })
+        await _send(channel_layer, [user_id], {'event': 'ringing', **session.to_dict()})
+        return session.to_dict()
+
+    session = call_registry.get(data.get('call_id'))
+
+    if action == 'ice':
+        if user_id not in session.participant_ids:
+            raise CallError('Accès refusé', status=403)
+        await _send(channel_layer, session.participant_ids - {user_id}, {
+            'event': 'ice', 'id': session.id, 'from': user_id, 'candidate': data.get('candidate')
+        })
+        return session.to_dict()
+
+    if action not in ('answer', 'reject', 'cancel', 'hangup'):
+        raise CallError('Action inconnue')
+
+    session = call_registry.apply(session.id, user_id, action)
+    if session.is_terminal:
+        await _finish(channel_layer, session)
+    else:
+        await _send(channel_layer, session.participant_ids, {
+            'event': 'answered', 'sdp': data.get('sdp'), 'answered_by': user_id, **session.to_dict()
+        })
+    return session.to_dict()
@@ -2,10 +2,12 @@
 WebSocket consumers pour les messages en temps réel
 """
 import json
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from .models import Message, Conversation, MessageReaction, Call
+from . import calls, notifications, receipts, presence, typing_indicators
 
 
 class MessageConsumer(AsyncWebsocketConsumer):
@@ -21,6 +23,9 @@ class MessageConsumer(AsyncWebsocketConsumer):
         
         self.user_id = self.user.id
         self.conversation_id = self.scope['url_route']['kwargs'].get('conversation_id')
+        self.allowed_conversations = set()
+        self.typing_conversations = set()
+        self.active_calls = set()
         
         # Rejoindre le groupe de la conversation
         if self.conversation_id:
@@ -35,6 +40,10 @@ class MessageConsumer(AsyncWebsocketConsumer):
         
         await self.accept()
         
+        # Présence en ligne
+        if await sync_to_async(presence.user_connected)(self.user_id):
+            await self.broadcast_presence(True)
+        
         # Envoyer confirmation
         await self.send(text_data=json.dumps({
             'type': 'connection_established',
@@ -43,10 +52,28 @@ class MessageConsumer(AsyncWebsocketConsumer):
     
     async def disconnect(self, close_code):
         """Déconnexion WebSocket"""
+        if not hasattr(self, 'room_group_name'):
+            # Connexion refusée (utilisateur anonyme)
+            return
+        
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
+        
+        # Arrêter les indicateurs de frappe laissés actifs par cette socket
+        for conversation_id in list(self.typing_conversations):
+            await self.handle_typing(conversation_id, False)
+        
+        # Raccrocher les appels passés ou décrochés depuis cette socket
+        for call_id in list(self.active_calls):
+            try:
+                await calls.handle_call_action(self.channel_layer, self.user_id, 'hangup', {'call_id': call_id})
+            except calls.CallError:
+                pass
+        
+        if await sync_to_async(presence.user_disconnected)(self.user_id):
+            await self.broadcast_presence(False)
     
     async def receive(self, text_data):
         """Recevoir un message du WebSocket"""
@@ -66,6 +93,26 @@ class MessageConsumer(AsyncWebsocketConsumer):
                 is_typing = data.get('is_typing', False)
                 await self.handle_typing(conversation_id, is_typing)
             
+            elif message_type == 'heartbeat':
+                # Maintien de la présence en ligne
+                await sync_to_async(presence.heartbeat)(self.user_id)
+            
+            elif message_type == 'ack':
+                # Accusé de lecture/réception: "lu jusqu'au message X"
+                await self.handle_ack(
+                    data.get('conversation_id'),
+                    data.get('kind', 'read'),
+                    data.get('up_to')
+                )
+            
+            elif message_type == 'call':
+                # Signalisation d'appel: offer, answer, ice, reject, cancel, hangup
+                await self.handle_call(data)
+            
+            elif message_type == 'notifications_resume':
+                # Reprise du flux de notifications après (re)connexion
+                await self.handle_notifications_resume(data.get('last_id'))
+            
             elif message_type == 'new_message':
                 # Nouveau message (pour debug, normalement via API)
                 await self.handle_new_message(data)
@@ -82,6 +129,7 @@ class MessageConsumer(AsyncWebsocketConsumer):
         has_access = await self.check_conversation_access(conversation_id)
         
         if has_access:
+            self.allowed_conversations.add(int(conversation_id))
             room_group_name = f'messages_{conversation_id}'
             await self.channel_layer.group_add(
                 room_group_name,
@@ -93,21 +141,93 @@ class MessageConsumer(AsyncWebsocketConsumer):
                 'conversation_id': conversation_id
             }))
     
+    async def ensure_conversation_access(self, conversation_id):
+        """Vérifier l'accès à une conversation (mis en cache pour la socket)"""
+        if conversation_id not in self.allowed_conversations:
+            if not await self.check_conversation_access(conversation_id):
+                return False
+            self.allowed_conversations.add(conversation_id)
+        return True
+    
     async def handle_typing(self, conversation_id, is_typing):
-        """Gérer l'indicateur de frappe"""
-        room_group_name = f'messages_{conversation_id}'
-        
-        await self.channel_layer.group_send(
-            room_group_name,
-            {
-                'type': 'typing_indicator',
-                'user_id': self.user_id,
-                'username': self.user.username,
-                'is_typing': is_typing,
-                'conversation_id': conversation_id
-            }
+        """Gérer l'indicateur de frappe (regroupé et limité en mémoire)"""
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            return
+        
+        if not await self.ensure_conversation_access(conversation_id):
+            return
+        
+        is_typing = bool(is_typing)
+        if is_typing:
+            self.typing_conversations.add(conversation_id)
+        else:
+            self.typing_conversations.discard(conversation_id)
+        
+        await typing_indicators.handle_typing_frame(
+            self.channel_layer, conversation_id, self.user_id, self.user.username, is_typing
         )
     
+    async def handle_ack(self, conversation_id, kind, up_to):
+        """Mettre en tampon un accusé de lecture/réception"""
+        if kind not in receipts.RECEIPT_KINDS:
+            return
+        try:
+            conversation_id = int(conversation_id)
+            up_to = int(up_to)
+        except (TypeError, ValueError):
+            return
+        
+        if not await self.ensure_conversation_access(conversation_id):
+            return
+        
+        await receipts.queue_receipt(self.channel_layer, kind, conversation_id, self.user_id, up_to)
+    
+    async def handle_call(self, data):
+        """Transmettre une action de signalisation d'appel"""
+        action = data.get('action')
+        try:
+            call = await calls.handle_call_action(self.channel_layer, self.user_id, action, data)
+        except calls.CallError as e:
+            await self.send(text_data=json.dumps({
+                'type': 'call_error',
+                'callId': data.get('call_id'),
+                'action': action,
+                'error': str(e)
+            }))
+            return
+        
+        if call['status'] in calls.TERMINAL_STATES:
+            self.active_calls.discard(call['id'])
+        elif action in ('offer', 'answer'):
+            self.active_calls.add(call['id'])
+    
+    async def handle_notifications_resume(self, last_id):
+        """Envoyer les notifications manquées depuis last_id et le nombre de non lues"""
+        try:
+            last_id = int(last_id) if last_id is not None else None
+        except (TypeError, ValueError):
+            last_id = None
+        result = await database_sync_to_async(notifications.notifications_since)(self.user_id, last_id)
+        await self.send(text_data=json.dumps({
+            'type': 'notifications_sync',
+            **result
+        }))
+    
+    async def broadcast_presence(self, is_online):
+        """Notifier les interlocuteurs d'un changement de présence"""
+        audience = await database_sync_to_async(presence.get_presence_audience)(self.user_id)
+        for user_id in audience:
+            await self.channel_layer.group_send(
+                f'user_{user_id}',
+                {
+                    'type': 'presence_update',
+                    'user_id': self.user_id,
+                    'is_online': is_online
+                }
+            )
+    
     async def handle_new_message(self, data):
         """Gérer un nouveau message (pour debug)"""
         # Normalement, les messages sont créés via l'API et diffusés via signals
@@ -115,12 +235,30 @@ class MessageConsumer(AsyncWebsocketConsumer):
     
     async def typing_indicator(self, event):
         """Envoyer l'indicateur de frappe"""
+        if event['user_id'] == self.user_id:
+            return
+        
+        await self.send(text_data=json.dumps({
+            'type': 'typing_start' if event['is_typing'] else 'typing_stop',
+            'conversationId': event['conversation_id'],
+            'userId': event['user_id'],
+            'username': event['username']
+        }))
+    
+    async def message_receipt(self, event):
+        """Envoyer un accusé de lecture/réception"""
         await self.send(text_data=json.dumps({
-            'type': 'typing',
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'is_typing': event['is_typing'],
-            'conversation_id': event['conversation_id']
+            'type': 'message_read' if event['kind'] == 'read' else 'message_delivered',
+            'conversationId': event['conversation_id'],
+            'userId': event['user_id'],
+            'messageId': event['up_to']
+        }))
+    
+    async def presence_update(self, event):
+        """Envoyer un changement de présence"""
+        await self.send(text_data=json.dumps({
+            'type': 'user_online' if event['is_online'] else 'user_offline',
+            'userId': event['user_id']
         }))
     
     async def new_message(self, event):
@@ -133,12 +271,21 @@ class MessageConsumer(AsyncWebsocketConsumer):
     async def message_reaction(self, event):
         """Envoyer une réaction à un message"""
         await self.send(text_data=json.dumps({
-            'type': 'reaction',
+            'type': 'reaction_update',
             'reaction': event['reaction']
         }))
     
+    async def notification_created(self, event):
+        """Envoyer une nouvelle notification"""
+        await self.send(text_data=json.dumps({
+            'type': 'notification',
+            'notification': event['notification']
+        }))
+    
     async def call_event(self, event):
         """Envoyer un événement d'appel"""
+        if event['call'].get('status') in calls.TERMINAL_STATES:
+            self.active_calls.discard(event['call'].get('id'))
         await self.send(text_data=json.dumps({
             'type': 'call',
             'call': event['call']
@@ -0,0 +1,371 @@
+"""
+Résumés email des notifications (notification_email_frequency: daily / weekly)
+Une exécution planifiée lit les notifications non lues et pas encore envoyées des
+utilisateurs concernés en une requête ordonnée par utilisateur (en flux: curseur
+côté serveur sur PostgreSQL, pagination ailleurs), regroupe les destinataires par
+lots dont les préférences sont lues en deux requêtes, puis confie les lots à des
+threads qui rédigent et envoient les emails, chacun sur sa propre connexion SMTP
+gardée ouverte pendant toute l'exécution. Les notifications résumées sont marquées
+email_sent en masse après chaque lot.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import CustomUser, NotificationPreference, UserNotification
+from .notifications import _channel_enabled
+
+logger = logging.getLogger(__name__)
+
+
+# Période couverte par chaque fréquence
+DIGEST_PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+}
+
+# Destinataires par lot (préférences lues en deux requêtes, un lot par thread)
+DIGEST_BATCH_SIZE = getattr(settings, 'DIGEST_BATCH_SIZE', 200)
+
+# Threads de rédaction et d'envoi (une connexion SMTP chacun)
+DIGEST_WORKERS = getattr(settings, 'DIGEST_WORKERS', 4)
+
+# Notifications détaillées dans un résumé (les suivantes sont seulement comptées)
+DIGEST_MAX_ITEMS = getattr(settings, 'DIGEST_MAX_ITEMS', 10)
+
+# Notifications lues par requête quand la table est paginée
+DIGEST_CHUNK_SIZE = 2000
+
+DIGEST_FIELDS = ['id', 'user_id', 'notification_type', 'title', 'message', 'action_url', 'created_at']
+
+
+# ============================================
+# LECTURE
+# ============================================
+
+def digest_since(frequency, now=None):
+    """
+    Début de la fenêtre lue: deux périodes, pour qu'une exécution en retard ou
+    manquée ne perde rien (email_sent évite les doublons)
+    """
+    return (now or timezone.now()) - 2 * DIGEST_PERIODS[frequency]
+
+
+def pending_queryset(frequency, since, after=None):
+    """
+    Notifications à résumer, ordonnées par (utilisateur, id).
+
+    Args:
+        after: (user_id, id) de la dernière ligne lue (pagination)
+    """
+    queryset = UserNotification.objects.filter(
+        user__notification_email_frequency=frequency,
+        user__is_active=True,
+        user__message_email_notifications=True,
+        read=False,
+        email_sent=False,
+        created_at__gte=since,
+    ).exclude(user__email='').exclude(user__email__isnull=True)
+    if after:
+        user_id, last_id = after
+        queryset = queryset.filter(Q(user_id__gt=user_id) | Q(user_id=user_id, id__gt=last_id))
+    return queryset.order_by('user_id', 'id').values(*DIGEST_FIELDS)
+
+
+def iter_pending_rows(frequency, since):
+    """Lignes de pending_queryset en flux (mêmes règles que iter_rescan_chunks)"""
+    queryset = pending_queryset(frequency, since)
+    if connections[queryset.db].vendor == 'postgresql':
+        yield from queryset.iterator(chunk_size=DIGEST_CHUNK_SIZE)
+        return
+
+    while True:
+        chunk = list(queryset[:DIGEST_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield from chunk
+        queryset = pending_queryset(frequency, since, (chunk[-1]['user_id'], chunk[-1]['id']))
+
+
+def iter_user_rows(frequency, since):
+    """(user_id, [lignes]) pour chaque destinataire, dans l'ordre"""
+    user_id, rows = None, []
+    for row in iter_pending_rows(frequency, since):
+        if row['user_id'] != user_id and rows:
+            yield user_id, rows
+            rows = []
+        user_id = row['user_id']
+        rows.append(row)
+    if rows:
+        yield user_id, rows
+
+
+def prepare_batch(groups, frequency):
+    """
+    Résumés d'un lot de destinataires, sans accès à la base au-delà des deux
+    lectures (utilisateurs, préférences): les threads d'envoi n'y touchent pas.
+
+    Les notifications dont le canal email est désactivé (par type, ou dans
+    NotificationPreference) ne sont ni résumées ni marquées.
+
+    Returns:
+        list: [{'user_id', 'email', 'name', 'frequency', 'items', 'ids'}]
+    """
+    user_ids = [user_id for user_id, _ in groups]
+    users = CustomUser.objects.filter(id__in=user_ids).only(
+        'id', 'email', 'username', 'first_name', 'notification_settings',
+    ).in_bulk()
+    preferences = {
+        p.user_id: p for p in NotificationPreference.objects.filter(user_id__in=user_ids)
+    }
+
+    digests = []
+    for user_id, rows in groups:
+        user = users.get(user_id)
+        preference = preferences.get(user_id)
+        if user is None or (preference is not None and not preference.enable_email):
+            continue
+        user_settings = user.notification_settings or {}
+        items = [r for r in rows if _channel_enabled(user_settings, r['notification_type'], 'email')]
+        if not items:
+            continue
+        digests.append({
+            'user_id': user_id,
+            'email': user.email,
+            'name': user.first_name or user.username,
+            'frequency': frequency,
+            'items': items,
+            'ids': [r['id'] for r in items],
+        })
+    return digests
+
+
+# ============================================
+# RÉDACTION
+# ============================================
+
+def render_digest(digest, links):
+    """
+    Sujet et corps (texte) d'un résumé.
+
+    Args:
+        links: {'notifications': URL de la liste, 'settings': URL des préférences}
+
+    Returns:
+        tuple: (sujet, corps)
+    """
+    items = digest['items']
+    count = len(items)
+    label, period = {
+        'daily': ('quotidien', 'de la journée'),
+        'weekly': ('hebdomadaire', 'de la semaine'),
+    }[digest['frequency']]
+
+    subject = f"Votre résumé {label} Transpareo : {count} notification(s)"
+    lines = [
+        f"Bonjour {digest['name']},",
+        "",
+        f"Voici vos {count} notification(s) non lue(s) {period} :",
+        "",
+    ]
+    for item in items[:DIGEST_MAX_ITEMS]:
+        lines.append(f"- {item['title']}")
+        message = item['message'] or ''
+        if message:
+            lines.append(f"  {message[:200]}{'…' if len(message) > 200 else ''}")
+        if item['action_url']:
+            lines.append(f"  {settings.SITE_URL}{item['action_url']}")
+    if count > DIGEST_MAX_ITEMS:
+        lines.append(f"… et {count - DIGEST_MAX_ITEMS} autre(s).")
+    lines += [
+        "",
+        f"Toutes vos notifications : {links['notifications']}",
+        f"Modifier la fréquence de ces emails : {links['settings']}",
+        "",
+        "L'équipe Transpareo",
+    ]
+    return subject, "\n".join(lines)
+
+
+def digest_links():
+    return {
+        'notifications': f"{settings.SITE_URL}{reverse('connect-notifications')}",
+        'settings': f"{settings.SITE_URL}{reverse('connect-notification-settings')}",
+    }
+
+
+def user_digest(user, now=None):
+    """
+    Résumé en attente d'un utilisateur (aperçu: rien n'est envoyé ni marqué)
+
+    Returns:
+        dict | None: {'frequency', 'since', 'count', 'ids', 'subject', 'body'},
+        None si l'utilisateur ne reçoit pas de résumé
+    """
+    frequency = user.notification_email_frequency
+    if frequency not in DIGEST_PERIODS:
+        return None
+    since = digest_since(frequency, now)
+    rows = list(pending_queryset(frequency, since).filter(user_id=user.id))
+    digests = prepare_batch([(user.id, rows)], frequency) if rows else []
+    digest = digests[0] if digests else {'items': [], 'ids': []}
+
+    subject, body = (None, None)
+    if digest['items']:
+        subject, body = render_digest(digest, digest_links())
+    return {
+        'frequency': frequency,
+        'since': since,
+        'count': len(digest['ids']),
+        'ids': digest['ids'],
+        'subject': subject,
+        'body': body,
+    }
+
+
+# ============================================
+# ENVOI
+# ============================================
+
+class DigestSender:
+    """
+    Threads d'envoi: chacun garde sa connexion SMTP ouverte d'un lot à l'autre
+    (pas de poignée de main TLS par email ni par lot).
+    """
+
+    def __init__(self, links):
+        self.links = links
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def send(self, digests):
+        """
+        Rédige et envoie un lot. Un échec (rédaction ou envoi) est journalisé et
+        compté; ses notifications restent à envoyer au prochain résumé.
+
+        Returns:
+            tuple: (identifiants des notifications envoyées, nombre d'échecs)
+        """
+        sent_ids, failed = [], 0
+        for digest in digests:
+            try:
+                subject, body = render_digest(digest, self.links)
+                email = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [digest['email']])
+                self._connection().send_messages([email])
+            except Exception:
+                logger.exception("Échec d'envoi du résumé email (%s)", digest['email'])
+                failed += 1
+                # Connexion peut-être rompue: la suivante en rouvre une
+                self._local.connection = None
+                continue
+            sent_ids += digest['ids']
+        return sent_ids, failed
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+def mark_sent(ids, now):
+    """email_sent en masse (une mise à jour par tranche d'identifiants)"""
+    for start in range(0, len(ids), 500):
+        UserNotification.objects.filter(id__in=ids[start:start + 500]).update(
+            email_sent=True, email_sent_at=now
+        )
+
+
+def send_digests(frequency, now=None, batch_size=None, workers=None, dry_run=False, progress=None):
+    """
+    Envoie les résumés d'une fréquence.
+
+    Args:
+        dry_run: rédiger sans envoyer ni marquer
+        progress: appelé avec les statistiques après chaque lot terminé
+
+    Returns:
+        dict: {'users', 'notifications', 'emails', 'failed', 'seconds', 'emails_per_second'}
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or DIGEST_BATCH_SIZE
+    workers = workers or DIGEST_WORKERS
+    links = digest_links()
+    stats = {'users': 0, 'notifications': 0, 'emails': 0, 'failed': 0}
+    started = time.monotonic()
+
+    def report():
+        stats['seconds'] = round(time.monotonic() - started, 2)
+        stats['emails_per_second'] = round(stats['emails'] / stats['seconds'], 1) if stats['seconds'] else 0
+        if progress:
+            progress(stats)
+
+    sender = DigestSender(links)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='digest')
+    in_flight = {}
+
+    def collect(done):
+        for future in done:
+            batch = in_flight.pop(future)
+            sent_ids, failed = future.result()
+            mark_sent(sent_ids, now)
+            stats['emails'] += len(batch) - failed
+            stats['failed'] += failed
+        report()
+
+    def submit(groups):
+        digests = prepare_batch(groups, frequency)
+        stats['users'] += len(digests)
+        stats['notifications'] += sum(len(d['ids']) for d in digests)
+        if dry_run:
+            for digest in digests:
+                render_digest(digest, links)
+            stats['emails'] += len(digests)
+            report()
+            return
+        # Au plus deux lots en attente par thread: mémoire bornée
+        while len(in_flight) >= 2 * workers:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        in_flight[executor.submit(sender.send, digests)] = digests
+
+    try:
+        groups = []
+        for user_id, rows in iter_user_rows(frequency, digest_since(frequency, now)):
+            groups.append((user_id, rows))
+            if len(groups) >= batch_size:
+                submit(groups)
+                groups = []
+        if groups:
+            submit(groups)
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+    finally:
+        executor.shutdown(wait=True)
+        sender.close()
+
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    stats['emails_per_second'] = round(stats['emails'] / stats['seconds'], 1) if stats['seconds'] else 0
+    return stats
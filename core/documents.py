@@ -0,0 +1,280 @@
+"""
+Documents de location: quittances de loyer et récapitulatif fiscal
+Les quittances des paiements réglés sont lues par lots (une requête par lot,
+tous les champs utiles joints), rendues par core.pdf dans un pool de processus
+pour les gros volumes (fin de mois des propriétaires professionnels) et écrites
+une à une dans une archive zip envoyée en flux: seul un lot de PDF est en
+mémoire. Chaque quittance rendue est enregistrée dans PaiementLoyer.quittance
+sous un nom portant l'empreinte de son contenu; tant que les données du
+paiement (et le gabarit) ne changent pas, elle est relue au lieu d'être rendue.
+"""
+import hashlib
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, F, Sum
+
+from .leases import month_bounds
+from .models import PaiementLoyer
+from .pdf import QUITTANCE_TEMPLATE_VERSION, render_fiscal_summary, render_quittance
+
+
+# Processus de rendu (0: rendu dans le processus courant). Le gabarit texte de
+# core.pdf se rend en quelques dizaines de µs: l'écriture sur le stockage domine
+# et le pool ne paie que pour des gabarits plus lourds
+QUITTANCE_WORKERS = getattr(settings, 'QUITTANCE_WORKERS', 0)
+
+# Quittances lues, rendues et écrites par lot
+QUITTANCE_CHUNK_SIZE = getattr(settings, 'QUITTANCE_CHUNK_SIZE', 200)
+
+# En dessous, pas de pool (son démarrage coûte plus que le rendu)
+QUITTANCE_POOL_MIN = 50
+
+QUITTANCE_FIELDS = [
+    'id', 'date_echeance', 'date_paiement', 'montant_loyer', 'montant_charges', 'montant_total',
+    'mode_paiement', 'quittance',
+]
+QUITTANCE_RELATED = {
+    'logement': F('bail__logement__titre'),
+    'adresse': F('bail__logement__adresse'),
+    'code_postal': F('bail__logement__code_postal'),
+    'locataire_username': F('locataire__username'),
+    'locataire_first_name': F('locataire__first_name'),
+    'locataire_last_name': F('locataire__last_name'),
+    'bailleur_username': F('bail__proprietaire__username'),
+    'bailleur_first_name': F('bail__proprietaire__first_name'),
+    'bailleur_last_name': F('bail__proprietaire__last_name'),
+}
+
+
+# ============================================
+# DONNÉES
+# ============================================
+
+def quittance_queryset(**filters):
+    """Paiements réglés (seuls à donner lieu à quittance), avec les champs du document"""
+    return PaiementLoyer.objects.filter(statut='paye', **filters).values(
+        *QUITTANCE_FIELDS, **QUITTANCE_RELATED
+    ).order_by('id')
+
+
+def _full_name(row, prefix):
+    name = f"{row[f'{prefix}_first_name'] or ''} {row[f'{prefix}_last_name'] or ''}".strip()
+    return name or row[f'{prefix}_username']
+
+
+def _euros(amount):
+    return f"{Decimal(amount or 0):.2f}".replace('.', ',')
+
+
+def quittance_values(row):
+    """Valeurs (chaînes) du gabarit de quittance pour une ligne de quittance_queryset"""
+    debut, fin = month_bounds(row['date_echeance'])
+    date_paiement = row['date_paiement'] or row['date_echeance']
+    return {
+        'numero': f"{row['id']:06d}",
+        'debut': f"{debut:%d/%m/%Y}",
+        'fin': f"{fin:%d/%m/%Y}",
+        'bailleur': _full_name(row, 'bailleur'),
+        'locataire': _full_name(row, 'locataire'),
+        'logement': row['logement'],
+        'adresse': row['adresse'],
+        'code_postal': row['code_postal'] or '',
+        'montant_loyer': _euros(row['montant_loyer']),
+        'montant_charges': _euros(row['montant_charges']),
+        'montant_total': _euros(row['montant_total']),
+        'date_paiement': f"{date_paiement:%d/%m/%Y}",
+        'mode_paiement': row['mode_paiement'] or 'mode non précisé',
+    }
+
+
+def content_hash(values):
+    """Empreinte du contenu d'une quittance (valeurs et version du gabarit)"""
+    data = json.dumps([QUITTANCE_TEMPLATE_VERSION, values], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+def quittance_filename(row, digest):
+    return f"quittance-{row['id']}-{digest}.pdf"
+
+
+def is_cached(row, filename):
+    """La quittance enregistrée correspond-elle au contenu actuel?"""
+    # Le stockage peut suffixer le nom (collision): quittance-<id>-<empreinte>_xxxx.pdf
+    stored = os.path.basename(row['quittance'] or '')
+    return bool(stored) and stored.startswith(filename[:-len('.pdf')])
+
+
+# ============================================
+# RENDU
+# ============================================
+
+def render_chunk(rows, executor=None):
+    """
+    Quittances d'un lot, dans l'ordre: relues si le contenu n'a pas changé, sinon
+    rendues (dans executor s'il est fourni) et enregistrées dans PaiementLoyer.quittance.
+
+    Returns:
+        list: [(nom du fichier, PDF, rendue)]
+    """
+    documents = [None] * len(rows)
+    to_render = []
+    for index, row in enumerate(rows):
+        values = quittance_values(row)
+        filename = quittance_filename(row, content_hash(values))
+        if is_cached(row, filename):
+            try:
+                with default_storage.open(row['quittance'], 'rb') as f:
+                    documents[index] = (filename, f.read(), False)
+                continue
+            except OSError:
+                pass  # fichier disparu du stockage: rendu à nouveau
+        to_render.append((index, row, filename, values))
+
+    values_list = [values for _, _, _, values in to_render]
+    if executor is not None:
+        rendered = executor.map(render_quittance, values_list, chunksize=max(1, len(values_list) // 16))
+    else:
+        rendered = map(render_quittance, values_list)
+
+    field = PaiementLoyer._meta.get_field('quittance')
+    updated = []
+    for (index, row, filename, _), pdf in zip(to_render, rendered):
+        instance = PaiementLoyer(id=row['id'])
+        name = default_storage.save(field.generate_filename(instance, filename), ContentFile(pdf))
+        if row['quittance'] and row['quittance'] != name:
+            default_storage.delete(row['quittance'])
+        instance.quittance = name
+        updated.append(instance)
+        documents[index] = (filename, pdf, True)
+    PaiementLoyer.objects.bulk_update(updated, ['quittance'])
+    return documents
+
+
+def iter_quittances(queryset, workers=None, stats=None):
+    """
+    (nom du fichier, PDF) des quittances de quittance_queryset, par lots, avec un
+    pool de processus au-delà de QUITTANCE_POOL_MIN quittances.
+
+    Args:
+        stats: dict complété au fil de l'eau: {'documents', 'rendered', 'cached',
+            'seconds', 'documents_per_second'}
+    """
+    workers = QUITTANCE_WORKERS if workers is None else workers
+    stats = stats if stats is not None else {}
+    stats.update({'documents': 0, 'rendered': 0, 'cached': 0})
+    started = time.monotonic()
+
+    executor = None
+    last_id = 0
+    try:
+        while True:
+            rows = list(queryset.filter(id__gt=last_id)[:QUITTANCE_CHUNK_SIZE])
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            if executor is None and workers > 0 and len(rows) >= QUITTANCE_POOL_MIN:
+                executor = ProcessPoolExecutor(max_workers=workers)
+            for filename, pdf, rendered in render_chunk(rows, executor):
+                stats['documents'] += 1
+                stats['rendered' if rendered else 'cached'] += 1
+                yield filename, pdf
+            stats['seconds'] = round(time.monotonic() - started, 2)
+            stats['documents_per_second'] = (
+                round(stats['documents'] / stats['seconds'], 1) if stats['seconds'] else 0
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    stats['documents_per_second'] = round(stats['documents'] / stats['seconds'], 1) if stats['seconds'] else 0
+
+
+def quittance_pdf(paiement_id):
+    """(nom du fichier, PDF) de la quittance d'un paiement réglé, None sinon"""
+    rows = list(quittance_queryset(id=paiement_id))
+    if not rows:
+        return None
+    filename, pdf, _ = render_chunk(rows)[0]
+    return filename, pdf
+
+
+# ============================================
+# ARCHIVE ZIP EN FLUX
+# ============================================
+
+class _ZipBuffer:
+    """Destination non positionnable de ZipFile: les octets écrits sont repris par stream_zip"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(documents):
+    """
+    Archive zip en flux (StreamingHttpResponse, fichier): chaque document est
+    émis dès qu'il est écrit, rien n'est gardé en mémoire au-delà.
+
+    Args:
+        documents: itérable de (nom du fichier, contenu)
+    """
+    buffer = _ZipBuffer()
+    # PDF déjà compressés: stockés tels quels
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, data in documents:
+            archive.writestr(filename, data)
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+# ============================================
+# RÉCAPITULATIF FISCAL
+# ============================================
+
+def fiscal_summary_pdf(owner, annee):
+    """
+    Récapitulatif des loyers encaissés par un bailleur sur une année civile
+    (paiements réglés dans l'année), une ligne par bail: une requête groupée.
+    """
+    rows = list(
+        PaiementLoyer.objects.filter(
+            bail__proprietaire=owner, statut='paye', date_paiement__year=annee,
+        ).values('bail_id').annotate(
+            logement=F('bail__logement__titre'),
+            adresse=F('bail__logement__adresse'),
+            paiements=Count('id'),
+            loyers=Sum('montant_loyer'),
+            charges=Sum('montant_charges'),
+            total=Sum('montant_total'),
+        ).order_by('logement', 'bail_id')
+    )
+    totals = {
+        'paiements': sum(r['paiements'] for r in rows),
+        'loyers': _euros(sum(r['loyers'] or 0 for r in rows)),
+        'charges': _euros(sum(r['charges'] or 0 for r in rows)),
+        'total': _euros(sum(r['total'] or 0 for r in rows)),
+    }
+    for row in rows:
+        for key in ('loyers', 'charges', 'total'):
+            row[key] = _euros(row[key])
+    name = f"{owner.first_name} {owner.last_name}".strip() or owner.username
+    return render_fiscal_summary(name, annee, rows, totals)
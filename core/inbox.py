@@ -0,0 +1,110 @@
+"""
+Boîte de réception Transpareo Connect
+Liste paginée des conversations d'un utilisateur avec aperçu du dernier message
+et compteur de non lus annotés en base : la mémoire utilisée par requête ne
+dépend pas de la taille de l'historique.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Conversation, ConversationStatus, CustomUser, Message
+
+
+# Nombre de conversations par page (rendu serveur et API JSON)
+INBOX_PAGE_SIZE = getattr(settings, 'INBOX_PAGE_SIZE', 20)
+
+# Taille maximale d'une page demandée par le client
+INBOX_MAX_PAGE_SIZE = 100
+
+
+def inbox_queryset(user):
+    """
+    Conversations de l'utilisateur, triées par activité récente.
+
+    Chaque conversation porte:
+        - unread_count: messages non lus reçus (sous-requête groupée)
+        - last_message / last_message.sender (jointure)
+        - active_participants: participants actifs (une requête pour la page)
+        - user_statuses: ConversationStatus de l'utilisateur (une requête pour la page)
+    """
+    unread = Message.objects.filter(
+        conversation=OuterRef('pk'),
+        read=False,
+    ).exclude(
+        sender=user
+    ).order_by().values('conversation').annotate(total=Count('id')).values('total')
+
+    return Conversation.objects.filter(
+        participants=user
+    ).select_related(
+        'last_message__sender'
+    ).prefetch_related(
+        Prefetch(
+            'participants',
+            queryset=CustomUser.objects.filter(is_active=True),
+            to_attr='active_participants'
+        ),
+        Prefetch(
+            'statuses',
+            queryset=ConversationStatus.objects.filter(user=user),
+            to_attr='user_statuses'
+        ),
+    ).annotate(
+        unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), 0)
+    ).order_by('-updated_at', '-id')
+
+
+def encode_cursor(conversation):
+    """Curseur de pagination (keyset sur updated_at, id)"""
+    return f'{conversation.updated_at.isoformat()}|{conversation.id}'
+
+
+def decode_cursor(cursor):
+    """Décode un curseur; retourne (updated_at, id) ou None si invalide"""
+    try:
+        updated_at, conversation_id = cursor.rsplit('|', 1)
+        return datetime.fromisoformat(updated_at), int(conversation_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_inbox_page(user, limit=None, cursor=None):
+    """
+    Une page de la boîte de réception.
+
+    Returns:
+        tuple: (liste de conversations annotées, curseur suivant ou None)
+    """
+    limit = max(1, min(limit or INBOX_PAGE_SIZE, INBOX_MAX_PAGE_SIZE))
+    conversations = inbox_queryset(user)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        updated_at, conversation_id = position
+        conversations = conversations.filter(
+            Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=conversation_id)
+        )
+
+    page = list(conversations[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    for conversation in page:
+        conversation.other_user = next(
+            (p for p in conversation.active_participants if p.id != user.id), None
+        )
+        conversation.user_status = conversation.user_statuses[0] if conversation.user_statuses else None
+
+    next_cursor = encode_cursor(page[-1]) if has_more and page else None
+    return page, next_cursor
+
+
+def get_total_unread_count(user):
+    """Nombre total de messages non lus reçus par l'utilisateur (une requête)"""
+    return Message.objects.filter(
+        conversation__participants=user,
+        read=False,
+    ).exclude(sender=user).count()
@@ -0,0 +1,520 @@
+"""
+Automatisations des baux
+Rappels d'échéance envoyés aux locataires par une tâche planifiée (commande
+send_lease_reminders, chaque jour): loyer à payer, assurance habitation à
+renouveler, fin de bail dans 3 mois puis dans 1 mois. Chaque type de rappel est
+une requête sur une fenêtre de dates (bornes calculées une fois, comparaison en
+SQL, servie par les index statut/date) dont sont exclus par anti-jointure les
+rappels déjà envoyés (RappelBailEnvoye). Les rappels d'un lot sont enregistrés
+et les notifications créées par bulk_create dans la même transaction: relancer
+la tâche, ou la rattraper après un jour manqué, n'envoie rien en double.
+
+Rappels automatisés (RappelAutomatise, créés par les parties d'un bail): une file
+des rappels dus (non envoyés, date passée, index partiel) vidée par un ou plusieurs
+workers (commande process_reminders). Chaque worker réserve un lot en SKIP LOCKED,
+l'envoie par les canaux demandés (notification et WebSocket, email, SMS), puis
+reprogramme les rappels répétés ou les marque envoyés.
+
+Échéancier des loyers: chaque mois, une échéance PaiementLoyer par bail actif
+(loyer_mensuel, charges_mensuelles, jour_paiement), créée par bulk_create pour
+les seuls baux qui n'en ont pas encore pour ce mois; puis les échéances passées
+et non payées sont passées en retard par une seule mise à jour.
+"""
+import calendar
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Q, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Bail, PaiementLoyer, RappelAutomatise, RappelBailEnvoye
+from .notifications import build_intent, deliver_each
+from .portfolio import invalidate_owner_summaries
+
+
+# Baux traités par lot (une transaction par lot): rappels et échéancier
+LEASE_REMINDER_BATCH_SIZE = getattr(settings, 'LEASE_REMINDER_BATCH_SIZE', 2000)
+
+# Fenêtre de chaque rappel: (premier jour, dernier jour) avant la date concernée
+LEASE_REMINDER_WINDOWS = {
+    'loyer': (1, 3),
+    'assurance': (1, 30),
+    'fin_bail_90': (31, 90),
+    'fin_bail_30': (1, 30),
+}
+
+
+# ============================================
+# SÉLECTION
+# ============================================
+
+def _not_sent(type_rappel, bail_ref, date_ref):
+    return ~Exists(RappelBailEnvoye.objects.filter(
+        bail_id=OuterRef(bail_ref), type_rappel=type_rappel, date_cible=OuterRef(date_ref),
+    ))
+
+
+def due_reminders(type_rappel, today):
+    """
+    Rappels d'un type à envoyer, non encore envoyés.
+
+    Returns:
+        QuerySet: dicts {'bail_id', 'user_id', 'logement_id', 'date', 'montant'}
+    """
+    first, last = LEASE_REMINDER_WINDOWS[type_rappel]
+    window = (today + timedelta(days=first), today + timedelta(days=last))
+
+    if type_rappel == 'loyer':
+        return PaiementLoyer.objects.filter(
+            _not_sent('loyer', 'bail_id', 'date_echeance'),
+            statut__in=['en_attente', 'en_retard'],
+            date_echeance__range=window,
+            bail__statut='actif',
+        ).values(
+            'bail_id', user_id=F('bail__locataire_id'), logement_id=F('bail__logement_id'),
+            date=F('date_echeance'), montant=F('montant_total'),
+        ).order_by()
+
+    date_field = 'assurance_date_echeance' if type_rappel == 'assurance' else 'date_fin'
+    return Bail.objects.filter(
+        _not_sent(type_rappel, 'id', date_field),
+        statut='actif',
+        **{f'{date_field}__range': window},
+    ).values(
+        'logement_id', bail_id=F('id'), user_id=F('locataire_id'), date=F(date_field),
+    ).order_by()
+
+
+# ============================================
+# CONTENU
+# ============================================
+
+def reminder_intent(type_rappel, row, today):
+    """Intention de notification d'un rappel (contenu du locataire concerné)"""
+    days = (row['date'] - today).days
+    date = row['date'].strftime('%d/%m/%Y')
+
+    if type_rappel == 'loyer':
+        return build_intent(
+            'bail_payment_due',
+            'Rappel: Loyer à payer',
+            f"Votre loyer de {row['montant']}€ est à payer dans {days} jour(s) (le {date})",
+            icon='💰',
+            action_url='/connect/lease/?tab=payments',
+            related_logement=row['logement_id'],
+        )
+    if type_rappel == 'assurance':
+        return build_intent(
+            'bail_reminder',
+            'Rappel: Assurance habitation à renouveler',
+            f"Votre assurance habitation expire dans {days} jour(s) (le {date}). Pensez à la renouveler.",
+            icon='🛡️',
+            action_url='/connect/lease/?tab=contract',
+            related_logement=row['logement_id'],
+        )
+    if type_rappel == 'fin_bail_90':
+        return build_intent(
+            'bail_reminder',
+            'Rappel: Fin de bail dans 3 mois',
+            f"Votre bail se termine dans {days} jours (le {date}). "
+            "Pensez à organiser votre départ si vous souhaitez quitter.",
+            icon='📅',
+            action_url='/connect/lease/?tab=termination',
+            related_logement=row['logement_id'],
+        )
+    return build_intent(
+        'bail_reminder',
+        'Rappel: Fin de bail dans 1 mois',
+        f"Votre bail se termine dans {days} jour(s) (le {date}). "
+        "Assurez-vous d'avoir organisé votre départ.",
+        icon='📅',
+        action_url='/connect/lease/?tab=termination',
+        related_logement=row['logement_id'],
+    )
+
+
+# ============================================
+# ENVOI
+# ============================================
+
+def send_lease_reminders(today=None, batch_size=None, dry_run=False):
+    """
+    Envoie les rappels d'échéance dus.
+
+    Un lot: lecture des rappels dus (anti-jointure sur les rappels envoyés), puis
+    en une transaction bulk_create des RappelBailEnvoye et des notifications. Les
+    lignes traitées sortent de la requête suivante, qui repart donc du début.
+
+    Args:
+        today: date de référence (rattrapage, tests)
+        dry_run: compter sans rien envoyer
+
+    Returns:
+        dict: {'counts': {type: rappels}, 'notifications', 'seconds', 'reminders_per_second'}
+    """
+    today = today or timezone.localdate()
+    batch_size = batch_size or LEASE_REMINDER_BATCH_SIZE
+    stats = {'counts': {}, 'notifications': 0}
+    started = time.monotonic()
+
+    for type_rappel in LEASE_REMINDER_WINDOWS:
+        queryset = due_reminders(type_rappel, today)
+        if dry_run:
+            stats['counts'][type_rappel] = queryset.count()
+            continue
+
+        count = 0
+        while True:
+            rows = list(queryset[:batch_size])
+            if not rows:
+                break
+            # Un rappel par bail et par date (deux échéances identiques: un seul envoi)
+            rows = list({(r['bail_id'], r['date']): r for r in rows}.values())
+            with transaction.atomic():
+                RappelBailEnvoye.objects.bulk_create(
+                    [RappelBailEnvoye(bail_id=r['bail_id'], type_rappel=type_rappel, date_cible=r['date'])
+                     for r in rows],
+                    ignore_conflicts=True,
+                )
+                stats['notifications'] += deliver_each(
+                    [(r['user_id'], reminder_intent(type_rappel, r, today)) for r in rows]
+                )
+            count += len(rows)
+        stats['counts'][type_rappel] = count
+
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    total = sum(stats['counts'].values())
+    stats['reminders_per_second'] = round(total / stats['seconds'], 1) if stats['seconds'] else 0
+    return stats
+
+
+# ============================================
+# RAPPELS AUTOMATISÉS
+# ============================================
+
+# Rappels réservés par lot
+REMINDER_BATCH_SIZE = getattr(settings, 'REMINDER_BATCH_SIZE', 100)
+
+# Réservation d'un worker arrêté en cours de lot: reprise après ce délai (secondes)
+REMINDER_CLAIM_TIMEOUT = getattr(settings, 'REMINDER_CLAIM_TIMEOUT', 300)
+
+# Essais (lots dont tous les canaux ont échoué) avant abandon
+REMINDER_MAX_ATTEMPTS = getattr(settings, 'REMINDER_MAX_ATTEMPTS', 5)
+
+REMINDER_ICONS = {
+    'paiement': '💰',
+    'echeance': '📅',
+    'entretien': '🔧',
+    'document': '📄',
+    'visite': '🏠',
+    'autre': '⏰',
+}
+
+
+def reminder_queue(now):
+    """Rappels dus et disponibles (non réservés, ou réservation expirée)"""
+    return RappelAutomatise.objects.filter(
+        Q(reserve_le__isnull=True) | Q(reserve_le__lt=now - timedelta(seconds=REMINDER_CLAIM_TIMEOUT)),
+        envoye=False,
+        date_rappel__lte=now,
+        tentatives__lt=REMINDER_MAX_ATTEMPTS,
+    )
+
+
+def claim_reminders(limit, now=None):
+    """
+    Réserve jusqu'à limit rappels dus.
+
+    La réservation est un UPDATE conditionnel (reminder_queue, encore disponible)
+    suivi de la relecture des lignes réservées à cet instant: deux workers qui
+    lisent les mêmes candidats n'en réservent chacun que ceux qu'ils ont
+    effectivement mis à jour. SKIP LOCKED (PostgreSQL) évite en plus qu'ils se
+    disputent les mêmes lignes; SQLite l'ignore et sérialise les écritures.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            reminder_queue(now).select_for_update(skip_locked=True, of=('self',)).order_by(
+                'date_rappel', 'id'
+            ).values_list('id', flat=True)[:limit]
+        )
+        if not candidates:
+            return []
+        reminder_queue(now).filter(id__in=candidates).update(reserve_le=now)
+        return list(
+            RappelAutomatise.objects.filter(id__in=candidates, reserve_le=now).select_related(
+                'destinataire'
+            ).order_by('date_rappel', 'id')
+        )
+
+
+# Canaux: chaque adaptateur envoie un lot de rappels et retourne
+# (envoyés, ignorés, {rappel_id: erreur})
+
+def send_reminder_notifications(rappels):
+    """Notification in-app, poussée en WebSocket si envoyer_push (préférences respectées)"""
+    deliver_each([
+        (rappel.destinataire_id, build_intent(
+            'bail_reminder',
+            rappel.titre,
+            rappel.message,
+            icon=REMINDER_ICONS.get(rappel.type_rappel, '⏰'),
+            action_url='/connect/lease/',
+            extra_data={'rappel_id': rappel.id},
+            # L'email du rappel passe par son propre canal
+            channels={'push': rappel.envoyer_push, 'email': False},
+        ))
+        for rappel in rappels
+    ])
+    return len(rappels), 0, {}
+
+
+def send_reminder_emails(rappels):
+    """Un email par rappel, sur une seule connexion SMTP"""
+    sent, skipped, errors = 0, 0, {}
+    connection = get_connection(fail_silently=False)
+    try:
+        for rappel in rappels:
+            user = rappel.destinataire
+            if not user.email:
+                skipped += 1
+                continue
+            body = f"Bonjour {user.first_name or user.username},\n\n{rappel.message}\n"
+            if rappel.date_echeance:
+                body += f"\nÉchéance : {rappel.date_echeance:%d/%m/%Y}\n"
+            body += f"\n{settings.SITE_URL}/connect/lease/\n\nL'équipe Transpareo"
+            try:
+                connection.send_messages([
+                    EmailMessage(rappel.titre, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+                ])
+                sent += 1
+            except Exception as e:
+                errors[rappel.id] = f"email: {e}"
+    finally:
+        connection.close()
+    return sent, skipped, errors
+
+
+def send_reminder_sms(rappels):
+    """SMS par settings.SMS_BACKEND (fonction send(numero, texte)); ignorés sans backend"""
+    backend = getattr(settings, 'SMS_BACKEND', '')
+    if not backend:
+        return 0, len(rappels), {}
+    send = import_string(backend)
+    sent, skipped, errors = 0, 0, {}
+    for rappel in rappels:
+        phone = rappel.destinataire.phone_number
+        if not phone:
+            skipped += 1
+            continue
+        try:
+            send(str(phone), f"{rappel.titre}: {rappel.message}"[:320])
+            sent += 1
+        except Exception as e:
+            errors[rappel.id] = f"sms: {e}"
+    return sent, skipped, errors
+
+
+# canal: (champs de RappelAutomatise qui le demandent, adaptateur)
+REMINDER_CHANNELS = {
+    'notification': (('envoyer_in_app', 'envoyer_push'), send_reminder_notifications),
+    'email': (('envoyer_email',), send_reminder_emails),
+    'sms': (('envoyer_sms',), send_reminder_sms),
+}
+
+
+def reschedule(rappel, now):
+    """
+    Après un envoi: prochaine occurrence d'un rappel répété (nombre_repetitions
+    envois après le premier), sinon rappel terminé. Les occurrences manquées
+    (worker arrêté) ne sont pas rattrapées une à une.
+    """
+    rappel.repetitions_effectuees += 1
+    rappel.date_envoi = now
+    rappel.reserve_le = None
+    rappel.tentatives = 0
+    if rappel.repeter and rappel.intervalle_jours > 0 and rappel.repetitions_effectuees <= rappel.nombre_repetitions:
+        step = timedelta(days=rappel.intervalle_jours)
+        rappel.date_rappel += step
+        while rappel.date_rappel <= now:
+            rappel.date_rappel += step
+    else:
+        rappel.envoye = True
+
+
+def process_reminders(limit=None, now=None):
+    """
+    Réserve et envoie un lot de rappels dus.
+
+    Un rappel dont au moins un canal a fonctionné est considéré envoyé (les
+    erreurs des autres canaux restent dans derniere_erreur); si tous ses canaux
+    ont échoué, il est repris plus tard avec une attente doublée à chaque essai.
+
+    Returns:
+        dict: {'claimed', 'sent', 'failed', 'channels': {canal: {'sent', 'skipped', 'failed'}},
+        'lag_avg', 'lag_max'} (retard en secondes entre date_rappel et l'envoi)
+    """
+    now = now or timezone.now()
+    rappels = claim_reminders(limit or REMINDER_BATCH_SIZE, now)
+    stats = {'claimed': len(rappels), 'sent': 0, 'failed': 0, 'channels': {}, 'lag_avg': 0, 'lag_max': 0}
+    if not rappels:
+        return stats
+
+    lags = [(now - rappel.date_rappel).total_seconds() for rappel in rappels]
+    stats['lag_avg'] = round(sum(lags) / len(lags), 1)
+    stats['lag_max'] = round(max(lags), 1)
+
+    delivered, errors = set(), {}
+    for name, (fields, adapter) in REMINDER_CHANNELS.items():
+        batch = [rappel for rappel in rappels if any(getattr(rappel, f) for f in fields)]
+        if not batch:
+            continue
+        try:
+            sent, skipped, failed = adapter(batch)
+        except Exception as e:
+            sent, skipped, failed = 0, 0, {rappel.id: f"{name}: {e}" for rappel in batch}
+        stats['channels'][name] = {'sent': sent, 'skipped': skipped, 'failed': len(failed)}
+        for rappel in batch:
+            if rappel.id in failed:
+                errors.setdefault(rappel.id, []).append(failed[rappel.id])
+            else:
+                delivered.add(rappel.id)
+
+    for rappel in rappels:
+        rappel.derniere_erreur = '\n'.join(errors.get(rappel.id, []))[:1000]
+        if rappel.id in delivered or rappel.id not in errors:
+            reschedule(rappel, now)
+            stats['sent'] += 1
+        else:
+            # Réservation prolongée: le rappel redevient disponible après l'attente
+            rappel.tentatives += 1
+            backoff = timedelta(seconds=30 * 2 ** rappel.tentatives)
+            rappel.reserve_le = now + backoff - timedelta(seconds=REMINDER_CLAIM_TIMEOUT)
+            stats['failed'] += 1
+
+    RappelAutomatise.objects.bulk_update(rappels, [
+        'date_rappel', 'envoye', 'date_envoi', 'repetitions_effectuees',
+        'reserve_le', 'tentatives', 'derniere_erreur',
+    ])
+    return stats
+
+
+def reminder_queue_stats(now=None):
+    """
+    État de la file des rappels (toutes instances confondues).
+
+    Returns:
+        dict: {'due', 'lag_seconds' (retard du plus ancien rappel dû), 'retrying',
+        'next_hour', 'abandoned'}
+    """
+    now = now or timezone.now()
+    pending = RappelAutomatise.objects.filter(envoye=False)
+    due = reminder_queue(now).aggregate(count=Count('id'), oldest=Min('date_rappel'))
+    return {
+        'due': due['count'],
+        'lag_seconds': round((now - due['oldest']).total_seconds()) if due['oldest'] else 0,
+        'retrying': pending.filter(tentatives__gt=0, tentatives__lt=REMINDER_MAX_ATTEMPTS).count(),
+        'next_hour': pending.filter(date_rappel__gt=now, date_rappel__lte=now + timedelta(hours=1)).count(),
+        'abandoned': pending.filter(tentatives__gte=REMINDER_MAX_ATTEMPTS).count(),
+    }
+
+
+# ============================================
+# ÉCHÉANCIER DES LOYERS
+# ============================================
+
+def month_bounds(month):
+    """Premier et dernier jour du mois d'une date"""
+    first = month.replace(day=1)
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def billable_leases(first, last):
+    """
+    Baux actifs pendant le mois [first, last] sans échéance ce mois-ci
+    (anti-jointure servie par l'index bail/date_echeance).
+    """
+    return Bail.objects.filter(
+        ~Exists(PaiementLoyer.objects.filter(bail_id=OuterRef('id'), date_echeance__range=(first, last))),
+        Q(date_fin__isnull=True) | Q(date_fin__gte=first),
+        statut='actif',
+        date_debut__lte=last,
+    ).values(
+        'id', 'locataire_id', 'loyer_mensuel', 'charges_mensuelles', 'jour_paiement', 'date_debut',
+    ).order_by()
+
+
+def rent_due_date(first, last, jour_paiement, date_debut):
+    """
+    Échéance du mois: jour_paiement, ramené au dernier jour des mois courts, et
+    jamais avant le début du bail (premier mois, sans prorata).
+    """
+    return max(first.replace(day=min(max(jour_paiement, 1), last.day)), date_debut)
+
+
+def generate_rent_payments(month=None, batch_size=None, dry_run=False):
+    """
+    Crée les échéances d'un mois pour tous les baux actifs.
+
+    Comme pour les rappels, chaque lot sort de la requête suivante: relancer la
+    tâche pour un mois déjà traité ne crée rien.
+
+    Args:
+        month: une date du mois à facturer (défaut: mois en cours)
+        dry_run: compter sans rien créer
+
+    Returns:
+        dict: {'month', 'created', 'amount', 'seconds', 'payments_per_second'}
+    """
+    first, last = month_bounds(month or timezone.localdate())
+    batch_size = batch_size or LEASE_REMINDER_BATCH_SIZE
+    queryset = billable_leases(first, last)
+    stats = {'month': first, 'created': 0, 'amount': 0}
+    started = time.monotonic()
+
+    if dry_run:
+        totals = queryset.aggregate(count=Count('id'), amount=Sum(F('loyer_mensuel') + F('charges_mensuelles')))
+        stats['created'], stats['amount'] = totals['count'], totals['amount'] or 0
+    else:
+        while True:
+            rows = list(queryset[:batch_size])
+            if not rows:
+                break
+            payments = [
+                PaiementLoyer(
+                    bail_id=row['id'],
+                    locataire_id=row['locataire_id'],
+                    date_echeance=rent_due_date(first, last, row['jour_paiement'], row['date_debut']),
+                    montant_loyer=row['loyer_mensuel'],
+                    montant_charges=row['charges_mensuelles'],
+                    montant_total=row['loyer_mensuel'] + row['charges_mensuelles'],
+                    statut='en_attente',
+                )
+                for row in rows
+            ]
+            with transaction.atomic():
+                PaiementLoyer.objects.bulk_create(payments, batch_size=500)
+            stats['created'] += len(payments)
+            stats['amount'] += sum(p.montant_total for p in payments)
+
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    stats['payments_per_second'] = round(stats['created'] / stats['seconds'], 1) if stats['seconds'] else 0
+    return stats
+
+
+def overdue_payments(today=None):
+    """Échéances passées et non payées encore en attente (index statut/date_echeance)"""
+    return PaiementLoyer.objects.filter(statut='en_attente', date_echeance__lt=today or timezone.localdate())
+
+
+def mark_overdue_payments(today=None):
+    """Passe en retard les échéances dépassées, en une seule mise à jour"""
+    overdue = overdue_payments(today)
+    owners = list(overdue.values_list('bail__proprietaire_id', flat=True).distinct())
+    updated = overdue.update(statut='en_retard', updated_at=timezone.now())
+    invalidate_owner_summaries(owners)
+    return updated
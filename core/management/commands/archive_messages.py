@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.archive import (
+    ARCHIVE_CODEC, MESSAGE_ARCHIVE_AFTER_MONTHS, MESSAGE_ARCHIVE_SEGMENT_SIZE,
+    archive_old_messages,
+)
+
+
+class Command(BaseCommand):
+    help = 'Archive les messages anciens dans des segments compressés par conversation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=MESSAGE_ARCHIVE_AFTER_MONTHS,
+            help='Ancienneté minimale (mois) des messages archivés',
+        )
+        parser.add_argument(
+            '--segment-size',
+            type=int,
+            default=MESSAGE_ARCHIVE_SEGMENT_SIZE,
+            help='Nombre maximal de messages par segment',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stats = archive_old_messages(
+            months=options['months'],
+            segment_size=options['segment_size'],
+        )
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {stats['messages']} message(s) archivé(s) dans "
+                f"{stats['conversations']} conversation(s) ({ARCHIVE_CODEC}, {elapsed:.1f}s)"
+            )
+        )
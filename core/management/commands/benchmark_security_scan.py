@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.security import KeywordAutomaton, scan_content
+
+
+WORDS = [
+    'bonjour', 'appartement', 'loyer', 'quartier', 'charges', 'visite', 'propriétaire',
+    'dossier', 'garant', 'caution', 'disponible', 'meublé', 'lumineux', 'métro',
+    'gratuit', 'virement', 'urgent', 'https://bit.ly/x', 'merci', 'cordialement',
+]
+
+
+def sample_text(length, rng):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)[:length]
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps d'analyse de core.security (linéaire en longueur, indépendant du nombre de mots-clés)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Mesures par point (meilleure retenue)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        repeat = options['repeat']
+
+        self.stdout.write('scan_content() selon la longueur du texte')
+        self.stdout.write(f"{'caractères':>12} {'ms':>10} {'ns/caractère':>14}")
+        for length in (1_000, 10_000, 100_000, 1_000_000):
+            text = sample_text(length, rng)
+            elapsed = best_of(lambda: scan_content(text), repeat)
+            self.stdout.write(f'{length:>12} {elapsed * 1000:>10.2f} {elapsed / length * 1e9:>14.1f}')
+
+        self.stdout.write('')
+        self.stdout.write('Automate selon le nombre de mots-clés (texte de 200 000 caractères)')
+        self.stdout.write(f"{'mots-clés':>12} {'états':>10} {'ms':>10} {'ns/caractère':>14} {'naïf ms':>10}")
+        text = sample_text(200_000, rng).lower()
+        alphabet = 'abcdefghijklmnopqrstuvwxyzéè '
+        for count in (10, 100, 1_000, 10_000):
+            keywords = [
+                ''.join(rng.choice(alphabet) for _ in range(rng.randint(4, 14)))
+                for _ in range(count)
+            ]
+            automaton = KeywordAutomaton({'bench': keywords})
+            elapsed = best_of(lambda: automaton.find(text), repeat)
+            # Référence: un test "mot-clé in texte" par mot-clé (coût proportionnel au nombre de mots-clés)
+            naive = best_of(lambda: [k for k in keywords if k in text], 1)
+            self.stdout.write(
+                f'{count:>12} {len(automaton):>10} {elapsed * 1000:>10.2f} '
+                f'{elapsed / len(text) * 1e9:>14.1f} {naive * 1000:>10.2f}'
+            )
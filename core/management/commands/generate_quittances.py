@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.documents import QUITTANCE_WORKERS, iter_quittances, quittance_queryset, stream_zip
+from core.leases import month_bounds
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Génère les quittances des loyers payés d'un mois (archive zip) — fin de mois"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            default=None,
+            help='Mois AAAA-MM (défaut: mois en cours)',
+        )
+        parser.add_argument(
+            '--owner',
+            default=None,
+            help='Nom d\'utilisateur du bailleur (défaut: tous)',
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Archive zip à écrire (défaut: quittances enregistrées seulement)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=QUITTANCE_WORKERS,
+            help='Processus de rendu (0: rendu dans ce processus)',
+        )
+
+    def handle(self, *args, **options):
+        month = timezone.localdate()
+        if options['month']:
+            try:
+                month = date.fromisoformat(f"{options['month']}-01")
+            except ValueError:
+                raise CommandError('Mois invalide (format attendu: AAAA-MM)')
+
+        filters = {'date_echeance__range': month_bounds(month)}
+        if options['owner']:
+            try:
+                filters['bail__proprietaire'] = CustomUser.objects.get(username=options['owner'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Utilisateur introuvable: {options['owner']}")
+
+        stats = {}
+        documents = iter_quittances(quittance_queryset(**filters), workers=options['workers'], stats=stats)
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in stream_zip(documents):
+                    f.write(chunk)
+        else:
+            for _ in documents:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {stats['documents']} quittance(s) ({stats['rendered']} rendue(s), {stats['cached']} en cache) "
+            f"en {stats['seconds']} s ({stats['documents_per_second']} documents/s)"
+        ))
@@ -0,0 +1,63 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.leases import generate_rent_payments, mark_overdue_payments, month_bounds, overdue_payments
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée les échéances de loyer des baux actifs et passe en retard les échéances "
+        "impayées — à planifier chaque jour"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            default=None,
+            help='Premier mois à facturer AAAA-MM (défaut: mois en cours)',
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=1,
+            help='Mois suivants à facturer aussi (défaut: 1, pour que les rappels de loyer trouvent '
+                 'les échéances du début du mois suivant)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Baux par lot (défaut: LEASE_REMINDER_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter sans rien créer ni modifier',
+        )
+
+    def handle(self, *args, **options):
+        month = timezone.localdate().replace(day=1)
+        if options['month']:
+            try:
+                month = date.fromisoformat(f"{options['month']}-01")
+            except ValueError:
+                raise CommandError('Mois invalide (format attendu: AAAA-MM)')
+
+        verb = 'à créer' if options['dry_run'] else 'créée(s)'
+        for _ in range(options['ahead'] + 1):
+            stats = generate_rent_payments(month, batch_size=options['batch_size'], dry_run=options['dry_run'])
+            self.stdout.write(
+                f"{stats['month']:%m/%Y}: {stats['created']} échéance(s) {verb} "
+                f"({stats['amount']} €) en {stats['seconds']} s ({stats['payments_per_second']}/s)"
+            )
+            month = month_bounds(month)[1] + date.resolution
+
+        if options['dry_run']:
+            late = overdue_payments().count()
+            self.stdout.write(self.style.SUCCESS(f"✓ {late} échéance(s) à passer en retard"))
+            return
+
+        late = mark_overdue_payments()
+        self.stdout.write(self.style.SUCCESS(f"✓ {late} échéance(s) passée(s) en retard"))
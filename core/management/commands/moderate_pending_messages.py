@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.moderation import moderate_pending_messages
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyse les messages jamais modérés (file perdue au redémarrage, file pleine) — "
+        "à planifier toutes les quelques minutes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Messages analysés au plus par passe (défaut: tous)',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60,
+            metavar='SECONDES',
+            help='Ignorer les messages plus récents (encore dans la file des workers)',
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDES',
+            help='Recommencer toutes les N secondes (0: une seule passe)',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                started = time.monotonic()
+                count = moderate_pending_messages(options['limit'], older_than=options['min_age'])
+                total += count
+                if count:
+                    self.stdout.write(
+                        f"{count} message(s) analysé(s) en {time.monotonic() - started:.2f} s"
+                    )
+                if not options['loop']:
+                    break
+                time.sleep(options['loop'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {total} message(s) en attente analysé(s)"))
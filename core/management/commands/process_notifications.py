@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import get_queue
+
+
+class Command(BaseCommand):
+    help = "Distribue les notifications de la file durable (NotificationIntent)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Intentions réservées par lot',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Vider la file puis s\'arrêter (sinon: boucle continue)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Attente (secondes) quand la file est vide',
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=7,
+            help='Supprimer les intentions distribuées depuis plus de N jours (0: jamais)',
+        )
+
+    def handle(self, *args, **options):
+        notification_queue = get_queue('database')
+
+        if options['purge_days']:
+            purged = notification_queue.purge(options['purge_days'])
+            if purged:
+                self.stdout.write(f'{purged} intention(s) distribuée(s) supprimée(s)')
+
+        started = time.monotonic()
+        totals = {'intents': 0, 'notifications': 0, 'failed': 0}
+        try:
+            while True:
+                stats = notification_queue.process(options['batch_size'])
+                for key in totals:
+                    totals[key] += stats[key]
+                if stats['intents']:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f"{totals['intents']} intention(s), {totals['notifications']} notification(s) "
+                        f"({totals['notifications'] / elapsed if elapsed else 0:.0f}/s)"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {totals['intents']} intention(s) traitée(s), {totals['notifications']} notification(s) "
+            f"créée(s), {totals['failed']} échec(s)"
+        ))
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from core.leases import REMINDER_BATCH_SIZE, process_reminders, reminder_queue_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie les rappels automatisés dus (plusieurs instances possibles en parallèle; "
+        "sous SQLite elles s'attendent l'une l'autre)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REMINDER_BATCH_SIZE,
+            help='Rappels réservés par lot',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Vider la file puis s\'arrêter (sinon: boucle continue)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Attente (secondes) quand aucun rappel n\'est dû',
+        )
+
+    def handle(self, *args, **options):
+        queue = reminder_queue_stats()
+        self.stdout.write(
+            f"{queue['due']} rappel(s) dû(s), retard du plus ancien: {queue['lag_seconds']}s, "
+            f"{queue['next_hour']} dans l'heure"
+        )
+
+        started = time.monotonic()
+        totals = {'claimed': 0, 'sent': 0, 'failed': 0}
+        backoff = max(options['sleep'], 1.0)
+        try:
+            while True:
+                try:
+                    stats = process_reminders(options['batch_size'])
+                except OperationalError as e:
+                    # Base verrouillée par un autre worker (SQLite): attendre de plus en plus longtemps
+                    self.stderr.write(f"Base indisponible ({e}), nouvel essai dans {backoff:.0f}s")
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 300)
+                    continue
+                backoff = max(options['sleep'], 1.0)
+                for key in totals:
+                    totals[key] += stats[key]
+                if stats['claimed']:
+                    elapsed = time.monotonic() - started
+                    channels = ', '.join(
+                        f"{name}: {c['sent']} envoyé(s)/{c['skipped']} ignoré(s)/{c['failed']} échec(s)"
+                        for name, c in stats['channels'].items()
+                    )
+                    self.stdout.write(
+                        f"{totals['sent']} rappel(s) envoyé(s) ({totals['sent'] / elapsed if elapsed else 0:.0f}/s), "
+                        f"retard moyen {stats['lag_avg']}s, max {stats['lag_max']}s — {channels}"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {totals['claimed']} rappel(s) traité(s), {totals['sent']} envoyé(s), "
+            f"{totals['failed']} échec(s)"
+        ))
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.retention import get_policies, prune
+
+
+class Command(BaseCommand):
+    help = "Purge les historiques expirés (notifications, connexions, logs) selon RETENTION_POLICIES"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--policies',
+            nargs='+',
+            default=None,
+            help='Politiques à appliquer (défaut: toutes)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Lignes visées par tranche (défaut: RETENTION_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=None,
+            help='Pause entre deux tranches en secondes (défaut: RETENTION_SLEEP)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les lignes expirées sans rien supprimer',
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDES',
+            help='Recommencer toutes les N secondes (0: une seule passe)',
+        )
+
+    def handle(self, *args, **options):
+        policies = get_policies()
+        names = options['policies'] or list(policies)
+        unknown = set(names) - set(policies)
+        if unknown:
+            raise CommandError(f"Politique(s) inconnue(s): {', '.join(sorted(unknown))}")
+
+        def progress(stats):
+            self.stdout.write(
+                f"{stats['policy']}: {stats['deleted']} ligne(s) ({stats['rows_per_second']}/s)"
+            )
+
+        try:
+            while True:
+                for name in names:
+                    stats = prune(
+                        name,
+                        policies[name],
+                        batch_size=options['batch_size'],
+                        sleep=options['sleep'],
+                        dry_run=options['dry_run'],
+                        progress=None if options['dry_run'] else progress,
+                    )
+                    verb = 'expirée(s)' if options['dry_run'] else 'supprimée(s)'
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✓ {name}: {stats['deleted']} ligne(s) {verb}, {stats['archived']} archivée(s), "
+                        f"{stats['batches']} tranche(s) en {stats['seconds']} s ({stats['rows_per_second']}/s)"
+                    ))
+                if not options['loop']:
+                    break
+                time.sleep(options['loop'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.uploads import MESSAGE_UPLOAD_TEMP_DIR, purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les téléversements de pièces jointes abandonnés et les fichiers partiels "
+        "orphelins — à planifier chaque jour"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Âge (heures) au-delà duquel un téléversement non attaché est abandonné',
+        )
+
+    def handle(self, *args, **options):
+        stats = purge_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {stats['uploads']} téléversement(s) et {stats['files']} fichier(s) partiel(s) "
+            f"supprimé(s) ({MESSAGE_UPLOAD_TEMP_DIR})"
+        ))
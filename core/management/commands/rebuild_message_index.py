@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.archive import line_to_message, load_segment
+from core.message_search import index_messages
+from core.models import Message, MessageArchive, MessageSearchTerm
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des messages (par lots d'identifiants)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Nombre de messages indexés par transaction',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help="Ne pas vider l'index existant (indexe seulement les messages absents)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if not options['keep']:
+            deleted, _ = MessageSearchTerm.objects.all().delete()
+            self.stdout.write(f'{deleted} entrée(s) supprimée(s)')
+
+        last_id = 0
+        indexed = 0
+        terms = 0
+        while True:
+            batch = Message.objects.filter(id__gt=last_id).order_by('id').only(
+                'id', 'conversation_id', 'content'
+            )[:batch_size]
+            batch = list(batch)
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            if options['keep']:
+                already = set(MessageSearchTerm.objects.filter(
+                    message_id__in=[m.id for m in batch]
+                ).values_list('message_id', flat=True).distinct())
+                batch = [m for m in batch if m.id not in already]
+
+            with transaction.atomic():
+                terms += index_messages(batch)
+            indexed += len(batch)
+
+        # Messages archivés: réindexés depuis leurs segments quand l'index a été vidé
+        if not options['keep']:
+            for archive in MessageArchive.objects.order_by('id').iterator():
+                batch = [line_to_message(line, archive.conversation_id) for line in load_segment(archive)]
+                with transaction.atomic():
+                    terms += index_messages(batch)
+                indexed += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {indexed} message(s) indexé(s), {terms} entrée(s) créée(s)')
+        )
@@ -0,0 +1,146 @@
+import json
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.moderation import RESCAN_TARGETS, iter_rescan_chunks, save_rescan_results
+from core.security import score_rows
+
+
+DEFAULT_CHECKPOINT = os.path.join(settings.BASE_DIR, 'rescan_moderation.checkpoint.json')
+
+
+def split(rows, parts):
+    """Découpe un lot en sous-lots (id, contenu) pour les workers"""
+    size = max(1, -(-len(rows) // parts))
+    return [
+        [(row['id'], row['content']) for row in rows[start:start + size]]
+        for start in range(0, len(rows), size)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Ré-analyse posts, commentaires et messages avec core.security (après un "
+        "changement des listes de détection) et réécrit scores et indicateurs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            choices=list(RESCAN_TARGETS),
+            default=list(RESCAN_TARGETS),
+            help='Tables à ré-analyser (toutes par défaut)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Nombre de lignes lues, analysées et écrites par lot',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processus d'analyse (1: analyse dans le processus courant)",
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=DEFAULT_CHECKPOINT,
+            help='Fichier de reprise (dernier id traité par table)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Reprendre après le dernier id enregistré dans le fichier de reprise',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size et --workers doivent être positifs')
+
+        checkpoint_path = options['checkpoint']
+        checkpoint = self.load_checkpoint(checkpoint_path) if options['resume'] else {}
+
+        pool = None
+        if options['workers'] > 1:
+            # Les processus enfants ne doivent pas hériter des connexions ouvertes
+            connections.close_all()
+            pool = multiprocessing.Pool(options['workers'])
+
+        started = time.monotonic()
+        total = 0
+        try:
+            for target in options['tables']:
+                total += self.rescan(target, checkpoint, checkpoint_path, pool, options)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total} ligne(s) ré-analysée(s) en {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else 0:.0f} lignes/s)'
+        ))
+
+    def rescan(self, target, checkpoint, checkpoint_path, pool, options):
+        after_id = checkpoint.get(target, 0)
+        if after_id:
+            self.stdout.write(f'{target}: reprise après id {after_id}')
+
+        started = time.monotonic()
+        done = 0
+        flagged = 0
+        for rows in iter_rescan_chunks(target, after_id, options['chunk_size']):
+            batches = split(rows, options['workers'])
+            if pool is not None:
+                scored = pool.map(score_rows, batches)
+            else:
+                scored = [score_rows(batch) for batch in batches]
+            results = {row_id: result for batch in scored for row_id, result in batch}
+
+            done += save_rescan_results(target, rows, results)
+            flagged += sum(1 for result in results.values() if result['is_suspicious'])
+
+            # Point de reprise enregistré seulement après l'écriture du lot
+            checkpoint[target] = rows[-1]['id']
+            self.save_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{target}: {done} ligne(s) jusqu\'à id {rows[-1]["id"]} '
+                f'({done / elapsed if elapsed else 0:.0f} lignes/s)'
+            )
+
+        # Table terminée: plus rien à reprendre pour elle
+        checkpoint.pop(target, None)
+        self.save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {target}: {done} ligne(s), {flagged} suspecte(s), '
+            f'{done / elapsed if elapsed else 0:.0f} lignes/s'
+        ))
+        return done
+
+    def load_checkpoint(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def save_checkpoint(self, path, checkpoint):
+        if not checkpoint:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.metrics import METRICS, METRICS_RECOMPUTE_DAYS, backfill, rollup_recent
+
+
+class Command(BaseCommand):
+    help = "Calcule les métriques quotidiennes (DailyMetric) des derniers jours — à planifier chaque nuit"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=METRICS_RECOMPUTE_DAYS,
+            help='Derniers jours terminés à recalculer',
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Recalculer tout l\'historique (première mise en place, nouvelle métrique)',
+        )
+        parser.add_argument(
+            '--metrics',
+            default=None,
+            help=f"Métriques séparées par des virgules (défaut: toutes): {', '.join(METRICS)}",
+        )
+
+    def handle(self, *args, **options):
+        names = None
+        if options['metrics']:
+            names = [name.strip() for name in options['metrics'].split(',') if name.strip()]
+            unknown = [name for name in names if name not in METRICS]
+            if unknown:
+                raise CommandError(f"Métrique(s) inconnue(s): {', '.join(unknown)}")
+
+        if options['backfill']:
+            def progress(name, day, stats):
+                self.stdout.write(f"{name}: jusqu'au {day:%d/%m/%Y}, {stats['rows']} ligne(s)")
+
+            stats = backfill(names, progress)
+        else:
+            stats = rollup_recent(options['days'], names)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {stats['metrics']} métrique(s), {stats['days']} jour(s), {stats['rows']} ligne(s) "
+            f"en {stats['seconds']} s"
+        ))
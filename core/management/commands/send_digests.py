@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from core.digests import DIGEST_PERIODS, send_digests
+
+
+class Command(BaseCommand):
+    help = "Envoie les résumés email des notifications non lues (quotidiens ou hebdomadaires)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'frequency',
+            choices=sorted(DIGEST_PERIODS),
+            help='Résumés à envoyer: daily (chaque jour) ou weekly (chaque semaine)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Destinataires par lot (défaut: DIGEST_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help="Threads d'envoi, une connexion SMTP chacun (défaut: DIGEST_WORKERS)",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Rédiger les résumés sans les envoyer ni marquer les notifications',
+        )
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            self.stdout.write(
+                f"{stats['emails']} résumé(s), {stats['notifications']} notification(s) "
+                f"({stats['emails_per_second']}/s)"
+            )
+
+        stats = send_digests(
+            options['frequency'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run'],
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {stats['emails']} résumé(s) {'rédigé(s)' if options['dry_run'] else 'envoyé(s)'} "
+            f"({stats['notifications']} notification(s)), {stats['failed']} échec(s) "
+            f"en {stats['seconds']} s ({stats['emails_per_second']}/s)"
+        ))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.leases import send_lease_reminders
+
+
+class Command(BaseCommand):
+    help = "Envoie les rappels d'échéance des baux (loyer, assurance, fin de bail) — à planifier chaque jour"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            default=None,
+            help='Date de référence AAAA-MM-JJ (défaut: aujourd\'hui)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Rappels par lot (défaut: LEASE_REMINDER_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les rappels dus sans rien envoyer',
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('Date invalide (format attendu: AAAA-MM-JJ)')
+
+        stats = send_lease_reminders(today, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        details = ', '.join(f'{kind}: {count}' for kind, count in stats['counts'].items())
+        verb = 'dû(s)' if options['dry_run'] else 'envoyé(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {sum(stats['counts'].values())} rappel(s) {verb} ({details}), "
+            f"{stats['notifications']} notification(s) en {stats['seconds']} s "
+            f"({stats['reminders_per_second']}/s)"
+        ))
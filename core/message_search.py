@@ -0,0 +1,243 @@
+"""
+Recherche plein texte dans les conversations d'un utilisateur
+Index inversé (MessageSearchTerm) alimenté à l'envoi des messages : une recherche
+est une série de lectures d'index sur (terme, conversation) au lieu d'un LIKE sur
+tout l'historique. Les résultats portent un extrait surligné et un curseur pour
+ouvrir la conversation autour du message trouvé (api_get_messages?around=<id>),
+y compris pour les messages déjà archivés (core.archive).
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.utils.html import escape
+
+from .archive import find_archived
+from .models import Conversation, Message, MessageSearchTerm
+
+
+# Nombre de résultats par page
+MESSAGE_SEARCH_PAGE_SIZE = getattr(settings, 'MESSAGE_SEARCH_PAGE_SIZE', 20)
+
+# Taille maximale d'une page demandée par le client
+MESSAGE_SEARCH_MAX_PAGE_SIZE = 100
+
+# Longueur (caractères) de l'extrait renvoyé autour de la première occurrence
+MESSAGE_SEARCH_SNIPPET_LENGTH = 160
+
+# Termes plus courts ignorés (articles, ponctuation isolée...)
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+
+# Nombre maximal de termes pris en compte dans une requête
+MAX_QUERY_TERMS = 8
+
+WORD_RE = re.compile(r'\w+')
+
+
+# ============================================
+# NORMALISATION
+# ============================================
+
+def normalize(word):
+    """Minuscules sans accents: "Été" -> "ete" """
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Termes distincts d'un texte, dans l'ordre d'apparition"""
+    terms = {}
+    for word in WORD_RE.findall(normalize(text or '')):
+        if len(word) >= MIN_TERM_LENGTH:
+            terms.setdefault(word[:MAX_TERM_LENGTH], None)
+    return list(terms)
+
+
+# ============================================
+# INDEXATION
+# ============================================
+
+def build_terms(message):
+    """Entrées d'index (non enregistrées) d'un message"""
+    return [
+        MessageSearchTerm(term=term, conversation_id=message.conversation_id, message_id=message.id)
+        for term in tokenize(message.content)
+    ]
+
+
+def index_message(message):
+    """Indexe (ou réindexe) un message"""
+    MessageSearchTerm.objects.filter(message_id=message.id).delete()
+    MessageSearchTerm.objects.bulk_create(build_terms(message))
+
+
+def index_messages(messages, batch_size=1000):
+    """
+    Indexe un lot de messages déjà absents de l'index (reconstruction).
+
+    Returns:
+        int: nombre d'entrées créées
+    """
+    pending = []
+    created = 0
+    for message in messages:
+        pending.extend(build_terms(message))
+        if len(pending) >= batch_size:
+            MessageSearchTerm.objects.bulk_create(pending, batch_size=batch_size)
+            created += len(pending)
+            pending = []
+    if pending:
+        MessageSearchTerm.objects.bulk_create(pending, batch_size=batch_size)
+        created += len(pending)
+    return created
+
+
+# ============================================
+# RECHERCHE
+# ============================================
+
+def parse_query(query):
+    """
+    Termes de la requête; le dernier est un préfixe si la saisie n'est pas terminée
+    ("appart" trouve "appartement").
+
+    Returns:
+        tuple: (termes exacts, préfixe ou None)
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return [], None
+    if query and not query[-1].isspace():
+        return terms[:-1], terms[-1]
+    return terms, None
+
+
+def _postings(conversations, term, prefix=False):
+    postings = MessageSearchTerm.objects.filter(conversation_id__in=conversations)
+    if prefix:
+        # Plage sur l'index (un LIKE 'x%' n'utiliserait pas l'index sous SQLite)
+        return postings.filter(term__gte=term, term__lt=term + '\uffff')
+    return postings.filter(term=term)
+
+
+def search_message_ids(user, query, conversation_id=None, limit=None, cursor=None):
+    """
+    Messages contenant tous les termes, du plus récent au plus ancien.
+
+    Args:
+        cursor: identifiant du dernier message de la page précédente
+
+    Returns:
+        tuple: ([(message_id, conversation_id)], curseur suivant ou None)
+    """
+    limit = max(1, min(limit or MESSAGE_SEARCH_PAGE_SIZE, MESSAGE_SEARCH_MAX_PAGE_SIZE))
+    terms, prefix = parse_query(query)
+    if not terms and not prefix:
+        return [], None
+
+    conversations = Conversation.participants.through.objects.filter(
+        customuser_id=user.id
+    ).values('conversation_id')
+    if conversation_id:
+        conversations = conversations.filter(conversation_id=conversation_id)
+
+    lookups = [(term, False) for term in terms]
+    if prefix:
+        lookups.append((prefix, True))
+
+    # Terme le plus long en premier (en général le plus sélectif), les autres en semi-jointure
+    lookups.sort(key=lambda lookup: (lookup[1], -len(lookup[0])))
+    first, *others = lookups
+
+    postings = _postings(conversations, *first)
+    for term, is_prefix in others:
+        postings = postings.filter(
+            message_id__in=_postings(conversations, term, is_prefix).values('message_id')
+        )
+    if cursor:
+        postings = postings.filter(message_id__lt=cursor)
+
+    hits = list(
+        postings.order_by('-message_id').values_list('message_id', 'conversation_id').distinct()[:limit + 1]
+    )
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    next_cursor = hits[-1][0] if has_more and hits else None
+    return hits, next_cursor
+
+
+def highlight(content, query, length=MESSAGE_SEARCH_SNIPPET_LENGTH):
+    """
+    Extrait HTML échappé centré sur la première occurrence, termes entourés de <mark>.
+    """
+    content = content or ''
+    terms, prefix = parse_query(query)
+    terms = set(terms)
+
+    matches = []
+    for match in WORD_RE.finditer(content):
+        word = normalize(match.group())[:MAX_TERM_LENGTH]
+        if word in terms or (prefix and word.startswith(prefix)):
+            matches.append(match.span())
+
+    start = 0
+    if matches and len(content) > length:
+        start = max(0, min(matches[0][0] - length // 3, len(content) - length))
+    end = min(len(content), start + length)
+
+    parts = ['…'] if start > 0 else []
+    position = start
+    for match_start, match_end in matches:
+        if match_start < start or match_end > end:
+            continue
+        parts.append(escape(content[position:match_start]))
+        parts.append(f'<mark>{escape(content[match_start:match_end])}</mark>')
+        position = match_end
+    parts.append(escape(content[position:end]))
+    if end < len(content):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def search_messages(user, query, conversation_id=None, limit=None, cursor=None):
+    """
+    Recherche dans les conversations de l'utilisateur.
+
+    Returns:
+        tuple: (résultats JSON, curseur suivant ou None)
+    """
+    hits, next_cursor = search_message_ids(
+        user, query, conversation_id=conversation_id, limit=limit, cursor=cursor
+    )
+    messages = Message.objects.filter(
+        id__in=[message_id for message_id, _ in hits], sender__is_active=True
+    ).select_related('sender').in_bulk()
+
+    # Résultats sortis de la table chaude: relus dans les archives de leur conversation
+    archived = {}
+    for message_id, hit_conversation_id in hits:
+        if message_id not in messages:
+            archived.setdefault(hit_conversation_id, []).append(message_id)
+    for hit_conversation_id, message_ids in archived.items():
+        messages.update(find_archived(hit_conversation_id, message_ids))
+
+    results = []
+    for message_id, _ in hits:
+        message = messages.get(message_id)
+        if message is None:
+            continue
+        results.append({
+            'message_id': message.id,
+            'conversation_id': message.conversation_id,
+            'sender': {
+                'id': message.sender.id,
+                'username': message.sender.username,
+                'display_name': message.sender.get_full_name() or message.sender.username,
+            },
+            'created_at': message.created_at.isoformat(),
+            'highlight': highlight(message.content, query),
+            # Contexte: GET api/connect/conversations/<id>/messages/?around=<message_id>
+            'context_cursor': message.id,
+        })
+    return results, next_cursor
@@ -0,0 +1,194 @@
+"""
+Métriques quotidiennes (DailyMetric)
+Les séries des pages de statistiques (inscriptions, posts, messages... par jour)
+sont lues dans une table d'agrégats: une requête pour toutes les séries d'une
+page, quelle que soit la période. Une tâche de nuit (commande rollup_metrics)
+recalcule les derniers jours terminés par GROUP BY jour sur les tables sources;
+la même fonction rattrape tout l'historique, par tranches de jours. Les messages
+sortis de la table Message par l'archivage (core.archive) sont comptés dans leurs
+segments: recalculer un jour archivé ne le remet pas à zéro.
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import load_segment
+from .models import Candidature, CustomUser, DailyMetric, Group, Logement, Message, MessageArchive, Post
+
+
+# Métriques calculées. Clés:
+#   model, date_field: lignes comptées par jour de date_field
+#   dimension: champ de ventilation (une ligne par valeur en plus du total)
+#   archived: lignes archivées par core.archive, comptées dans les segments
+METRICS = {
+    'users.new': {'model': CustomUser, 'date_field': 'date_joined'},
+    'posts.new': {'model': Post, 'date_field': 'created_at'},
+    'messages.new': {'model': Message, 'date_field': 'created_at', 'archived': True},
+    'groups.new': {'model': Group, 'date_field': 'created_at'},
+    'logements.new': {'model': Logement, 'date_field': 'date_creation', 'dimension': 'type_logement'},
+    'candidatures.new': {'model': Candidature, 'date_field': 'created_at'},
+}
+
+# Jours terminés recalculés par la tâche de nuit (lignes supprimées ou arrivées en retard)
+METRICS_RECOMPUTE_DAYS = getattr(settings, 'METRICS_RECOMPUTE_DAYS', 3)
+
+# Dimension des lignes sans valeur de ventilation ('' est réservé au total)
+METRICS_EMPTY_DIMENSION = '(aucun)'
+
+# Jours par requête de calcul (rattrapage: une transaction courte par tranche)
+METRICS_SLICE_DAYS = 31
+
+
+def _day_start(day):
+    """Début du jour dans le fuseau courant (bornes comparables à l'index de date_field)"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+# ============================================
+# CALCUL
+# ============================================
+
+def compute(name, start, end):
+    """
+    Valeurs d'une métrique pour les jours [start, end], en une requête GROUP BY jour.
+
+    Returns:
+        dict: {(jour, dimension): valeur}, dimension '' pour le total, METRICS_EMPTY_DIMENSION
+        pour les lignes sans valeur de dimension (jours à 0 absents)
+    """
+    spec = METRICS[name]
+    date_field = spec['date_field']
+    dimension = spec.get('dimension')
+
+    queryset = spec['model'].objects.filter(**{
+        f'{date_field}__gte': _day_start(start),
+        f'{date_field}__lt': _day_start(end + timedelta(days=1)),
+    }).annotate(day=TruncDate(date_field))
+    group = ['day', dimension] if dimension else ['day']
+
+    values = {}
+    for row in queryset.values(*group).annotate(value=Count('pk')).order_by():
+        values[(row['day'], '')] = values.get((row['day'], ''), 0) + row['value']
+        if dimension:
+            key = (row['day'], str(row[dimension] or '') or METRICS_EMPTY_DIMENSION)
+            values[key] = values.get(key, 0) + row['value']
+    if spec.get('archived'):
+        for day, count in archived_counts(start, end).items():
+            values[(day, '')] = values.get((day, ''), 0) + count
+    return values
+
+
+def archived_counts(start, end):
+    """
+    Messages archivés par jour sur [start, end], lus dans les segments qui
+    recoupent la période (aucun pour les jours récents: pas de lecture)
+    """
+    counts = {}
+    archives = MessageArchive.objects.filter(
+        first_created_at__lt=_day_start(end + timedelta(days=1)),
+        last_created_at__gte=_day_start(start),
+    )
+    for archive in archives:
+        for line in load_segment(archive):
+            day = timezone.localtime(line['_key'][0]).date()
+            if start <= day <= end:
+                counts[day] = counts.get(day, 0) + 1
+    return counts
+
+
+def rollup(start, end, names=None, progress=None):
+    """
+    Recalcule les métriques pour les jours [start, end].
+
+    Chaque tranche de METRICS_SLICE_DAYS jours: une requête de calcul, puis en une
+    transaction suppression des anciennes lignes et bulk_create des nouvelles.
+
+    Args:
+        progress: appelé après chaque tranche avec (métrique, dernier jour, statistiques)
+
+    Returns:
+        dict: {'metrics', 'days', 'rows', 'seconds'}
+    """
+    names = names or list(METRICS)
+    stats = {'metrics': len(names), 'days': (end - start).days + 1, 'rows': 0}
+    started = time.monotonic()
+
+    for name in names:
+        low = start
+        while low <= end:
+            high = min(end, low + timedelta(days=METRICS_SLICE_DAYS - 1))
+            values = compute(name, low, high)
+            with transaction.atomic():
+                DailyMetric.objects.filter(metric=name, date__range=(low, high)).delete()
+                DailyMetric.objects.bulk_create([
+                    DailyMetric(date=day, metric=name, dimension=dimension, value=value)
+                    for (day, dimension), value in values.items()
+                ], batch_size=500)
+            stats['rows'] += len(values)
+            if progress:
+                stats['seconds'] = round(time.monotonic() - started, 2)
+                progress(name, high, stats)
+            low = high + timedelta(days=1)
+
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def rollup_recent(days=None, names=None):
+    """Tâche de nuit: recalcule les derniers jours terminés"""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    days = days or METRICS_RECOMPUTE_DAYS
+    return rollup(yesterday - timedelta(days=days - 1), yesterday, names)
+
+
+def backfill(names=None, progress=None):
+    """Rattrapage: tout l'historique de chaque métrique jusqu'à hier"""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    totals = {'metrics': 0, 'days': 0, 'rows': 0, 'seconds': 0}
+    for name in names or list(METRICS):
+        spec = METRICS[name]
+        first = spec['model'].objects.aggregate(first=Min(spec['date_field']))['first']
+        if spec.get('archived'):
+            archived_first = MessageArchive.objects.aggregate(first=Min('first_created_at'))['first']
+            first = min(filter(None, [first, archived_first]), default=None)
+        if first is None or timezone.localtime(first).date() > yesterday:
+            continue
+        stats = rollup(timezone.localtime(first).date(), yesterday, [name], progress)
+        for key in totals:
+            totals[key] += stats[key]
+    return totals
+
+
+# ============================================
+# LECTURE
+# ============================================
+
+def series_many(names, start, end, dimension=''):
+    """
+    Séries quotidiennes de plusieurs métriques sur [start, end], en une requête.
+
+    Returns:
+        dict: {métrique: [{'date': 'AAAA-MM-JJ', 'count': valeur}]}, un point par
+        jour (0 les jours sans ligne)
+    """
+    values = {}
+    for metric, day, value in DailyMetric.objects.filter(
+        metric__in=names, dimension=dimension, date__range=(start, end),
+    ).values_list('metric', 'date', 'value'):
+        values[(metric, day)] = value
+
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return {
+        name: [{'date': day.strftime('%Y-%m-%d'), 'count': values.get((name, day), 0)} for day in days]
+        for name in names
+    }
+
+
+def series(name, start, end, dimension=''):
+    """Série quotidienne d'une métrique (voir series_many)"""
+    return series_many([name], start, end, dimension)[name]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_message_audio_message_audio_duration_call_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationstatus',
+            name='last_delivered_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Délivré à'),
+        ),
+        migrations.AddField(
+            model_name='conversationstatus',
+            name='last_delivered_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message', verbose_name='Dernier message délivré'),
+        ),
+        migrations.AddField(
+            model_name='conversationstatus',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Lu à'),
+        ),
+        migrations.AddField(
+            model_name='conversationstatus',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message', verbose_name='Dernier message lu'),
+        ),
+    ]
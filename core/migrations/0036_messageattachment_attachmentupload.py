@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:04
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_conversationstatus_last_delivered_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageAttachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('image', 'Image'), ('document', 'Document'), ('audio', 'Audio')], default='document', max_length=20, verbose_name='Type')),
+                ('file', models.FileField(upload_to='messages/attachments/%Y/%m/', verbose_name='Fichier')),
+                ('original_name', models.CharField(max_length=255, verbose_name="Nom d'origine")),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Type MIME')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Taille (octets)')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='SHA-256')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='Ordre')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='core.message', verbose_name='Message')),
+            ],
+            options={
+                'verbose_name': 'Pièce jointe de message',
+                'verbose_name_plural': 'Pièces jointes de messages',
+                'ordering': ['message', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttachmentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Type MIME')),
+                ('size', models.BigIntegerField(verbose_name='Taille attendue (octets)')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='SHA-256 attendu')),
+                ('status', models.CharField(choices=[('pending', 'En cours'), ('complete', 'Terminé'), ('attached', 'Attaché à un message'), ('failed', 'Échec')], default='pending', max_length=20, verbose_name='Statut')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé à')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachment_uploads', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Téléversement de pièce jointe',
+                'verbose_name_plural': 'Téléversements de pièces jointes',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'status'], name='core_attach_user_id_68b11d_idx'), models.Index(fields=['status', 'created_at'], name='core_attach_status_e0fbff_idx')],
+            },
+        ),
+    ]
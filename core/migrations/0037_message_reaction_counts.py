@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_reaction_counts(apps, schema_editor):
+    """Calculer les compteurs de réactions des messages existants"""
+    Message = apps.get_model('core', 'Message')
+    MessageReaction = apps.get_model('core', 'MessageReaction')
+
+    counts = {}
+    rows = MessageReaction.objects.values('message_id', 'emoji').annotate(total=Count('id')).order_by()
+    for row in rows.iterator():
+        counts.setdefault(row['message_id'], {})[row['emoji']] = row['total']
+
+    messages = []
+    for message in Message.objects.filter(id__in=list(counts)).only('id').iterator():
+        message.reaction_counts = counts[message.id]
+        messages.append(message)
+        if len(messages) >= 1000:
+            Message.objects.bulk_update(messages, ['reaction_counts'])
+            messages = []
+    if messages:
+        Message.objects.bulk_update(messages, ['reaction_counts'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_messageattachment_attachmentupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='reaction_counts',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Compteurs de réactions'),
+        ),
+        migrations.RunPython(backfill_reaction_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_message_reaction_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Terme normalisé')),
+                ('message_id', models.BigIntegerField(verbose_name='Message')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='core.conversation', verbose_name='Conversation')),
+            ],
+            options={
+                'verbose_name': 'Terme de recherche (messages)',
+                'verbose_name_plural': 'Index de recherche (messages)',
+                'indexes': [models.Index(fields=['term', 'conversation', 'message_id'], name='core_messag_term_b5eb5a_idx'), models.Index(fields=['message_id'], name='core_messag_message_7a358b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_message_search_term'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='messages/archives/%Y/%m/', verbose_name="Fichier d'archive")),
+                ('codec', models.CharField(choices=[('gzip', 'gzip'), ('zstd', 'zstd')], default='gzip', max_length=10, verbose_name='Compression')),
+                ('message_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de messages')),
+                ('first_message_id', models.BigIntegerField(verbose_name='Premier message')),
+                ('last_message_id', models.BigIntegerField(verbose_name='Dernier message')),
+                ('first_created_at', models.DateTimeField(verbose_name='Date du premier message')),
+                ('last_created_at', models.DateTimeField(verbose_name='Date du dernier message')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Taille compressée (octets)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Archivé le')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='core.conversation', verbose_name='Conversation')),
+            ],
+            options={
+                'verbose_name': 'Archive de messages',
+                'verbose_name_plural': 'Archives de messages',
+                'ordering': ['conversation', '-last_created_at'],
+                'indexes': [models.Index(fields=['conversation', 'last_created_at'], name='core_messag_convers_f05fb9_idx'), models.Index(fields=['conversation', 'first_message_id', 'last_message_id'], name='core_messag_convers_29f033_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_message_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='call',
+            name='started_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Début'),
+        ),
+    ]
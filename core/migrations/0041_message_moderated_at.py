@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_call_started_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Modéré automatiquement le'),
+        ),
+    ]
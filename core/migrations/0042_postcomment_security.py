@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_message_moderated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postcomment',
+            name='is_fraud',
+            field=models.BooleanField(default=False, verbose_name='Arnaque détectée'),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='is_inappropriate',
+            field=models.BooleanField(default=False, verbose_name='Contenu inapproprié'),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='is_quarantined',
+            field=models.BooleanField(default=False, verbose_name='En quarantaine'),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='is_spam',
+            field=models.BooleanField(default=False, verbose_name='Spam détecté'),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='security_score',
+            field=models.IntegerField(default=0, verbose_name='Score de sécurité (0-100)'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_postcomment_security'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationIntent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(verbose_name='Contenu et destinataires')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours'), ('done', 'Distribuée'), ('failed', 'Échec')], default='pending', max_length=20, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponible à partir de')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Prise en charge à')),
+                ('delivered_count', models.PositiveIntegerField(default=0, verbose_name='Notifications créées')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notification à distribuer',
+                'verbose_name_plural': 'Notifications à distribuer',
+                'ordering': ['available_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='core_notifi_status_02c4f1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_notificationintent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usernotification',
+            index=models.Index(condition=models.Q(('email_sent', False), ('read', False)), fields=['user', 'id'], name='notification_digest_idx'),
+        ),
+    ]
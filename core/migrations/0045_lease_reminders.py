@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_usernotification_digest_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RappelBailEnvoye',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_rappel', models.CharField(choices=[('loyer', 'Loyer à payer'), ('assurance', 'Assurance à renouveler'), ('fin_bail_90', 'Fin de bail dans 3 mois'), ('fin_bail_30', 'Fin de bail dans 1 mois')], max_length=20, verbose_name='Type de rappel')),
+                ('date_cible', models.DateField(verbose_name='Date concernée')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Rappel de bail envoyé',
+                'verbose_name_plural': 'Rappels de bail envoyés',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bail',
+            index=models.Index(fields=['statut', 'date_fin'], name='core_bail_statut_c5b465_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bail',
+            index=models.Index(fields=['statut', 'assurance_date_echeance'], name='core_bail_statut_9df51f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paiementloyer',
+            index=models.Index(fields=['statut', 'date_echeance'], name='core_paieme_statut_57948b_idx'),
+        ),
+        migrations.AddField(
+            model_name='rappelbailenvoye',
+            name='bail',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rappels_envoyes', to='core.bail', verbose_name='Bail'),
+        ),
+        migrations.AddConstraint(
+            model_name='rappelbailenvoye',
+            constraint=models.UniqueConstraint(fields=('bail', 'type_rappel', 'date_cible'), name='unique_rappel_bail_envoye'),
+        ),
+    ]
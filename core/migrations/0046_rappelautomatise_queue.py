@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_lease_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rappelautomatise',
+            name='derniere_erreur',
+            field=models.TextField(blank=True, default='', verbose_name='Dernière erreur'),
+        ),
+        migrations.AddField(
+            model_name='rappelautomatise',
+            name='reserve_le',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Réservé par un worker le'),
+        ),
+        migrations.AddField(
+            model_name='rappelautomatise',
+            name='tentatives',
+            field=models.IntegerField(default=0, verbose_name='Tentatives échouées'),
+        ),
+        migrations.AddIndex(
+            model_name='rappelautomatise',
+            index=models.Index(condition=models.Q(('envoye', False)), fields=['date_rappel', 'id'], name='rappel_due_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_rappelautomatise_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Jour')),
+                ('metric', models.CharField(max_length=50, verbose_name='Métrique')),
+                ('dimension', models.CharField(blank=True, default='', max_length=100, verbose_name='Dimension')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Valeur')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Métrique quotidienne',
+                'verbose_name_plural': 'Métriques quotidiennes',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'dimension', 'date'), name='unique_daily_metric')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_daily_metric'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(fields=['user', '-timestamp'], name='core_loginh_user_id_c9b7a0_idx'),
+        ),
+    ]
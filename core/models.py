@@ -395,6 +395,9 @@ class Bail(models.Model):
             models.Index(fields=['locataire', 'statut']),
             models.Index(fields=['proprietaire', 'statut']),
             models.Index(fields=['date_debut', 'date_fin']),
+            # Rappels d'échéance (core.leases)
+            models.Index(fields=['statut', 'date_fin']),
+            models.Index(fields=['statut', 'assurance_date_echeance']),
         ]
     
     def __str__(self):
@@ -463,6 +466,7 @@ class PaiementLoyer(models.Model):
         indexes = [
             models.Index(fields=['bail', '-date_echeance']),
             models.Index(fields=['locataire', 'statut']),
+            models.Index(fields=['statut', 'date_echeance']),
         ]
     
     def __str__(self):
@@ -983,6 +987,11 @@ class RappelAutomatise(models.Model):
     nombre_repetitions = models.IntegerField(default=0, verbose_name="Nombre de répétitions")
     repetitions_effectuees = models.IntegerField(default=0, verbose_name="Répétitions effectuées")
     
+    # Traitement (core.leases: file des rappels dus)
+    reserve_le = models.DateTimeField(blank=True, null=True, verbose_name="Réservé par un worker le")
+    tentatives = models.IntegerField(default=0, verbose_name="Tentatives échouées")
+    derniere_erreur = models.TextField(blank=True, default='', verbose_name="Dernière erreur")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -993,12 +1002,39 @@ class RappelAutomatise(models.Model):
             models.Index(fields=['bail', 'date_rappel']),
             models.Index(fields=['destinataire', 'envoye']),
             models.Index(fields=['type_rappel', 'date_rappel']),
+            # File des rappels dus: seuls les rappels non envoyés sont indexés
+            models.Index(fields=['date_rappel', 'id'], condition=Q(envoye=False), name='rappel_due_queue_idx'),
         ]
     
     def __str__(self):
         return f"{self.titre} - {self.destinataire.username}"
 
 
+class RappelBailEnvoye(models.Model):
+    """Rappel d'échéance de bail déjà envoyé (une ligne par bail, type et date: rend l'envoi idempotent)"""
+    TYPE_CHOICES = [
+        ('loyer', 'Loyer à payer'),
+        ('assurance', 'Assurance à renouveler'),
+        ('fin_bail_90', 'Fin de bail dans 3 mois'),
+        ('fin_bail_30', 'Fin de bail dans 1 mois'),
+    ]
+    
+    bail = models.ForeignKey(Bail, on_delete=models.CASCADE, related_name='rappels_envoyes', verbose_name="Bail")
+    type_rappel = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name="Type de rappel")
+    date_cible = models.DateField(verbose_name="Date concernée")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Rappel de bail envoyé"
+        verbose_name_plural = "Rappels de bail envoyés"
+        constraints = [
+            models.UniqueConstraint(fields=['bail', 'type_rappel', 'date_cible'], name='unique_rappel_bail_envoye'),
+        ]
+    
+    def __str__(self):
+        return f"{self.bail_id} - {self.type_rappel} - {self.date_cible}"
+
+
 # ============================================
 # FIN GESTION BAIL AVANCÉE
 # ============================================
@@ -1308,6 +1344,10 @@ class LoginHistory(models.Model):
         ordering = ['-timestamp']
         verbose_name = "Historique de connexion"
         verbose_name_plural = "Historiques de connexion"
+        indexes = [
+            # Historique d'un utilisateur, plafond de rétention (core.retention)
+            models.Index(fields=['user', '-timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.timestamp}"
@@ -1612,6 +1652,11 @@ class UserNotification(models.Model):
             models.Index(fields=['user', 'notification_type', '-created_at']),
             models.Index(fields=['from_user', '-created_at']),
             models.Index(fields=['feedback_not_interested']),
+            # Résumés email: notifications en attente, dans l'ordre de lecture (core.digests)
+            models.Index(
+                fields=['user', 'id'], condition=Q(read=False, email_sent=False),
+                name='notification_digest_idx',
+            ),
         ]
     
     def __str__(self):
@@ -1670,6 +1715,36 @@ class UserNotification(models.Model):
         return '/connect/notifications/'
 
 
+class NotificationIntent(models.Model):
+    """Notification en attente de distribution (file durable de core.notifications)"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('processing', 'En cours'),
+        ('done', 'Distribuée'),
+        ('failed', 'Échec'),
+    ]
+    
+    payload = models.JSONField(verbose_name="Contenu et destinataires")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Disponible à partir de")
+    claimed_at = models.DateTimeField(blank=True, null=True, verbose_name="Prise en charge à")
+    delivered_count = models.PositiveIntegerField(default=0, verbose_name="Notifications créées")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['available_at', 'id']
+        verbose_name = "Notification à distribuer"
+        verbose_name_plural = "Notifications à distribuer"
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.payload.get('notification_type')} ({self.status})"
+
+
 # ============================================
 # ALERTES DE SÉCURITÉ
 # ============================================
@@ -1807,6 +1882,7 @@ class Message(models.Model):
     spam_reason = models.CharField(max_length=200, blank=True, null=True, verbose_name="Raison du spam")
     security_score = models.IntegerField(default=0, verbose_name="Score de sécurité (0-100)")
     reviewed_by_admin = models.BooleanField(default=False, verbose_name="Révisé par admin")
+    moderated_at = models.DateTimeField(blank=True, null=True, db_index=True, verbose_name="Modéré automatiquement le")
     
     # Nouveaux champs pour fonctionnalités avancées
     is_pinned = models.BooleanField(default=False, verbose_name="Message épinglé")
@@ -1828,6 +1904,9 @@ class Message(models.Model):
     # Lien avec appel (si message lié à un appel)
     call = models.ForeignKey('Call', on_delete=models.SET_NULL, null=True, blank=True, related_name='messages', verbose_name="Appel associé")
     
+    # Résumé des réactions {emoji: nombre}, maintenu incrémentalement (core.reactions)
+    reaction_counts = models.JSONField(default=dict, blank=True, verbose_name="Compteurs de réactions")
+    
     class Meta:
         ordering = ['created_at']
         verbose_name = "Message"
@@ -1846,37 +1925,29 @@ class Message(models.Model):
         if not self.read:
             self.read = True
             self.read_at = timezone.now()
-            self.save()
+            self.save(update_fields=['read', 'read_at'])
     
     def has_attachment(self):
         """Vérifie si le message a une pièce jointe"""
-        return bool(self.image or self.document)
+        return bool(self.image or self.document or self.attachments.exists())
     
     def check_suspicious_content(self):
         """Vérifie si le contenu est suspect (spam, arnaque, etc.)"""
-        suspicious_keywords = [
-            'virement', 'argent', 'prêt', 'gagner', 'gratuit', 'urgent',
-            'cliquez ici', 'offre limitée', 'héritage', 'loterie',
-            'compte suspendu', 'vérifier votre compte', 'banque'
-        ]
-        suspicious_domains = ['bit.ly', 'tinyurl.com', 't.co']
+        from .security import MESSAGE_SUSPICIOUS_DOMAINS, MESSAGE_SUSPICIOUS_KEYWORDS, scan_content
         
-        content_lower = self.content.lower()
+        scan = scan_content(self.content)
         
         # Vérifier les mots-clés suspects
-        for keyword in suspicious_keywords:
-            if keyword in content_lower:
+        found = scan['keywords'].get('message', ())
+        for keyword in MESSAGE_SUSPICIOUS_KEYWORDS:
+            if keyword in found:
                 self.is_suspicious = True
                 self.spam_reason = f"Mot-clé suspect détecté: {keyword}"
                 return True
         
         # Vérifier les liens suspects
-        import re
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        urls = re.findall(url_pattern, self.content)
-        
-        for url in urls:
-            for domain in suspicious_domains:
+        for url in scan['urls']:
+            for domain in MESSAGE_SUSPICIOUS_DOMAINS:
                 if domain in url:
                     self.is_suspicious = True
                     self.spam_reason = f"Lien suspect détecté: {domain}"
@@ -1885,6 +1956,123 @@ class Message(models.Model):
         return False
 
 
+class MessageAttachment(models.Model):
+    """Pièce jointe d'un message (un message peut en avoir plusieurs)"""
+    KIND_CHOICES = [
+        ('image', 'Image'),
+        ('document', 'Document'),
+        ('audio', 'Audio'),
+    ]
+    
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='attachments', verbose_name="Message")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='document', verbose_name="Type")
+    file = models.FileField(upload_to='messages/attachments/%Y/%m/', verbose_name="Fichier")
+    original_name = models.CharField(max_length=255, verbose_name="Nom d'origine")
+    content_type = models.CharField(max_length=100, blank=True, verbose_name="Type MIME")
+    size = models.BigIntegerField(default=0, verbose_name="Taille (octets)")
+    checksum = models.CharField(max_length=64, blank=True, verbose_name="SHA-256")
+    position = models.PositiveSmallIntegerField(default=0, verbose_name="Ordre")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['message', 'position']
+        verbose_name = "Pièce jointe de message"
+        verbose_name_plural = "Pièces jointes de messages"
+    
+    def __str__(self):
+        return f"{self.original_name} (message {self.message_id})"
+
+
+class AttachmentUpload(models.Model):
+    """Téléversement fractionné et reprenable d'une pièce jointe"""
+    STATUS_CHOICES = [
+        ('pending', 'En cours'),
+        ('complete', 'Terminé'),
+        ('attached', 'Attaché à un message'),
+        ('failed', 'Échec'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='attachment_uploads', verbose_name="Utilisateur")
+    filename = models.CharField(max_length=255, verbose_name="Nom du fichier")
+    content_type = models.CharField(max_length=100, blank=True, verbose_name="Type MIME")
+    size = models.BigIntegerField(verbose_name="Taille attendue (octets)")
+    checksum = models.CharField(max_length=64, blank=True, verbose_name="SHA-256 attendu")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True, verbose_name="Terminé à")
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Téléversement de pièce jointe"
+        verbose_name_plural = "Téléversements de pièces jointes"
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Upload {self.filename} ({self.get_status_display()})"
+
+
+class MessageArchive(models.Model):
+    """
+    Segment d'archive froide d'une conversation : messages anciens sortis de la
+    table Message, stockés compressés (une ligne JSON par message).
+    """
+    CODEC_CHOICES = [
+        ('gzip', 'gzip'),
+        ('zstd', 'zstd'),
+    ]
+    
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archives', verbose_name="Conversation")
+    file = models.FileField(upload_to='messages/archives/%Y/%m/', verbose_name="Fichier d'archive")
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES, default='gzip', verbose_name="Compression")
+    message_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de messages")
+    first_message_id = models.BigIntegerField(verbose_name="Premier message")
+    last_message_id = models.BigIntegerField(verbose_name="Dernier message")
+    first_created_at = models.DateTimeField(verbose_name="Date du premier message")
+    last_created_at = models.DateTimeField(verbose_name="Date du dernier message")
+    size = models.BigIntegerField(default=0, verbose_name="Taille compressée (octets)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Archivé le")
+    
+    class Meta:
+        ordering = ['conversation', '-last_created_at']
+        verbose_name = "Archive de messages"
+        verbose_name_plural = "Archives de messages"
+        indexes = [
+            models.Index(fields=['conversation', 'last_created_at']),
+            models.Index(fields=['conversation', 'first_message_id', 'last_message_id']),
+        ]
+    
+    def __str__(self):
+        return f"Archive conversation {self.conversation_id} ({self.message_count} messages)"
+
+
+class MessageSearchTerm(models.Model):
+    """
+    Entrée de l'index inversé de recherche dans les messages (terme -> message).
+
+    Partitionné par conversation : une recherche ne lit que les entrées des
+    conversations de l'utilisateur. message_id n'est pas une clé étrangère afin
+    que l'index survive à l'archivage des messages.
+    """
+    term = models.CharField(max_length=64, verbose_name="Terme normalisé")
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='search_terms', verbose_name="Conversation")
+    message_id = models.BigIntegerField(verbose_name="Message")
+    
+    class Meta:
+        verbose_name = "Terme de recherche (messages)"
+        verbose_name_plural = "Index de recherche (messages)"
+        indexes = [
+            models.Index(fields=['term', 'conversation', 'message_id']),
+            models.Index(fields=['message_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} -> message {self.message_id}"
+
+
 # ============================================
 # TRANSPAREO CONNECT - STATUT CONVERSATION
 # ============================================
@@ -1895,6 +2083,13 @@ class ConversationStatus(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='conversation_statuses')
     archived = models.BooleanField(default=False, verbose_name="Archivée")
     favorited = models.BooleanField(default=False, verbose_name="Favoris")
+    
+    # Accusés de lecture/réception (marqueur haut par participant)
+    last_read_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Dernier message lu")
+    last_read_at = models.DateTimeField(blank=True, null=True, verbose_name="Lu à")
+    last_delivered_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Dernier message délivré")
+    last_delivered_at = models.DateTimeField(blank=True, null=True, verbose_name="Délivré à")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -2331,7 +2526,7 @@ class Call(models.Model):
     participants = models.ManyToManyField(CustomUser, related_name='calls_participated', verbose_name="Participants")
     
     # Dates
-    started_at = models.DateTimeField(auto_now_add=True, verbose_name="Début")
+    started_at = models.DateTimeField(default=timezone.now, verbose_name="Début")
     answered_at = models.DateTimeField(blank=True, null=True, verbose_name="Répondu à")
     ended_at = models.DateTimeField(blank=True, null=True, verbose_name="Terminé à")
     duration = models.IntegerField(blank=True, null=True, verbose_name="Durée (secondes)")
@@ -2565,6 +2760,13 @@ class PostComment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     likes_count = models.IntegerField(default=0)
     
+    # Sécurité & Modération
+    is_quarantined = models.BooleanField(default=False, verbose_name="En quarantaine")
+    is_spam = models.BooleanField(default=False, verbose_name="Spam détecté")
+    is_fraud = models.BooleanField(default=False, verbose_name="Arnaque détectée")
+    is_inappropriate = models.BooleanField(default=False, verbose_name="Contenu inapproprié")
+    security_score = models.IntegerField(default=0, verbose_name="Score de sécurité (0-100)")
+    
     class Meta:
         ordering = ['created_at']
         verbose_name = "Commentaire"
@@ -5172,4 +5374,34 @@ class ActivityLog(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.admin.username if self.admin else 'Unknown'} - {self.get_action_display()} - {self.get_resource_type_display()} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
\ No newline at end of file
+        return f"{self.admin.username if self.admin else 'Unknown'} - {self.get_action_display()} - {self.get_resource_type_display()} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
+
+
+# ============================================
+# MÉTRIQUES QUOTIDIENNES
+# ============================================
+
+class DailyMetric(models.Model):
+    """
+    Agrégat quotidien d'une métrique (core.metrics): une ligne par jour, par
+    métrique et par dimension ('' pour le total). Calculé chaque nuit et rattrapé
+    en masse; les pages de statistiques lisent une série en une requête.
+    """
+    date = models.DateField(verbose_name="Jour")
+    metric = models.CharField(max_length=50, verbose_name="Métrique")
+    dimension = models.CharField(max_length=100, blank=True, default='', verbose_name="Dimension")
+    value = models.BigIntegerField(default=0, verbose_name="Valeur")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date']
+        verbose_name = "Métrique quotidienne"
+        verbose_name_plural = "Métriques quotidiennes"
+        constraints = [
+            # Sert aussi la lecture d'une série (métrique, dimension, plage de dates)
+            models.UniqueConstraint(fields=['metric', 'dimension', 'date'], name='unique_daily_metric'),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric}[{self.dimension}] {self.date}: {self.value}"
@@ -0,0 +1,336 @@
+"""
+Modération automatique des messages, hors du chemin de la requête
+Les messages sont mis en file après la validation de leur transaction ; un groupe
+de workers (threads) les analyse par lots avec core.security et écrit les résultats
+(spam, score de sécurité, quarantaine) en une requête par lot. L'envoi d'un message
+ne paie que le coût d'un ajout en file.
+La re-analyse de l'historique (posts, commentaires, messages) après un changement
+des listes de détection passe par la commande rescan_moderation. Les messages
+jamais analysés (file perdue au redémarrage, file pleine) sont repris par la
+commande moderate_pending_messages, à planifier toutes les quelques minutes
+(cron: */5 * * * * manage.py moderate_pending_messages) ou à lancer en continu
+avec --loop.
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import Message, Post, PostComment
+from .security import detect_suspicious_content
+
+logger = logging.getLogger(__name__)
+
+
+# Nombre de threads d'analyse
+MODERATION_WORKERS = getattr(settings, 'MODERATION_WORKERS', 2)
+
+# Nombre maximal de messages analysés par lot
+MODERATION_BATCH_SIZE = getattr(settings, 'MODERATION_BATCH_SIZE', 100)
+
+# Attente maximale (secondes) pour compléter un lot avant de l'analyser
+MODERATION_BATCH_WAIT = getattr(settings, 'MODERATION_BATCH_WAIT', 0.5)
+
+# Taille maximale de la file; au-delà les messages restent à "moderated_at" nul
+# et sont repris par moderate_pending_messages() (commande du même nom)
+MODERATION_QUEUE_SIZE = getattr(settings, 'MODERATION_QUEUE_SIZE', 10000)
+
+MODERATION_FIELDS = [
+    'is_spam', 'is_fraud', 'is_inappropriate', 'is_suspicious', 'is_quarantined',
+    'security_score', 'spam_reason', 'moderated_at',
+]
+
+# Champs de sécurité communs aux posts et aux commentaires
+CONTENT_FLAG_FIELDS = ['is_spam', 'is_fraud', 'is_inappropriate', 'is_quarantined', 'security_score']
+
+
+# ============================================
+# ANALYSE
+# ============================================
+
+def _result_reasons(result):
+    return result['spam']['reasons'] + result['fraud']['reasons'] + result['inappropriate']['reasons']
+
+
+def apply_moderation(message, result=None):
+    """Reporte le résultat de l'analyse sur le message (sans l'enregistrer)"""
+    result = result or detect_suspicious_content(message.content or '', message.sender)
+    reasons = _result_reasons(result)
+
+    message.is_spam = result['spam']['is_spam']
+    message.is_fraud = result['fraud']['is_fraud']
+    message.is_inappropriate = result['inappropriate']['is_inappropriate']
+    message.is_suspicious = result['is_suspicious']
+    message.security_score = result['max_score']
+    message.spam_reason = reasons[0][:200] if reasons else None
+    # Une quarantaine posée par un administrateur n'est jamais levée automatiquement
+    message.is_quarantined = message.is_quarantined or result['should_quarantine']
+    message.moderated_at = timezone.now()
+    return message
+
+
+def moderate_messages(message_ids):
+    """
+    Analyse un lot de messages et enregistre les résultats (une lecture, une écriture).
+
+    Returns:
+        int: nombre de messages analysés
+    """
+    messages = list(
+        Message.objects.filter(id__in=message_ids, reviewed_by_admin=False).select_related('sender')
+    )
+    for message in messages:
+        apply_moderation(message)
+    Message.objects.bulk_update(messages, MODERATION_FIELDS, batch_size=500)
+    return len(messages)
+
+
+def moderate_pending_messages(limit=None, older_than=None):
+    """
+    Analyse les messages jamais modérés (file perdue au redémarrage, file pleine).
+
+    Args:
+        older_than: ignorer les messages de moins de older_than secondes (encore
+            dans la file des workers)
+    """
+    pending = Message.objects.filter(moderated_at__isnull=True, reviewed_by_admin=False)
+    if older_than:
+        pending = pending.filter(created_at__lt=timezone.now() - timedelta(seconds=older_than))
+    pending = pending.order_by('id').values_list('id', flat=True)
+    if limit:
+        pending = pending[:limit]
+    pending = list(pending)
+    total = 0
+    for start in range(0, len(pending), MODERATION_BATCH_SIZE):
+        total += moderate_messages(pending[start:start + MODERATION_BATCH_SIZE])
+    return total
+
+
+# ============================================
+# RE-ANALYSE EN MASSE
+# ============================================
+
+def apply_content_flags(obj, result):
+    """Reporte le résultat de l'analyse sur un post ou un commentaire (sans l'enregistrer)"""
+    was_quarantined = obj.is_quarantined
+    obj.is_spam = result['spam']['is_spam']
+    obj.is_fraud = result['fraud']['is_fraud']
+    obj.is_inappropriate = result['inappropriate']['is_inappropriate']
+    obj.security_score = result['max_score']
+    obj.is_quarantined = was_quarantined or result['should_quarantine']
+    if obj.is_quarantined and not was_quarantined and hasattr(obj, 'quarantine_reason'):
+        reasons = _result_reasons(result)
+        obj.quarantine_reason = reasons[0] if reasons else None
+    return obj
+
+
+# Tables re-analysables: champs lus, champs réécrits, lignes exclues
+RESCAN_TARGETS = {
+    'message': {
+        'model': Message,
+        'load': ['id', 'is_quarantined'],
+        'fields': MODERATION_FIELDS,
+        'filter': {'reviewed_by_admin': False},
+        'apply': apply_moderation,
+    },
+    'post': {
+        'model': Post,
+        'load': ['id', 'is_quarantined', 'quarantine_reason'],
+        'fields': CONTENT_FLAG_FIELDS + ['quarantine_reason'],
+        'filter': {'reviewed_by_admin': False},
+        'apply': apply_content_flags,
+    },
+    'comment': {
+        'model': PostComment,
+        'load': ['id', 'is_quarantined'],
+        'fields': CONTENT_FLAG_FIELDS,
+        'filter': {},
+        'apply': apply_content_flags,
+    },
+}
+
+
+def rescan_queryset(target, after_id=0):
+    """Lignes à analyser (id, contenu et champs conservés), par id croissant"""
+    spec = RESCAN_TARGETS[target]
+    return spec['model'].objects.filter(
+        id__gt=after_id, **spec['filter']
+    ).order_by('id').values(*spec['load'], 'content')
+
+
+def iter_rescan_chunks(target, after_id=0, chunk_size=2000):
+    """
+    Lots de lignes ordonnés par id.
+
+    Sur PostgreSQL la table est lue en flux par un curseur côté serveur (une seule
+    requête, mémoire bornée au lot); ailleurs par pagination sur l'id, les écritures
+    entre deux lots ne devant pas partager le curseur de lecture.
+    """
+    queryset = rescan_queryset(target, after_id)
+    if connections[queryset.db].vendor == 'postgresql':
+        chunk = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+
+    while True:
+        chunk = list(queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        queryset = rescan_queryset(target, chunk[-1]['id'])
+
+
+def save_rescan_results(target, rows, results):
+    """
+    Écrit les résultats d'un lot en une mise à jour groupée.
+
+    Args:
+        rows: lignes du lot (dicts de rescan_queryset)
+        results: {id: résultat de detect_suspicious_content}
+
+    Returns:
+        int: nombre de lignes mises à jour
+    """
+    spec = RESCAN_TARGETS[target]
+    objects = []
+    for row in rows:
+        obj = spec['model'](**{field: row[field] for field in spec['load']})
+        spec['apply'](obj, results[row['id']])
+        objects.append(obj)
+    spec['model'].objects.bulk_update(objects, spec['fields'], batch_size=500)
+    return len(objects)
+
+
+# ============================================
+# FILE ET WORKERS
+# ============================================
+
+class ModerationStats:
+    """Compteurs de débit du pipeline (par processus)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.processed = 0
+            self.batches = 0
+            self.errors = 0
+            self.dropped = 0
+            self.busy_seconds = 0.0
+
+    def record_batch(self, count, elapsed):
+        with self._lock:
+            self.processed += count
+            self.batches += 1
+            self.busy_seconds += elapsed
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def snapshot(self, pending=0):
+        with self._lock:
+            return {
+                'processed': self.processed,
+                'batches': self.batches,
+                'errors': self.errors,
+                'dropped': self.dropped,
+                'pending': pending,
+                'messages_per_second': round(self.processed / self.busy_seconds, 1) if self.busy_seconds else None,
+            }
+
+
+class ModerationPipeline:
+    """File des messages à modérer et workers qui la vident par lots"""
+
+    def __init__(self, workers=MODERATION_WORKERS, batch_size=MODERATION_BATCH_SIZE,
+                 batch_wait=MODERATION_BATCH_WAIT, maxsize=MODERATION_QUEUE_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.stats = ModerationStats()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, message_id):
+        """Ajoute un message à la file (ne bloque jamais l'appelant)"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(message_id)
+        except queue.Full:
+            self.stats.record_drop()
+
+    def _ensure_started(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._run, name=f'moderation-{len(self._threads)}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+            try:
+                close_old_connections()
+                count = moderate_messages(batch)
+                self.stats.record_batch(count, time.monotonic() - started)
+            except Exception:
+                logger.exception("Échec de modération d'un lot de %d message(s)", len(batch))
+                self.stats.record_error()
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self.queue.task_done()
+
+    def join(self):
+        """Attend que la file soit vide (commandes de maintenance)"""
+        self.queue.join()
+
+
+moderation_pipeline = ModerationPipeline()
+
+
+def enqueue_message_moderation(message_id):
+    """Planifie la modération d'un message après validation de la transaction courante"""
+    transaction.on_commit(lambda: moderation_pipeline.enqueue(message_id))
+
+
+def moderation_stats():
+    """Débit et état de la file de modération"""
+    return moderation_pipeline.stats.snapshot(pending=moderation_pipeline.queue.qsize())
@@ -0,0 +1,711 @@
+"""
+Distribution des notifications de Transpareo Connect
+notify() met en file une intention (type, contenu, liens, destinataires explicites
+ou audience à développer: membres d'un groupe, participants d'un meetup...). Un
+worker développe l'audience, lit les préférences de tous les destinataires d'un
+lot en deux requêtes, crée les UserNotification par bulk_create puis les route:
+in-app (la ligne elle-même), WebSocket (groupe user_<id>) et email immédiat (une
+connexion SMTP par lot). Les emails quotidiens/hebdomadaires relèvent du résumé (core.digests).
+
+Deux files: "local" (threads du processus, pour le développement et les tests) et
+"database" (table NotificationIntent, vidée par la commande process_notifications).
+"""
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    CustomUser, GroupMeetup, GroupMembership, GroupSondage, NotificationIntent,
+    NotificationPreference, UserNotification,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# File utilisée par notify(): "local" ou "database"
+NOTIFICATION_QUEUE_BACKEND = getattr(settings, 'NOTIFICATION_QUEUE_BACKEND', 'local')
+
+# Destinataires traités par lot (préférences + bulk_create)
+NOTIFICATION_BATCH_SIZE = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+
+# Threads de la file locale
+NOTIFICATION_WORKERS = getattr(settings, 'NOTIFICATION_WORKERS', 1)
+
+# File durable: tentatives maximales, et délai après lequel une intention prise en
+# charge par un worker disparu est reprise (secondes)
+NOTIFICATION_MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+NOTIFICATION_CLAIM_TIMEOUT = getattr(settings, 'NOTIFICATION_CLAIM_TIMEOUT', 300)
+
+# Catégorie de chaque type (filtres de NotificationPreference)
+TYPE_CATEGORIES = {
+    'social': ['connection_accepted', 'connection_request', 'follow', 'invitation_received'],
+    'content': [
+        'post_liked', 'post_commented', 'post_reaction', 'comment_replied', 'post_mentioned',
+        'comment_mentioned', 'post_shared', 'collaborative_post_joined',
+    ],
+    'messages': ['new_message', 'message_reaction', 'message_mentioned'],
+    'groups': ['group_invitation', 'group_post', 'group_meetup', 'group_sondage', 'group_question_answered'],
+    'properties': ['property_updated', 'property_favorited', 'review_received', 'review_replied'],
+    'lease': [
+        'bail_payment_due', 'bail_payment_received', 'bail_document_signed',
+        'bail_maintenance_request', 'bail_ticket_created', 'bail_ticket_resolved', 'bail_reminder',
+    ],
+    'security': ['verification_approved', 'verification_rejected', 'security', 'login_new_device'],
+    'system': ['system', 'badge_earned'],
+}
+CATEGORY_BY_TYPE = {t: category for category, types in TYPE_CATEGORIES.items() for t in types}
+
+# Importance par défaut (moyenne pour les autres types)
+TYPE_IMPORTANCE = {
+    'security': 'high',
+    'login_new_device': 'high',
+    'verification_rejected': 'high',
+    'bail_payment_due': 'high',
+    'bail_reminder': 'high',
+}
+
+RELATED_FIELDS = ['post', 'comment', 'conversation', 'group', 'logement']
+
+# Notifications renvoyées au plus lors d'une reprise après reconnexion
+NOTIFICATION_RESUME_LIMIT = getattr(settings, 'NOTIFICATION_RESUME_LIMIT', 50)
+
+# Regroupement: une nouvelle occurrence d'un type regroupable (même destinataire,
+# même publication ou même groupe) remplace la notification existante si celle-ci
+# date de moins de NOTIFICATION_COLLAPSE_WINDOW secondes, au lieu de s'y ajouter.
+# La notification regroupée est réinsérée (nouvel id) et l'ancienne ligne supprimée:
+# la reprise par id (notifications_since) la renvoie aux clients déconnectés.
+NOTIFICATION_COLLAPSE_WINDOW = getattr(settings, 'NOTIFICATION_COLLAPSE_WINDOW', 24 * 3600)
+
+# Auteurs récents conservés dans extra_data['recent_actors']
+NOTIFICATION_COLLAPSE_ACTORS = getattr(settings, 'NOTIFICATION_COLLAPSE_ACTORS', 3)
+
+# Types regroupables: élément lié servant de clé, titre au-delà d'un auteur
+COLLAPSE_RULES = {
+    'post_liked': ('post', '{actor} et {others} autre(s) ont aimé votre publication'),
+    'post_reaction': ('post', '{actor} et {others} autre(s) ont réagi à votre publication'),
+    'post_commented': ('post', '{actor} et {others} autre(s) ont commenté votre publication'),
+    'group_post': ('group', '{actor} et {others} autre(s) ont publié dans un de vos groupes'),
+}
+
+
+# ============================================
+# INTENTIONS
+# ============================================
+
+def build_intent(notification_type, title, message, recipients=None, audience=None, exclude=None,
+                 from_user=None, icon='🔔', action_url=None, category=None, importance=None,
+                 extra_data=None, channels=None, **related):
+    """
+    Intention de notification sérialisable (JSON).
+
+    Args:
+        recipients: utilisateurs ou identifiants destinataires
+        audience: destinataires à développer par le worker, ex. {'group': 12}
+            (membres acceptés), {'meetup': 3}, {'sondage': 5}, {'conversation': 8}
+        exclude: utilisateurs ou identifiants à ne pas notifier (l'auteur, en général)
+        channels: canaux externes à couper, ex. {'email': False} (les préférences
+            du destinataire s'appliquent aux autres)
+        related: related_post=..., related_group=... (objets ou identifiants)
+    """
+    def as_id(value):
+        return getattr(value, 'pk', value)
+
+    payload = {
+        'notification_type': notification_type,
+        'title': title[:200],
+        'message': message,
+        'icon': icon,
+        'action_url': action_url,
+        'category': category or CATEGORY_BY_TYPE.get(notification_type, 'system'),
+        'importance': importance or TYPE_IMPORTANCE.get(notification_type, 'medium'),
+        'from_user_id': as_id(from_user),
+        'related': {},
+        'extra_data': extra_data or {},
+        'recipients': [as_id(r) for r in recipients or []],
+        'audience': audience or {},
+        'exclude': [as_id(e) for e in exclude or []],
+        'channels': channels or {},
+    }
+    for name in RELATED_FIELDS:
+        value = related.get(f'related_{name}')
+        if value is not None:
+            payload['related'][name] = as_id(value)
+    return payload
+
+
+def expand_recipients(payload):
+    """Identifiants des destinataires, dans l'ordre, sans doublon ni exclus"""
+    audience = payload.get('audience') or {}
+    user_ids = list(payload.get('recipients') or [])
+
+    if 'group' in audience:
+        user_ids += GroupMembership.objects.filter(
+            group_id=audience['group'], status='accepted'
+        ).order_by('user_id').values_list('user_id', flat=True)
+    if 'meetup' in audience:
+        user_ids += GroupMeetup.participants.through.objects.filter(
+            groupmeetup_id=audience['meetup']
+        ).order_by('customuser_id').values_list('customuser_id', flat=True)
+    if 'sondage' in audience:
+        group_id = GroupSondage.objects.filter(id=audience['sondage']).values_list('group_id', flat=True).first()
+        user_ids += GroupMembership.objects.filter(
+            group_id=group_id, status='accepted'
+        ).order_by('user_id').values_list('user_id', flat=True)
+    if 'conversation' in audience:
+        user_ids += CustomUser.objects.filter(
+            conversations__id=audience['conversation']
+        ).order_by('id').values_list('id', flat=True)
+
+    excluded = set(payload.get('exclude') or [])
+    seen = set()
+    ordered = []
+    for user_id in user_ids:
+        if user_id is not None and user_id not in seen and user_id not in excluded:
+            seen.add(user_id)
+            ordered.append(user_id)
+    return ordered
+
+
+# ============================================
+# PRÉFÉRENCES ET ROUTAGE
+# ============================================
+
+def _channel_enabled(user_settings, notification_type, channel):
+    """Réglage par type de CustomUser.notification_settings (activé par défaut)"""
+    entry = user_settings.get(notification_type)
+    if isinstance(entry, dict):
+        return entry.get(channel, True)
+    return user_settings.get(f'{notification_type}_{channel}', True)
+
+
+def _in_quiet_hours(preference, now):
+    start, end = preference.quiet_hours_start, preference.quiet_hours_end
+    if not start or not end:
+        return False
+    current = timezone.localtime(now).time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+def route(user, preference, payload, now):
+    """
+    Canaux d'un destinataire pour une intention.
+
+    Returns:
+        dict | None: {'push': bool, 'email': bool}, None si la notification ne doit
+        pas être créée
+    """
+    notification_type = payload['notification_type']
+    user_settings = user.notification_settings or {}
+
+    if not _channel_enabled(user_settings, notification_type, 'in_app'):
+        return None
+    if preference is not None and not (
+        preference.enable_in_app
+        and preference.should_notify(notification_type, payload['category'], payload['importance'])
+    ):
+        return None
+
+    channels = payload.get('channels') or {}
+    push = (
+        channels.get('push', True)
+        and _channel_enabled(user_settings, notification_type, 'push')
+        and user.message_push_notifications
+        and (preference is None or (preference.enable_push and not _in_quiet_hours(preference, now)))
+    )
+    email = (
+        channels.get('email', True)
+        and bool(user.email)
+        and _channel_enabled(user_settings, notification_type, 'email')
+        and user.message_email_notifications
+        and user.notification_email_frequency == 'immediate'
+        and (preference is None or preference.enable_email)
+    )
+    return {'push': push, 'email': email}
+
+
+def notification_collapse_key(notification):
+    """Clé de regroupement d'une notification ('post_liked:post:12'), None si non regroupable"""
+    rule = COLLAPSE_RULES.get(notification.notification_type)
+    related_id = getattr(notification, f'related_{rule[0]}_id') if rule else None
+    if related_id is None:
+        return None
+    return f'{notification.notification_type}:{rule[0]}:{related_id}'
+
+
+def serialize_notification(notification, push=False):
+    """Notification au format des clients (WebSocket)"""
+    return {
+        'id': notification.id,
+        'type': notification.notification_type,
+        'category': notification.category,
+        'importance': notification.importance,
+        'title': notification.title,
+        'message': notification.message,
+        'icon': notification.icon,
+        'action_url': notification.action_url,
+        'from_user_id': notification.from_user_id,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'read': notification.read,
+        'push': push,
+        # Le client remplace l'élément affiché de même clé (notification regroupée)
+        'collapse_key': notification_collapse_key(notification),
+    }
+
+
+def notifications_since(user_id, last_id=None, limit=None):
+    """
+    Reprise du flux temps réel: notifications postérieures à last_id (ordre
+    croissant) et nombre de non lues. Sans last_id, aucune notification: seulement
+    l'identifiant de la plus récente, point de départ du client.
+
+    Au-delà de limit notifications manquées, seules les plus récentes sont renvoyées
+    (has_more=True: le client recharge la liste complète s'il l'affiche). Une
+    notification regroupée pendant la déconnexion a un nouvel id: elle est renvoyée
+    comme les autres, le client remplace l'élément de même collapse_key.
+
+    Returns:
+        dict: {'notifications', 'unread_count', 'last_id', 'has_more'}
+    """
+    limit = limit or NOTIFICATION_RESUME_LIMIT
+    mine = UserNotification.objects.filter(user_id=user_id)
+    unread_count = mine.filter(read=False).count()
+
+    if last_id is None:
+        latest = mine.order_by('-id').values_list('id', flat=True).first()
+        return {'notifications': [], 'unread_count': unread_count, 'last_id': latest or 0, 'has_more': False}
+
+    missed = list(mine.filter(id__gt=last_id).order_by('-id')[:limit + 1])
+    has_more = len(missed) > limit
+    missed = missed[:limit][::-1]
+    return {
+        'notifications': [serialize_notification(n) for n in missed],
+        'unread_count': unread_count,
+        'last_id': missed[-1].id if missed else last_id,
+        'has_more': has_more,
+    }
+
+
+# ============================================
+# DISTRIBUTION
+# ============================================
+
+def collapse_key(payload):
+    """(champ, identifiant) de regroupement de l'intention, None si non regroupable"""
+    rule = COLLAPSE_RULES.get(payload['notification_type'])
+    if rule is None or not payload['from_user_id']:
+        return None
+    related_id = payload['related'].get(rule[0])
+    if related_id is None:
+        return None
+    return f'related_{rule[0]}_id', related_id
+
+
+def open_aggregates(payload, key, user_ids, now):
+    """
+    Notifications encore ouvertes au regroupement, une par destinataire (la plus
+    récente), verrouillées jusqu'à la fin de la transaction de distribution.
+
+    Une lecture, servie par l'index (user, notification_type, -created_at).
+    """
+    field, related_id = key
+    rows = UserNotification.objects.select_for_update().filter(
+        user_id__in=user_ids,
+        notification_type=payload['notification_type'],
+        created_at__gte=now - timedelta(seconds=NOTIFICATION_COLLAPSE_WINDOW),
+        **{field: related_id},
+    ).order_by('user_id', '-created_at')
+    aggregates = {}
+    for notification in rows:
+        aggregates.setdefault(notification.user_id, notification)
+    return aggregates
+
+
+def collapse_into(notification, payload, actor, now):
+    """
+    Ajoute un auteur à une notification regroupée (en mémoire): compteur
+    d'auteurs distincts, auteurs récents, titre et date mis à jour, non lue.
+
+    Un auteur sorti de la liste des auteurs récents qui revient est compté de
+    nouveau: le compteur est une borne haute.
+    """
+    data = dict(notification.extra_data or {})
+    recent = data.get('recent_actors') or [{'id': notification.from_user_id, 'name': None}]
+    if all(a['id'] != actor['id'] for a in recent):
+        data['actor_count'] = data.get('actor_count', 1) + 1
+    data['recent_actors'] = ([actor] + [a for a in recent if a['id'] != actor['id']])[:NOTIFICATION_COLLAPSE_ACTORS]
+    data.setdefault('first_at', notification.created_at.isoformat())
+
+    count = data.get('actor_count', 1)
+    template = COLLAPSE_RULES[payload['notification_type']][1]
+    notification.title = (
+        template.format(actor=actor['name'], others=count - 1)[:200] if count > 1 else payload['title']
+    )
+    notification.message = payload['message']
+    notification.from_user_id = actor['id']
+    notification.extra_data = data
+    notification.created_at = now
+    notification.read = False
+    notification.read_at = None
+
+
+def load_recipients(user_ids):
+    """Destinataires actifs et leurs préférences, en deux lectures"""
+    users = CustomUser.objects.filter(id__in=user_ids, is_active=True).only(
+        'id', 'email', 'username', 'first_name', 'notification_settings',
+        'message_push_notifications', 'message_email_notifications', 'notification_email_frequency',
+    ).in_bulk()
+    preferences = {
+        p.user_id: p for p in NotificationPreference.objects.filter(user_id__in=list(users))
+    }
+    return users, preferences
+
+
+def new_notification(user, payload, routes, now, extra_data=None):
+    """UserNotification (non enregistrée) d'une intention pour un destinataire"""
+    return UserNotification(
+        user=user,
+        notification_type=payload['notification_type'],
+        category=payload['category'],
+        importance=payload['importance'],
+        title=payload['title'],
+        message=payload['message'],
+        icon=payload['icon'],
+        action_url=payload['action_url'],
+        from_user_id=payload['from_user_id'],
+        extra_data=payload['extra_data'] if extra_data is None else extra_data,
+        push_sent=routes['push'],
+        push_sent_at=now if routes['push'] else None,
+        **{f'related_{name}_id': value for name, value in payload['related'].items()},
+    )
+
+
+def create_batch(payload, user_ids, now=None):
+    """
+    Crée les notifications d'un lot de destinataires.
+
+    Deux lectures (utilisateurs, préférences) et un bulk_create; pour un type
+    regroupable, une lecture des notifications à regrouper, réinsérées dans le même
+    bulk_create, et la suppression des anciennes lignes.
+
+    Returns:
+        list: [(UserNotification, routes)]
+    """
+    now = now or timezone.now()
+    users, preferences = load_recipients(user_ids)
+
+    extra_data = payload['extra_data']
+    aggregates = {}
+    key = collapse_key(payload)
+    if key is not None:
+        aggregates = open_aggregates(payload, key, list(users), now)
+        actor = {
+            'id': payload['from_user_id'],
+            'name': CustomUser.objects.filter(id=payload['from_user_id']).values_list(
+                'username', flat=True
+            ).first(),
+        }
+        extra_data = {**extra_data, 'actor_count': 1, 'recent_actors': [actor]}
+
+    related = {f'related_{name}_id': value for name, value in payload['related'].items()}
+    pending, collapsed, replaced_ids = [], [], []
+    for user_id in user_ids:
+        user = users.get(user_id)
+        if user is None:
+            continue
+        routes = route(user, preferences.get(user_id), payload, now)
+        if routes is None:
+            continue
+
+        aggregate = aggregates.get(user_id)
+        if aggregate is not None:
+            if any(a['id'] == actor['id'] for a in (aggregate.extra_data or {}).get('recent_actors') or []):
+                # Même auteur récent (like retiré puis remis...): rien de nouveau
+                continue
+            # Réinsertion sous un nouvel id (reprise par id), pas de nouvel email
+            reopened = aggregate.read
+            replaced_ids.append(aggregate.pk)
+            collapse_into(aggregate, payload, actor, now)
+            aggregate.push_sent = routes['push']
+            aggregate.push_sent_at = now if routes['push'] else aggregate.push_sent_at
+            for name, value in related.items():
+                setattr(aggregate, name, value)
+            aggregate.pk = None
+            aggregate._state.adding = True
+            collapsed.append((aggregate, {'push': routes['push'], 'email': False,
+                                          'collapsed': True, 'reopened': reopened}))
+            continue
+
+        pending.append((new_notification(user, payload, routes, now, extra_data), routes))
+
+    if replaced_ids:
+        UserNotification.objects.filter(id__in=replaced_ids).delete()
+    UserNotification.objects.bulk_create(
+        [n for n, _ in pending + collapsed], batch_size=NOTIFICATION_BATCH_SIZE
+    )
+    return pending + collapsed
+
+
+async def _group_send_all(channel_layer, messages):
+    for group, message in messages:
+        await channel_layer.group_send(group, message)
+
+
+def push_notifications(created):
+    """
+    Envoie les notifications créées aux sockets des destinataires (user_<id>), en
+    un seul passage dans la boucle asynchrone pour tout le lot
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not created:
+        return
+    messages = []
+    for notification, routes in created:
+        data = serialize_notification(notification, push=routes['push'])
+        if routes.get('collapsed'):
+            # Notification regroupée: le client remplace l'élément de même collapse_key
+            data.update(collapsed=True, reopened=routes['reopened'])
+        messages.append((f'user_{notification.user_id}', {
+            'type': 'notification_created',
+            'notification': data,
+        }))
+    async_to_sync(_group_send_all)(channel_layer, messages)
+
+
+def email_notifications(created):
+    """Emails immédiats, sur une seule connexion SMTP; marque email_sent en masse"""
+    to_send = [(n, n.user) for n, routes in created if routes['email']]
+    if not to_send:
+        return 0
+
+    emails = []
+    for notification, user in to_send:
+        body = f"Bonjour {user.first_name or user.username},\n\n{notification.message}\n"
+        if notification.action_url:
+            body += f"\n{settings.SITE_URL}{notification.action_url}\n"
+        body += "\nL'équipe Transpareo"
+        emails.append(EmailMessage(notification.title, body, settings.DEFAULT_FROM_EMAIL, [user.email]))
+
+    sent = get_connection().send_messages(emails) or 0
+    UserNotification.objects.filter(id__in=[n.id for n, _ in to_send]).update(
+        email_sent=True, email_sent_at=timezone.now()
+    )
+    return sent
+
+
+def deliver(payload):
+    """
+    Distribue une intention: création de toutes les notifications en une transaction
+    (par lots de NOTIFICATION_BATCH_SIZE), puis WebSocket et email.
+
+    Returns:
+        int: nombre de notifications créées ou regroupées
+    """
+    user_ids = expand_recipients(payload)
+    now = timezone.now()
+    created = []
+    with transaction.atomic():
+        for start in range(0, len(user_ids), NOTIFICATION_BATCH_SIZE):
+            created += create_batch(payload, user_ids[start:start + NOTIFICATION_BATCH_SIZE], now)
+
+    # Canaux externes: au mieux, sans remettre en cause les notifications créées
+    for channel in (push_notifications, email_notifications):
+        try:
+            channel(created)
+        except Exception:
+            logger.exception("Échec du canal %s (%d notification(s))", channel.__name__, len(created))
+    return len(created)
+
+
+def deliver_each(items):
+    """
+    Distribue des notifications individuelles (contenu propre à chaque destinataire:
+    rappels, échéances...) sans passer par une intention par notification: par lot
+    de NOTIFICATION_BATCH_SIZE, deux lectures (destinataires, préférences) et un
+    bulk_create, puis WebSocket et email comme deliver().
+
+    À appeler dans la transaction de l'appelant quand la création doit être
+    atomique avec ses propres écritures.
+
+    Args:
+        items: [(user_id, intention de build_intent)]
+
+    Returns:
+        int: nombre de notifications créées
+    """
+    now = timezone.now()
+    created = []
+    for start in range(0, len(items), NOTIFICATION_BATCH_SIZE):
+        batch = items[start:start + NOTIFICATION_BATCH_SIZE]
+        users, preferences = load_recipients([user_id for user_id, _ in batch])
+        pending = []
+        for user_id, payload in batch:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            routes = route(user, preferences.get(user_id), payload, now)
+            if routes is not None:
+                pending.append((new_notification(user, payload, routes, now), routes))
+        UserNotification.objects.bulk_create([n for n, _ in pending], batch_size=NOTIFICATION_BATCH_SIZE)
+        created += pending
+
+    def send():
+        for channel in (push_notifications, email_notifications):
+            try:
+                channel(created)
+            except Exception:
+                logger.exception("Échec du canal %s (%d notification(s))", channel.__name__, len(created))
+
+    # Canaux externes après validation de la transaction de l'appelant
+    transaction.on_commit(send)
+    return len(created)
+
+
+# ============================================
+# FILES
+# ============================================
+
+class LocalNotificationQueue:
+    """File en mémoire du processus, vidée par des threads (développement, tests)"""
+
+    def __init__(self, workers=NOTIFICATION_WORKERS):
+        self.workers = workers
+        self.queue = queue.Queue()
+        self.delivered = 0
+        self.errors = 0
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, payload):
+        # Après validation de la transaction: les objets liés sont visibles du worker
+        transaction.on_commit(lambda: self._put(payload))
+
+    def _put(self, payload):
+        self._ensure_started()
+        self.queue.put(payload)
+
+    def _ensure_started(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._run, name=f'notifications-{len(self._threads)}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            payload = self.queue.get()
+            try:
+                close_old_connections()
+                count = deliver(payload)
+                with self._lock:
+                    self.delivered += count
+            except Exception:
+                logger.exception("Échec de distribution de l'intention %s", payload.get('notification_type'))
+                with self._lock:
+                    self.errors += 1
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    def join(self):
+        """Attend que la file soit vide (tests, commandes)"""
+        self.queue.join()
+
+
+class DatabaseNotificationQueue:
+    """File durable (NotificationIntent): survit aux redémarrages, plusieurs workers possibles"""
+
+    def enqueue(self, payload):
+        # Écrite dans la transaction de l'appelant: annulée avec elle
+        NotificationIntent.objects.create(payload=payload)
+
+    def claim(self, limit):
+        """Réserve jusqu'à limit intentions (SKIP LOCKED: les workers ne se bloquent pas)"""
+        now = timezone.now()
+        with transaction.atomic():
+            intents = list(
+                NotificationIntent.objects.select_for_update(skip_locked=True).filter(
+                    Q(status='pending', available_at__lte=now)
+                    | Q(status='processing', claimed_at__lt=now - timedelta(seconds=NOTIFICATION_CLAIM_TIMEOUT))
+                ).order_by('available_at', 'id')[:limit]
+            )
+            for intent in intents:
+                intent.status = 'processing'
+                intent.claimed_at = now
+                intent.attempts += 1
+            NotificationIntent.objects.bulk_update(intents, ['status', 'claimed_at', 'attempts'])
+        return intents
+
+    def process(self, limit=100):
+        """
+        Distribue un lot d'intentions.
+
+        Returns:
+            dict: {'intents', 'notifications', 'failed'}
+        """
+        stats = {'intents': 0, 'notifications': 0, 'failed': 0}
+        for intent in self.claim(limit):
+            try:
+                intent.delivered_count = deliver(intent.payload)
+                intent.status = 'done'
+                intent.last_error = ''
+                stats['notifications'] += intent.delivered_count
+            except Exception as e:
+                stats['failed'] += 1
+                intent.last_error = str(e)[:1000]
+                if intent.attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                    intent.status = 'failed'
+                else:
+                    # Nouvel essai avec attente exponentielle
+                    intent.status = 'pending'
+                    intent.available_at = timezone.now() + timedelta(seconds=30 * 2 ** intent.attempts)
+            intent.save(update_fields=['status', 'delivered_count', 'last_error', 'available_at'])
+            stats['intents'] += 1
+        return stats
+
+    def purge(self, days=7):
+        """Supprime les intentions distribuées depuis plus de days jours"""
+        deleted, _ = NotificationIntent.objects.filter(
+            status='done', claimed_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+        return deleted
+
+
+QUEUE_BACKENDS = {
+    'local': LocalNotificationQueue,
+    'database': DatabaseNotificationQueue,
+}
+
+_queues = {}
+
+
+def get_queue(backend=None):
+    """File de distribution (une instance par processus et par backend)"""
+    backend = backend or NOTIFICATION_QUEUE_BACKEND
+    if backend not in _queues:
+        _queues[backend] = QUEUE_BACKENDS[backend]()
+    return _queues[backend]
+
+
+def notify(notification_type, title, message, **kwargs):
+    """
+    Met en file une notification (voir build_intent pour les arguments).
+    Ne fait aucune lecture des destinataires ni de leurs préférences.
+    """
+    payload = build_intent(notification_type, title, message, **kwargs)
+    get_queue().enqueue(payload)
+    return payload
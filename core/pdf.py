@@ -0,0 +1,210 @@
+"""
+Rendu PDF des documents de location (quittances, récapitulatif fiscal)
+Documents texte sur une page A4, sans dépendance: chaque gabarit (lignes
+positionnées) est compilé une fois à l'import en flux de contenu PDF dont seules
+les valeurs sont substituées au rendu, et les objets communs (catalogue, polices)
+sont encodés d'avance. Pas d'accès à la base ni aux settings: les fonctions de
+rendu tournent telles quelles dans des processus de rendu (ProcessPoolExecutor).
+"""
+from string import Formatter
+
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4, en points
+
+# Polices standard PDF (aucune police embarquée), encodage WinAnsi: accents et €
+FONTS = {
+    'regular': b'/F1',
+    'bold': b'/F2',
+}
+FONT_OBJECTS = [
+    b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+]
+
+
+def escape(text):
+    """Chaîne littérale PDF (parenthèses et antislash échappés)"""
+    return str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def text_operator(font, size, x, y, text):
+    return f"BT {FONTS[font].decode()} {size} Tf 1 0 0 1 {x} {y} Tm ({text}) Tj ET\n"
+
+
+# ============================================
+# GABARITS
+# ============================================
+
+class PageTemplate:
+    """
+    Gabarit d'une page: lignes (police, taille, x, y, texte à champs {nom}).
+
+    Le texte fixe est échappé une fois à la compilation; render() ne fait
+    qu'un format() des valeurs échappées puis l'assemblage du document.
+    """
+
+    def __init__(self, lines):
+        parts = []
+        for font, size, x, y, text in lines:
+            compiled = ''
+            for literal, field, spec, conversion in Formatter().parse(text):
+                compiled += escape(literal).replace('{', '{{').replace('}', '}}')
+                if field is not None:
+                    compiled += '{' + field + (f'!{conversion}' if conversion else '') + (f':{spec}' if spec else '') + '}'
+            parts.append(text_operator(font, size, x, y, compiled))
+        self.content = ''.join(parts)
+
+    def render_content(self, values):
+        """Flux de contenu de la page (octets WinAnsi)"""
+        escaped = {key: escape(value) for key, value in values.items()}
+        return self.content.format(**escaped).encode('cp1252', errors='replace')
+
+    def render(self, values):
+        return build_pdf([self.render_content(values)])
+
+
+def lines_content(lines):
+    """Flux de contenu d'une page sans gabarit (lignes déjà composées)"""
+    return ''.join(
+        text_operator(font, size, x, y, escape(text)) for font, size, x, y, text in lines
+    ).encode('cp1252', errors='replace')
+
+
+# ============================================
+# ASSEMBLAGE
+# ============================================
+
+def build_pdf(contents):
+    """
+    Document PDF d'une page par flux de contenu.
+
+    Objets: 1 catalogue, 2 arbre des pages, 3-4 polices, puis pour chaque page
+    l'objet page et son flux.
+    """
+    count = len(contents)
+    page_ids = [5 + 2 * i for i in range(count)]
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % i for i in page_ids) + b'] /Count %d >>' % count,
+        *FONT_OBJECTS,
+    ]
+    for page_id, content in zip(page_ids, contents):
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] ' % (PAGE_WIDTH, PAGE_HEIGHT)
+            + b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>' % (page_id + 1)
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# ============================================
+# QUITTANCE DE LOYER
+# ============================================
+
+# À incrémenter à chaque modification du gabarit: les quittances en cache
+# (clé: empreinte des valeurs et de cette version) sont alors régénérées
+QUITTANCE_TEMPLATE_VERSION = 1
+
+QUITTANCE_TEMPLATE = PageTemplate([
+    ('bold', 20, 72, 760, "Quittance de loyer"),
+    ('regular', 11, 72, 738, "Période du {debut} au {fin}"),
+
+    ('bold', 11, 72, 700, "Bailleur"),
+    ('regular', 10, 72, 685, "{bailleur}"),
+    ('bold', 11, 320, 700, "Locataire"),
+    ('regular', 10, 320, 685, "{locataire}"),
+
+    ('bold', 11, 72, 650, "Logement"),
+    ('regular', 10, 72, 635, "{logement}"),
+    ('regular', 10, 72, 621, "{adresse} {code_postal}"),
+
+    ('regular', 10, 72, 580, "Je soussigné(e) {bailleur}, bailleur du logement désigné ci-dessus,"),
+    ('regular', 10, 72, 566, "déclare avoir reçu de {locataire} la somme de {montant_total} €"),
+    ('regular', 10, 72, 552, "au titre du loyer et des charges de la période du {debut} au {fin},"),
+    ('regular', 10, 72, 538, "et lui en donne quittance, sous réserve de tous mes droits."),
+
+    ('bold', 11, 72, 498, "Détail du règlement"),
+    ('regular', 10, 72, 480, "Loyer hors charges"),
+    ('regular', 10, 420, 480, "{montant_loyer} €"),
+    ('regular', 10, 72, 466, "Provisions pour charges"),
+    ('regular', 10, 420, 466, "{montant_charges} €"),
+    ('bold', 10, 72, 448, "Total"),
+    ('bold', 10, 420, 448, "{montant_total} €"),
+    ('regular', 10, 72, 420, "Payé le {date_paiement} ({mode_paiement})"),
+
+    ('regular', 10, 72, 380, "Fait le {date_paiement}, pour servir et valoir ce que de droit."),
+    ('regular', 8, 72, 60, "Quittance n° {numero} - document établi via Transpareo. "
+                           "Elle annule tout reçu partiel donné pour la même période."),
+])
+
+
+def render_quittance(values):
+    """
+    PDF d'une quittance.
+
+    Args:
+        values: chaînes déjà formatées (voir core.documents.quittance_values)
+    """
+    return QUITTANCE_TEMPLATE.render(values)
+
+
+# ============================================
+# RÉCAPITULATIF FISCAL
+# ============================================
+
+FISCAL_ROWS_PER_PAGE = 30
+
+
+def render_fiscal_summary(owner, annee, rows, totals):
+    """
+    PDF du récapitulatif annuel des loyers encaissés (une ligne par bail).
+
+    Args:
+        rows: [{'logement', 'adresse', 'paiements', 'loyers', 'charges', 'total'}], montants formatés
+        totals: {'paiements', 'loyers', 'charges', 'total'}
+    """
+    pages = []
+    chunks = [rows[i:i + FISCAL_ROWS_PER_PAGE] for i in range(0, len(rows), FISCAL_ROWS_PER_PAGE)] or [[]]
+    for number, chunk in enumerate(chunks, start=1):
+        lines = [
+            ('bold', 16, 72, 770, f"Récapitulatif des loyers encaissés {annee}"),
+            ('regular', 10, 72, 752, f"{owner} - page {number}/{len(chunks)}"),
+            ('bold', 9, 72, 720, "Logement"),
+            ('bold', 9, 300, 720, "Paiements"),
+            ('bold', 9, 360, 720, "Loyers"),
+            ('bold', 9, 430, 720, "Charges"),
+            ('bold', 9, 500, 720, "Total"),
+        ]
+        y = 704
+        for row in chunk:
+            lines += [
+                ('regular', 9, 72, y, row['logement'][:45]),
+                ('regular', 7, 72, y - 9, row['adresse'][:60]),
+                ('regular', 9, 300, y, str(row['paiements'])),
+                ('regular', 9, 360, y, row['loyers']),
+                ('regular', 9, 430, y, row['charges']),
+                ('regular', 9, 500, y, row['total']),
+            ]
+            y -= 21
+        if number == len(chunks):
+            lines += [
+                ('bold', 10, 72, y - 10, "Total de l'année"),
+                ('bold', 10, 300, y - 10, str(totals['paiements'])),
+                ('bold', 10, 360, y - 10, totals['loyers']),
+                ('bold', 10, 430, y - 10, totals['charges']),
+                ('bold', 10, 500, y - 10, totals['total']),
+                ('regular', 8, 72, 60, "Montants en euros, loyers payés dans l'année civile. "
+                                       "Document indicatif pour la déclaration des revenus fonciers."),
+            ]
+        pages.append(lines_content(lines))
+    return build_pdf(pages)
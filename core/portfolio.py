@@ -0,0 +1,155 @@
+"""
+Portefeuille propriétaire (page "Gérer mes locations")
+La liste des baux est lue en une requête: loyers en retard et candidatures en
+attente sont des sous-requêtes groupées par bail et par logement (index
+bail/date_echeance et logement/statut), le montant mensuel est calculé en SQL;
+les images des logements suivent en une requête. Les chiffres de l'en-tête
+(biens loués, revenu mensuel, retards, demandes) tiennent en une requête et sont
+gardés quelques instants dans le cache partagé: le nombre de baux ne change rien
+au nombre de requêtes. Toute modification d'un bail, d'un paiement ou d'une
+candidature les invalide (signaux branchés par CoreConfig.ready; les mises à
+jour en masse appellent invalidate_owner_summaries).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.connection import ConnectionProxy
+
+from .models import Bail, Candidature, CustomUser, Logement, PaiementLoyer
+
+
+# Alias du cache des chiffres de l'en-tête
+OWNER_SUMMARY_CACHE = getattr(settings, 'OWNER_SUMMARY_CACHE', 'default')
+
+cache = ConnectionProxy(caches, OWNER_SUMMARY_CACHE)
+
+# Durée de vie des chiffres de l'en-tête (secondes)
+OWNER_SUMMARY_TIMEOUT = getattr(settings, 'OWNER_SUMMARY_TIMEOUT', 60)
+
+
+def summary_key(user_id):
+    """Clé de cache des chiffres de l'en-tête d'un propriétaire"""
+    return f'owner_summary:{user_id}'
+
+
+def _scalar(queryset, group_field, aggregate, output_field):
+    """Sous-requête scalaire: un agrégat de queryset regroupé sur group_field (0 si vide)"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_field).annotate(value=aggregate).values('value'),
+            output_field=output_field,
+        ),
+        Value(0),
+        output_field=output_field,
+    )
+
+
+# ============================================
+# BAUX
+# ============================================
+
+def owner_leases(user, statut=None):
+    """
+    Baux d'un propriétaire, du plus récent au plus ancien, annotés:
+    paiements_en_retard, demandes_en_attente (candidatures du logement),
+    montant_mensuel (loyer + charges).
+    """
+    baux = Bail.objects.filter(proprietaire=user)
+    if statut:
+        baux = baux.filter(statut=statut)
+    return baux.select_related('logement', 'locataire').prefetch_related('logement__images').annotate(
+        paiements_en_retard=_scalar(
+            PaiementLoyer.objects.filter(bail=OuterRef('pk'), statut='en_retard'),
+            'bail', Count('id'), IntegerField(),
+        ),
+        demandes_en_attente=_scalar(
+            Candidature.objects.filter(logement=OuterRef('logement'), statut='en_attente'),
+            'logement', Count('id'), IntegerField(),
+        ),
+        montant_mensuel=F('loyer_mensuel') + F('charges_mensuelles'),
+    ).order_by('-date_debut')
+
+
+# ============================================
+# EN-TÊTE
+# ============================================
+
+def compute_owner_summary(user_id):
+    """
+    Chiffres de l'en-tête en une requête.
+
+    Returns:
+        dict: {'nombre_biens_loues', 'revenu_mensuel_total', 'loyers_en_retard',
+        'demandes_attente'}
+    """
+    actifs = Bail.objects.filter(proprietaire=OuterRef('pk'), statut='actif')
+    decimal = DecimalField(max_digits=12, decimal_places=2)
+    return CustomUser.objects.filter(id=user_id).annotate(
+        nombre_biens_loues=_scalar(actifs, 'proprietaire', Count('id'), IntegerField()),
+        revenu_mensuel_total=_scalar(
+            actifs, 'proprietaire', Sum(F('loyer_mensuel') + F('charges_mensuelles')), decimal,
+        ),
+        loyers_en_retard=_scalar(
+            PaiementLoyer.objects.filter(
+                bail__proprietaire=OuterRef('pk'), bail__statut='actif', statut='en_retard',
+            ),
+            'bail__proprietaire', Count('id'), IntegerField(),
+        ),
+        demandes_attente=_scalar(
+            Candidature.objects.filter(logement__proprietaire=OuterRef('pk'), statut='en_attente'),
+            'logement__proprietaire', Count('id'), IntegerField(),
+        ),
+    ).values('nombre_biens_loues', 'revenu_mensuel_total', 'loyers_en_retard', 'demandes_attente').get()
+
+
+def owner_summary(user_id):
+    """Chiffres de l'en-tête, depuis le cache partagé (OWNER_SUMMARY_TIMEOUT)"""
+    key = summary_key(user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_owner_summary(user_id)
+        cache.set(key, summary, OWNER_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_owner_summary(user_id):
+    """À appeler quand un bail, un paiement ou une candidature du propriétaire change"""
+    if user_id:
+        cache.delete(summary_key(user_id))
+
+
+def invalidate_owner_summaries(user_ids):
+    """Invalidation après une mise à jour en masse (une écriture dans le cache)"""
+    keys = [summary_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _bail_changed(sender, instance, **kwargs):
+    invalidate_owner_summary(instance.proprietaire_id)
+
+
+def _paiement_changed(sender, instance, **kwargs):
+    invalidate_owner_summary(
+        Bail.objects.filter(id=instance.bail_id).values_list('proprietaire_id', flat=True).first()
+    )
+
+
+def _candidature_changed(sender, instance, **kwargs):
+    invalidate_owner_summary(
+        Logement.objects.filter(id=instance.logement_id).values_list('proprietaire_id', flat=True).first()
+    )
+
+
+def connect_signals():
+    """Invalide les chiffres de l'en-tête à chaque enregistrement ou suppression (CoreConfig.ready)"""
+    from django.db.models.signals import post_delete, post_save
+
+    for model, receiver in (
+        (Bail, _bail_changed),
+        (PaiementLoyer, _paiement_changed),
+        (Candidature, _candidature_changed),
+    ):
+        for signal in (post_save, post_delete):
+            signal.connect(receiver, sender=model, dispatch_uid=f'owner_summary_{model.__name__}')
@@ -0,0 +1,190 @@
+"""
+Présence en ligne pour Transpareo Connect
+Alimentée par les connexions/heartbeats de MessageConsumer, stockée dans le cache
+partagé avec expiration (aucune écriture en base) et un cache local par processus.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+
+# Alias du cache partagé de présence
+PRESENCE_CACHE = getattr(settings, 'PRESENCE_CACHE', 'default')
+
+cache = ConnectionProxy(caches, PRESENCE_CACHE)
+
+# Durée de vie d'une présence sans heartbeat (secondes)
+PRESENCE_TTL = getattr(settings, 'PRESENCE_TTL', 60)
+
+# Intervalle minimal entre deux rafraîchissements du cache partagé pour un utilisateur
+PRESENCE_REFRESH_INTERVAL = PRESENCE_TTL // 3
+
+# Durée de validité des lectures mises en cache localement (secondes)
+PRESENCE_LOCAL_CACHE_TTL = getattr(settings, 'PRESENCE_LOCAL_CACHE_TTL', 5)
+
+
+def presence_key(user_id):
+    """Clé de cache partagé de la présence d'un utilisateur"""
+    return f'presence:{user_id}'
+
+
+# ============================================
+# ÉTAT LOCAL AU PROCESSUS
+# ============================================
+
+_lock = threading.Lock()
+
+# Sockets ouvertes dans ce processus, par utilisateur
+_local_sockets = {}
+
+# Dernier rafraîchissement du cache partagé, par utilisateur
+_last_refresh = {}
+
+# Lectures récentes du cache partagé: user_id -> (is_online, expire_à)
+_lookup_cache = {}
+
+
+def _forget_lookup(user_id):
+    _lookup_cache.pop(user_id, None)
+
+
+# ============================================
+# CONNEXIONS / HEARTBEATS
+# ============================================
+
+def user_connected(user_id):
+    """
+    Enregistre l'ouverture d'une socket.
+
+    Returns:
+        bool: True si l'utilisateur vient de passer en ligne (première socket)
+    """
+    key = presence_key(user_id)
+    with _lock:
+        _local_sockets[user_id] = _local_sockets.get(user_id, 0) + 1
+        _last_refresh[user_id] = time.monotonic()
+        _forget_lookup(user_id)
+
+    # Compteur de sockets partagé entre processus
+    cache.add(key, 0, PRESENCE_TTL)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Clé expirée entre add() et incr()
+        cache.set(key, 1, PRESENCE_TTL)
+        count = 1
+    cache.touch(key, PRESENCE_TTL)
+    return count == 1
+
+
+def user_disconnected(user_id):
+    """
+    Enregistre la fermeture d'une socket.
+
+    Returns:
+        bool: True si l'utilisateur vient de passer hors ligne (plus aucune socket)
+    """
+    key = presence_key(user_id)
+    with _lock:
+        remaining = _local_sockets.get(user_id, 0) - 1
+        if remaining > 0:
+            _local_sockets[user_id] = remaining
+        else:
+            _local_sockets.pop(user_id, None)
+            _last_refresh.pop(user_id, None)
+        _forget_lookup(user_id)
+
+    try:
+        count = cache.decr(key)
+    except ValueError:
+        return True
+    if count <= 0:
+        cache.delete(key)
+        return True
+    return False
+
+
+def heartbeat(user_id):
+    """
+    Prolonge la présence d'un utilisateur.
+
+    Le cache partagé n'est touché qu'une fois par PRESENCE_REFRESH_INTERVAL et
+    par utilisateur, quel que soit le nombre de sockets ou de heartbeats.
+
+    Returns:
+        bool: True si le cache partagé a été rafraîchi
+    """
+    now = time.monotonic()
+    with _lock:
+        if now - _last_refresh.get(user_id, 0) < PRESENCE_REFRESH_INTERVAL:
+            return False
+        _last_refresh[user_id] = now
+        sockets = _local_sockets.get(user_id, 0)
+
+    key = presence_key(user_id)
+    if not cache.touch(key, PRESENCE_TTL):
+        # Présence expirée (redémarrage du cache, etc.): la recréer
+        cache.add(key, max(sockets, 1), PRESENCE_TTL)
+    return True
+
+
+# ============================================
+# LECTURES
+# ============================================
+
+def get_online_user_ids(user_ids):
+    """
+    Retourne l'ensemble des utilisateurs en ligne parmi user_ids.
+
+    Une seule lecture groupée (get_many) du cache partagé pour les identifiants
+    absents du cache local.
+    """
+    user_ids = set(user_ids)
+    online = set()
+    missing = []
+    now = time.monotonic()
+
+    with _lock:
+        for user_id in user_ids:
+            if _local_sockets.get(user_id):
+                online.add(user_id)
+                continue
+            cached = _lookup_cache.get(user_id)
+            if cached and cached[1] > now:
+                if cached[0]:
+                    online.add(user_id)
+            else:
+                missing.append(user_id)
+
+    if missing:
+        found = cache.get_many([presence_key(user_id) for user_id in missing])
+        expires_at = now + PRESENCE_LOCAL_CACHE_TTL
+        with _lock:
+            for user_id in missing:
+                is_online = (found.get(presence_key(user_id)) or 0) > 0
+                _lookup_cache[user_id] = (is_online, expires_at)
+                if is_online:
+                    online.add(user_id)
+
+    return online
+
+
+def is_online(user_id):
+    """Vérifie si un utilisateur est en ligne"""
+    return user_id in get_online_user_ids([user_id])
+
+
+def get_presence_audience(user_id):
+    """Identifiants des utilisateurs partageant une conversation avec user_id"""
+    from .models import Conversation
+
+    return list(
+        Conversation.participants.through.objects.filter(
+            conversation__participants=user_id
+        ).exclude(
+            customuser_id=user_id
+        ).values_list('customuser_id', flat=True).distinct()
+    )
@@ -1,60 +1,177 @@
 """
-Rate limiting utility pour sécuriser les formulaires
+Limitation de débit partagée (formulaires d'authentification et actions utilisateur)
+Fenêtre glissante approchée: le compteur de la fenêtre fixe courante et celui de la
+fenêtre précédente, pondéré par la part de celle-ci encore couverte, sont comparés
+à la limite. Chaque tentative est un cache.add + cache.incr, atomiques sur Redis
+et Memcached (INCR) comme sur le cache local: aucune lecture-écriture concurrente
+ne peut perdre d'incrément. Avec un cache partagé (RATE_LIMIT_CACHE) la limite vaut
+pour tous les processus; le cache local par processus en est le remplaçant en
+développement.
 """
-from django.core.cache import cache
-from django.http import JsonResponse
-from django.conf import settings
-from functools import wraps
+import hashlib
+import math
 import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils import timezone
+
+
+# Alias du cache des compteurs (doit être partagé entre processus en production)
+RATE_LIMIT_CACHE = getattr(settings, 'RATE_LIMIT_CACHE', 'default')
+
+
+def _cache():
+    return caches[RATE_LIMIT_CACHE]
+
+
+def _window_keys(scope, key, window, now):
+    # Clés saisies par l'utilisateur (emails): hachées pour rester valides sur tout cache
+    digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:20]
+    index = int(now // window)
+    return f'rl:{scope}:{digest}:{window}:{index}', f'rl:{scope}:{digest}:{window}:{index - 1}'
+
+
+def _incr(cache, cache_key, delta, window):
+    # add() ne crée le compteur que s'il n'existe pas: l'incrément reste atomique
+    cache.add(cache_key, 0, timeout=2 * window)
+    try:
+        return cache.incr(cache_key, delta)
+    except ValueError:
+        # Compteur expiré entre add() et incr()
+        cache.add(cache_key, delta, timeout=2 * window)
+        return delta
+
+
+def _status(current, previous, limit, window, elapsed, cost):
+    """Décision pour une tentative de coût cost (current l'inclut déjà)"""
+    weight = 1 - elapsed / window
+    count = previous * weight + current
+    allowed = count <= limit
+
+    retry_after = 0
+    if not allowed:
+        before = current - cost
+        if before + cost <= limit:
+            # Autorisé plus tard dans la fenêtre courante, quand la précédente pèse moins
+            needed = window * (1 - (limit - before - cost) / previous)
+            retry_after = needed - elapsed
+        else:
+            # Pas avant la fenêtre suivante, où la courante devient la précédente
+            needed = window * (1 - (limit - cost) / before) if before else 0
+            retry_after = window - elapsed + max(0, needed)
+        retry_after = max(1, math.ceil(retry_after))
+
+    return {
+        'allowed': allowed,
+        'count': count,
+        'remaining': max(0, math.floor(limit - count)),
+        'retry_after': retry_after,
+        'reset_at': timezone.now() + timedelta(seconds=retry_after or window),
+    }
+
+
+# ============================================
+# API
+# ============================================
+
+def hit(scope, key, limit, window, cost=1):
+    """
+    Compte une tentative et indique si elle est autorisée.
+
+    Une tentative refusée n'est pas comptée (le compteur est décrémenté): un client
+    bloqué retrouve l'accès à la fin de la fenêtre, même s'il insiste.
+
+    Args:
+        scope: famille de limite ('login', 'action:post', ...)
+        key: identifiant limité (IP, email, id utilisateur)
+        limit: nombre de tentatives autorisées par fenêtre glissante
+        window: durée de la fenêtre en secondes
+
+    Returns:
+        dict: {'allowed', 'count', 'remaining', 'retry_after', 'reset_at'}
+    """
+    cache = _cache()
+    now = time.time()
+    current_key, previous_key = _window_keys(scope, key, window, now)
 
+    current = _incr(cache, current_key, cost, window)
+    previous = cache.get(previous_key, 0)
+    status = _status(current, previous, limit, window, now % window, cost)
+    if not status['allowed']:
+        try:
+            cache.decr(current_key, cost)
+        except ValueError:
+            pass
+    return status
 
-def rate_limit(key_func, limit=5, window=300, message="Trop de tentatives. Veuillez réessayer plus tard."):
+
+def peek(scope, key, limit, window, cost=1):
+    """Comme hit(), sans compter la tentative"""
+    cache = _cache()
+    now = time.time()
+    current_key, previous_key = _window_keys(scope, key, window, now)
+
+    values = cache.get_many([current_key, previous_key])
+    current = values.get(current_key, 0) + cost
+    return _status(current, values.get(previous_key, 0), limit, window, now % window, cost)
+
+
+def reset(scope, key, window):
+    """Efface les compteurs (tentative réussie)"""
+    _cache().delete_many(_window_keys(scope, key, window, time.time()))
+
+
+# ============================================
+# DÉCORATEUR DES VUES D'AUTHENTIFICATION
+# ============================================
+
+def rate_limit(key_func, limit=5, window=300, message="Trop de tentatives. Veuillez réessayer plus tard.",
+               scope=None):
     """
     Décorateur de rate limiting
-    
+
+    Seules les soumissions (POST) sont comptées; l'affichage du formulaire reste libre.
+
     Args:
         key_func: Fonction qui retourne la clé de cache (généralement basée sur l'IP)
         limit: Nombre maximum de tentatives
         window: Fenêtre de temps en secondes (défaut: 5 minutes)
         message: Message d'erreur à afficher
+        scope: Famille de limite (défaut: nom de la vue, chaque vue a ses compteurs)
     """
     def decorator(view_func):
+        limit_scope = scope or view_func.__name__
+
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            # Générer les clés de cache
-            cache_key = f"rate_limit:{key_func(request)}"
-            timestamp_key = f"rate_limit_ts:{key_func(request)}"
-            
-            # Récupérer le nombre de tentatives et le timestamp
-            attempts = cache.get(cache_key, 0)
-            timestamp = cache.get(timestamp_key, 0)
-            
-            if attempts >= limit:
-                # Calculer le temps restant
-                current_time = time.time()
-                if timestamp > 0:
-                    elapsed = current_time - timestamp
-                    remaining = window - elapsed
-                    if remaining < 0:
-                        remaining = 0
-                    ttl = int(remaining)
-                else:
-                    ttl = window
-                
-                from django.contrib import messages
-                minutes = max(1, (ttl // 60) + 1) if ttl > 0 else 1
-                messages.error(request, f"{message} Réessayez dans {minutes} minute(s).")
-                
+            if request.method != 'POST':
+                return view_func(request, *args, **kwargs)
+
+            key = key_func(request)
+            status = hit(limit_scope, key, limit, window)
+
+            if not status['allowed']:
+                ttl = status['retry_after']
+
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return JsonResponse({
+                        'success': False,
                         'error': message,
                         'retry_after': ttl
                     }, status=429)
-                
+
+                from django.contrib import messages
+                minutes = max(1, (ttl // 60) + 1) if ttl > 0 else 1
+                messages.error(request, f"{message} Réessayez dans {minutes} minute(s).")
+
                 # Re-rendre le formulaire avec l'erreur
                 from django.shortcuts import render
                 from .forms import LoginForm, SignupForm
-                
+
                 # Déterminer le formulaire approprié
                 if 'login' in request.path:
                     form = LoginForm()
@@ -65,29 +182,20 @@ def rate_limit(key_func, limit=5, window=300, message="Trop de tentatives. Veuil
                 else:
                     form = None
                     template = 'core/login_modern.html'
-                
+
                 return render(request, template, {
                     'form': form,
                     'rate_limited': True
-                })
-            
-            # Si c'est la première tentative ou si le timestamp n'existe pas, créer un nouveau
-            if timestamp == 0:
-                timestamp = time.time()
-                cache.set(timestamp_key, timestamp, window + 60)  # Stocker 1 minute de plus pour la sécurité
-            
-            # Incrémenter le compteur
-            cache.set(cache_key, attempts + 1, window)
-            
+                }, status=429)
+
             # Exécuter la vue
             response = view_func(request, *args, **kwargs)
-            
+
             # Si succès, réinitialiser le compteur
             if hasattr(response, 'status_code') and response.status_code in [200, 302]:
                 if hasattr(request, 'user') and request.user.is_authenticated:
-                    cache.delete(cache_key)
-                    cache.delete(timestamp_key)
-            
+                    reset(limit_scope, key, window)
+
             return response
         return wrapper
     return decorator
@@ -105,6 +213,5 @@ def get_client_ip_key(request):
 
 def get_email_key(request):
     """Retourne l'email comme clé de rate limiting"""
-    email = request.POST.get('username') or request.POST.get('email', '')
+    email = (request.POST.get('username') or request.POST.get('email', '')).strip()
     return email.lower() if email else get_client_ip_key(request)
-
@@ -0,0 +1,68 @@
+"""
+Réactions emoji sur les messages
+Les compteurs par emoji sont maintenus incrémentalement dans Message.reaction_counts :
+une page d'historique obtient ses résumés sans aucun COUNT.
+"""
+from django.db import IntegrityError, transaction
+
+from .models import Message, MessageReaction
+
+
+VALID_EMOJIS = [choice for choice, _ in MessageReaction.REACTION_CHOICES]
+
+
+def _apply_delta(message_id, emoji, delta):
+    """Met à jour le compteur d'un emoji (ligne du message verrouillée)"""
+    message = Message.objects.select_for_update().only('id', 'reaction_counts').get(id=message_id)
+    counts = dict(message.reaction_counts or {})
+    count = counts.get(emoji, 0) + delta
+    if count > 0:
+        counts[emoji] = count
+    else:
+        counts.pop(emoji, None)
+    Message.objects.filter(id=message_id).update(reaction_counts=counts)
+    return counts
+
+
+def toggle_message_reaction(message, user, emoji):
+    """
+    Ajoute la réaction de l'utilisateur, ou la retire si elle existe déjà.
+
+    Returns:
+        tuple: (action 'added'/'removed', compteurs {emoji: nombre})
+    """
+    with transaction.atomic():
+        deleted, _ = MessageReaction.objects.filter(message=message, user=user, emoji=emoji).delete()
+        if deleted:
+            action, delta = 'removed', -1
+        else:
+            try:
+                with transaction.atomic():
+                    MessageReaction.objects.create(message=message, user=user, emoji=emoji)
+                action, delta = 'added', 1
+            except IntegrityError:
+                # Requête concurrente identique déjà comptée
+                return 'added', Message.objects.get(id=message.id).reaction_counts
+        counts = _apply_delta(message.id, emoji, delta)
+
+    message.reaction_counts = counts
+    return action, counts
+
+
+def get_user_reactions(user, message_ids):
+    """Emojis utilisés par l'utilisateur, par message (une requête pour la page)"""
+    mine = {}
+    rows = MessageReaction.objects.filter(
+        user=user, message_id__in=list(message_ids)
+    ).values_list('message_id', 'emoji')
+    for message_id, emoji in rows:
+        mine.setdefault(message_id, set()).add(emoji)
+    return mine
+
+
+def summarize_reactions(counts, my_emojis=()):
+    """Résumé JSON: [{'emoji', 'count', 'me'}] trié par popularité"""
+    return [
+        {'emoji': emoji, 'count': count, 'me': emoji in my_emojis}
+        for emoji, count in sorted((counts or {}).items(), key=lambda item: -item[1])
+    ]
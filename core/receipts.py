@@ -0,0 +1,227 @@
+"""
+Accusés de lecture et de réception pour Transpareo Connect
+Les clients acquittent des plages ("lu jusqu'au message X") via WebSocket,
+les acquittements sont regroupés en mémoire puis écrits en masse.
+"""
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Message, ConversationStatus
+
+
+# Délai de regroupement des acquittements avant écriture (secondes)
+RECEIPTS_FLUSH_INTERVAL = getattr(settings, 'RECEIPTS_FLUSH_INTERVAL', 1.0)
+
+# Nombre de couples (conversation, utilisateur) déclenchant une écriture immédiate
+RECEIPTS_MAX_PENDING = getattr(settings, 'RECEIPTS_MAX_PENDING', 500)
+
+RECEIPT_KINDS = ('read', 'delivered')
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# TAMPON D'ACQUITTEMENTS
+# ============================================
+
+class ReceiptBuffer:
+    """
+    Tampon en mémoire des acquittements, par processus.
+
+    Pour chaque (type, conversation, utilisateur) on ne garde que l'identifiant
+    de message le plus élevé : dix acquittements successifs coûtent une seule
+    écriture au prochain flush.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {kind: {} for kind in RECEIPT_KINDS}
+
+    def ack(self, kind, conversation_id, user_id, up_to_message_id):
+        """Enregistre un acquittement; retourne le nombre de couples en attente"""
+        if kind not in RECEIPT_KINDS:
+            raise ValueError(f"Type d'acquittement inconnu: {kind}")
+
+        key = (int(conversation_id), int(user_id))
+        up_to_message_id = int(up_to_message_id)
+        with self._lock:
+            pending = self._pending[kind]
+            if pending.get(key, 0) < up_to_message_id:
+                pending[key] = up_to_message_id
+            return sum(len(p) for p in self._pending.values())
+
+    def drain(self):
+        """Vide le tampon et retourne son contenu {type: {(conv, user): message_id}}"""
+        with self._lock:
+            drained = self._pending
+            self._pending = {kind: {} for kind in RECEIPT_KINDS}
+        return drained
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(p) for p in self._pending.values())
+
+
+receipt_buffer = ReceiptBuffer()
+
+
+# ============================================
+# ÉCRITURE EN BASE
+# ============================================
+
+def clamp_receipt(conversation_id, user_id, up_to_message_id):
+    """
+    Borne un acquittement aux messages de la conversation reçus par l'utilisateur.
+
+    Returns:
+        int | None: plus grand identifiant de message reçu <= up_to_message_id,
+        None si aucun (identifiant inconnu ou hors conversation)
+    """
+    return Message.objects.filter(
+        conversation_id=conversation_id,
+        id__lte=up_to_message_id,
+    ).exclude(sender_id=user_id).aggregate(max_id=Max('id'))['max_id']
+
+
+def _apply(kind, conversation_id, user_id, up_to_message_id, now):
+    messages = Message.objects.filter(
+        conversation_id=conversation_id,
+        id__lte=up_to_message_id,
+    ).exclude(sender_id=user_id)
+
+    if kind == 'read':
+        # Un message lu est forcément délivré
+        updated = messages.filter(read=False).update(
+            read=True, read_at=now, delivered=True, delivered_at=now
+        )
+        marker_field, marker_date_field = 'last_read_message', 'last_read_at'
+    else:
+        updated = messages.filter(delivered=False).update(delivered=True, delivered_at=now)
+        marker_field, marker_date_field = 'last_delivered_message', 'last_delivered_at'
+
+    moved = ConversationStatus.objects.filter(
+        conversation_id=conversation_id,
+        user_id=user_id,
+    ).filter(
+        Q(**{f'{marker_field}__isnull': True}) | Q(**{f'{marker_field}__lt': up_to_message_id})
+    ).update(**{f'{marker_field}_id': up_to_message_id, marker_date_field: now})
+
+    if not moved:
+        ConversationStatus.objects.get_or_create(
+            conversation_id=conversation_id,
+            user_id=user_id,
+            defaults={f'{marker_field}_id': up_to_message_id, marker_date_field: now},
+        )
+
+    return updated
+
+
+def apply_receipts(kind, conversation_id, user_id, up_to_message_id, now=None):
+    """
+    Applique un acquittement de plage pour un participant.
+
+    Une requête UPDATE pour les messages reçus par l'utilisateur jusqu'à
+    up_to_message_id, plus le déplacement du marqueur haut sur ConversationStatus
+    (jamais en arrière). Le marqueur est posé sur le dernier message reçu de la
+    plage (clamp_receipt): un identifiant inconnu ne peut pas violer la clé étrangère.
+
+    Returns:
+        int: nombre de messages mis à jour
+    """
+    up_to_message_id = clamp_receipt(conversation_id, user_id, up_to_message_id)
+    if up_to_message_id is None:
+        return 0
+    return _apply(kind, conversation_id, user_id, up_to_message_id, now or timezone.now())
+
+
+def flush_receipts(buffer=None):
+    """
+    Écrit en base tous les acquittements en attente, chacun borné par clamp_receipt.
+
+    Returns:
+        list: acquittements appliqués [{'kind', 'conversation_id', 'user_id', 'up_to'}]
+    """
+    buffer = buffer or receipt_buffer
+    drained = buffer.drain()
+    now = timezone.now()
+
+    applied = []
+    for kind in RECEIPT_KINDS:
+        for (conversation_id, user_id), up_to in drained[kind].items():
+            # Un "lu" couvre déjà le "délivré" de la même plage
+            if kind == 'delivered' and drained['read'].get((conversation_id, user_id), 0) >= up_to:
+                continue
+            # Un acquittement invalide ne doit pas faire perdre les autres (tampon déjà vidé)
+            try:
+                up_to = clamp_receipt(conversation_id, user_id, up_to)
+                if up_to is None:
+                    continue
+                _apply(kind, conversation_id, user_id, up_to, now)
+            except Exception:
+                logger.exception(
+                    "Acquittement %s non appliqué (conversation %s, utilisateur %s, message %s)",
+                    kind, conversation_id, user_id, up_to,
+                )
+                continue
+            applied.append({
+                'kind': kind,
+                'conversation_id': conversation_id,
+                'user_id': user_id,
+                'up_to': up_to,
+            })
+    return applied
+
+
+# ============================================
+# PLANIFICATION DU FLUSH (CONSUMERS ASYNC)
+# ============================================
+
+_flush_task = None
+
+
+async def _flush_and_broadcast(channel_layer):
+    """Écrit le tampon puis diffuse les accusés aux participants"""
+    from channels.db import database_sync_to_async
+
+    applied = await database_sync_to_async(flush_receipts)()
+    for receipt in applied:
+        await channel_layer.group_send(
+            f"messages_{receipt['conversation_id']}",
+            {
+                'type': 'message_receipt',
+                'kind': receipt['kind'],
+                'conversation_id': receipt['conversation_id'],
+                'user_id': receipt['user_id'],
+                'up_to': receipt['up_to'],
+            }
+        )
+
+
+async def _delayed_flush(channel_layer):
+    global _flush_task
+    try:
+        await asyncio.sleep(RECEIPTS_FLUSH_INTERVAL)
+    finally:
+        _flush_task = None
+    await _flush_and_broadcast(channel_layer)
+
+
+async def queue_receipt(channel_layer, kind, conversation_id, user_id, up_to_message_id):
+    """
+    Ajoute un acquittement au tampon et planifie un flush.
+
+    Le flush a lieu au plus tard RECEIPTS_FLUSH_INTERVAL secondes après le
+    premier acquittement en attente, ou immédiatement si le tampon est plein.
+    """
+    global _flush_task
+    pending = receipt_buffer.ack(kind, conversation_id, user_id, up_to_message_id)
+
+    if pending >= RECEIPTS_MAX_PENDING:
+        await _flush_and_broadcast(channel_layer)
+    elif _flush_task is None:
+        _flush_task = asyncio.ensure_future(_delayed_flush(channel_layer))
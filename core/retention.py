@@ -0,0 +1,269 @@
+"""
+Rétention des tables d'historique
+Notifications, historique de connexion, logs d'accès aux fichiers, journal
+d'activité et logs admin ne font que grossir. Chaque table a une politique
+(ancienneté maximale, ancienneté maximale des lignes lues, nombre maximal de
+lignes par utilisateur), surchargeable par settings.RETENTION_POLICIES. Les
+lignes expirées sont supprimées (ou archivées puis supprimées) par tranches
+d'identifiants courtes, avec une pause entre deux tranches et une attente
+croissante quand la base est verrouillée: la purge peut tourner en continu à
+côté du trafic sans tenir de verrou long.
+"""
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError, transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .archive import ARCHIVE_CODEC, compress
+from .models import ActivityLog, JournalActivite, LogAccesFichier, LoginHistory, UserNotification
+
+
+# Politiques par défaut. Clés:
+#   date_field: champ daté de la table
+#   max_age_days: ancienneté maximale de toute ligne (None: pas de limite)
+#   read_max_age_days: ancienneté maximale des lignes lues (tables avec "read")
+#   max_rows_per_user: lignes les plus récentes conservées par utilisateur
+#   user_field: champ utilisateur (pour max_rows_per_user)
+#   archive: écrire les lignes sur le stockage de fichiers avant de les supprimer
+DEFAULT_RETENTION_POLICIES = {
+    'notifications': {
+        'model': UserNotification,
+        'date_field': 'created_at',
+        'user_field': 'user',
+        'max_age_days': 180,
+        'read_max_age_days': 30,
+        'max_rows_per_user': 500,
+        'archive': False,
+    },
+    'login_history': {
+        'model': LoginHistory,
+        'date_field': 'timestamp',
+        'user_field': 'user',
+        'max_age_days': 365,
+        'max_rows_per_user': 200,
+        'archive': False,
+    },
+    'file_access_logs': {
+        'model': LogAccesFichier,
+        'date_field': 'created_at',
+        'user_field': 'user',
+        'max_age_days': 365,
+        'archive': True,
+    },
+    'activity_journal': {
+        'model': JournalActivite,
+        'date_field': 'created_at',
+        'user_field': 'user',
+        'max_age_days': 730,
+        'max_rows_per_user': 2000,
+        'archive': False,
+    },
+    'admin_activity': {
+        'model': ActivityLog,
+        'date_field': 'created_at',
+        'max_age_days': 730,
+        'archive': True,
+    },
+}
+
+# Lignes visées par tranche (la largeur de la tranche d'identifiants s'ajuste)
+RETENTION_BATCH_SIZE = getattr(settings, 'RETENTION_BATCH_SIZE', 1000)
+
+# Pause entre deux tranches (secondes)
+RETENTION_SLEEP = getattr(settings, 'RETENTION_SLEEP', 0.1)
+
+# Durée visée d'une tranche: au-delà, la tranche suivante est plus étroite
+RETENTION_TARGET_SECONDS = 0.5
+
+# Tentatives sur une tranche verrouillée, avec attente doublée à chaque fois
+RETENTION_MAX_RETRIES = 5
+
+
+def get_policies():
+    """Politiques effectives (défauts + settings.RETENTION_POLICIES)"""
+    overrides = getattr(settings, 'RETENTION_POLICIES', {})
+    return {
+        name: {**policy, **overrides.get(name, {})}
+        for name, policy in DEFAULT_RETENTION_POLICIES.items()
+    }
+
+
+# ============================================
+# SÉLECTION
+# ============================================
+
+def expired_querysets(policy, now=None):
+    """
+    Lignes à purger, une requête par règle de la politique (et, pour
+    max_rows_per_user, une par utilisateur au-dessus du plafond).
+
+    Returns:
+        list: [(règle, QuerySet)]
+    """
+    now = now or timezone.now()
+    model = policy['model']
+    date_field = policy['date_field']
+    rules = []
+
+    if policy.get('max_age_days'):
+        cutoff = now - timedelta(days=policy['max_age_days'])
+        rules.append(('age', model.objects.filter(**{f'{date_field}__lt': cutoff})))
+
+    if policy.get('read_max_age_days'):
+        cutoff = now - timedelta(days=policy['read_max_age_days'])
+        rules.append(('read', model.objects.filter(read=True, **{f'{date_field}__lt': cutoff})))
+
+    if policy.get('max_rows_per_user'):
+        rules += [('per_user', queryset) for queryset in over_cap_querysets(policy)]
+
+    return rules
+
+
+def over_cap_querysets(policy):
+    """
+    Lignes au-delà des max_rows_per_user plus récentes, une requête par
+    utilisateur au-dessus du plafond.
+
+    Calculé une fois par passe: une agrégation trouve les utilisateurs au-dessus
+    du plafond, puis une lecture par utilisateur (index utilisateur/date) donne la
+    date de la plus ancienne ligne à conserver. Les tranches suppriment ensuite
+    par (utilisateur, date < borne) sans réévaluer l'agrégation.
+    """
+    model = policy['model']
+    user_field = policy['user_field']
+    date_field = policy['date_field']
+    limit = policy['max_rows_per_user']
+
+    over_cap = model.objects.values(user_field).annotate(rows=Count('id')).filter(
+        rows__gt=limit
+    ).values_list(user_field, flat=True)
+
+    querysets = []
+    for user_id in list(over_cap):
+        boundary = model.objects.filter(**{user_field: user_id}).order_by(
+            f'-{date_field}', '-id'
+        ).values_list(date_field, flat=True)[limit - 1]
+        querysets.append(model.objects.filter(**{user_field: user_id, f'{date_field}__lt': boundary}))
+    return querysets
+
+
+# ============================================
+# PURGE
+# ============================================
+
+def archive_rows(name, rows):
+    """Écrit des lignes (dicts) en JSON compressé sur le stockage de fichiers"""
+    data = '\n'.join(json.dumps(row, cls=DjangoJSONEncoder) for row in rows).encode('utf-8')
+    path = (
+        f"retention/{name}/{timezone.now():%Y%m%d}-{rows[0]['id']}-{rows[-1]['id']}"
+        f".jsonl.{'zst' if ARCHIVE_CODEC == 'zstd' else 'gz'}"
+    )
+    return default_storage.save(path, ContentFile(compress(data)))
+
+
+def purge_range(name, policy, queryset, low, high):
+    """Purge une tranche [low, high) d'identifiants; retourne (supprimées, archivées)"""
+    batch = queryset.filter(id__gte=low, id__lt=high)
+    with transaction.atomic():
+        if policy.get('archive'):
+            rows = list(batch.order_by('id').values())
+            if not rows:
+                return 0, 0
+            archive_rows(name, rows)
+            deleted, _ = policy['model'].objects.filter(id__in=[r['id'] for r in rows]).delete()
+            return deleted, len(rows)
+        deleted, _ = policy['model'].objects.filter(id__in=batch.values('id')).delete()
+        return deleted, 0
+
+
+def prune(name, policy=None, batch_size=None, sleep=None, dry_run=False, progress=None):
+    """
+    Applique une politique.
+
+    Chaque règle est parcourue par tranches d'identifiants [low, high): une
+    tranche ne verrouille que ses lignes et reste courte. La largeur de tranche
+    part de batch_size et s'ajuste pour viser batch_size lignes purgées en moins
+    de RETENTION_TARGET_SECONDS.
+
+    Args:
+        dry_run: compter sans supprimer
+        progress: appelé avec les statistiques après chaque tranche
+
+    Returns:
+        dict: {'policy', 'deleted', 'archived', 'batches', 'retries', 'seconds', 'rows_per_second'}
+    """
+    policy = policy or get_policies()[name]
+    batch_size = batch_size or RETENTION_BATCH_SIZE
+    sleep = RETENTION_SLEEP if sleep is None else sleep
+    stats = {'policy': name, 'deleted': 0, 'archived': 0, 'batches': 0, 'retries': 0}
+    started = time.monotonic()
+
+    def report():
+        stats['seconds'] = round(time.monotonic() - started, 2)
+        stats['rows_per_second'] = round(stats['deleted'] / stats['seconds'], 1) if stats['seconds'] else 0
+        if progress:
+            progress(stats)
+
+    rules = expired_querysets(policy)
+    if dry_run:
+        # Les règles se recoupent (une notification lue ancienne relève de "age" et
+        # de "read"): une ligne n'est comptée qu'une fois. Les requêtes par
+        # utilisateur sont disjointes entre elles: seules les lignes hors des
+        # règles globales y sont comptées
+        union = Q()
+        for rule, queryset in rules:
+            if rule != 'per_user':
+                union |= Q(id__in=queryset.values('id'))
+        if union:
+            stats['deleted'] += policy['model'].objects.filter(union).count()
+        for rule, queryset in rules:
+            if rule == 'per_user':
+                stats['deleted'] += (queryset.exclude(union) if union else queryset).count()
+        rules = []
+
+    for rule, queryset in rules:
+
+        bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            continue
+        low, span = bounds['low'], batch_size
+        while low <= bounds['high']:
+            high = low + span
+            delay = sleep or 0.05
+            for attempt in range(RETENTION_MAX_RETRIES + 1):
+                try:
+                    batch_started = time.monotonic()
+                    deleted, archived = purge_range(name, policy, queryset, low, high)
+                    elapsed = time.monotonic() - batch_started
+                    break
+                except OperationalError:
+                    # Base verrouillée par le trafic: attendre de plus en plus longtemps
+                    if attempt == RETENTION_MAX_RETRIES:
+                        raise
+                    stats['retries'] += 1
+                    time.sleep(delay)
+                    delay *= 2
+
+            stats['deleted'] += deleted
+            stats['archived'] += archived
+            stats['batches'] += 1
+            low = high
+
+            # Tranche suivante: plus large si peu de lignes, plus étroite si trop lente
+            if elapsed > RETENTION_TARGET_SECONDS:
+                span = max(1, span // 2)
+            elif deleted < batch_size // 2:
+                span = min(span * 2, batch_size * 1000)
+            if deleted:
+                report()
+                time.sleep(sleep)
+
+    report()
+    return stats
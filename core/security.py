@@ -3,7 +3,6 @@ Module de sécurité et anti-fraude pour Transpareo Connect
 Détection automatique de spam, arnaques et contenus inappropriés
 """
 import re
-from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib import messages
@@ -50,15 +49,177 @@ SUSPICIOUS_URL_PATTERN = re.compile(
     re.IGNORECASE
 )
 
+# Offres trop belles pour être vraies
+TOO_GOOD_PHRASES = ['gagnez rapidement', 'rendement garanti', '100% sûr']
+
+# Mots-clés et domaines vérifiés par Message.check_suspicious_content
+MESSAGE_SUSPICIOUS_KEYWORDS = [
+    'virement', 'argent', 'prêt', 'gagner', 'gratuit', 'urgent',
+    'cliquez ici', 'offre limitée', 'héritage', 'loterie',
+    'compte suspendu', 'vérifier votre compte', 'banque'
+]
+MESSAGE_SUSPICIOUS_DOMAINS = ['bit.ly', 'tinyurl.com', 't.co']
+
+# Demandes d'argent hors plateforme
+MONEY_PATTERNS = [
+    r'virement\s+(?:bancaire|urgent)',
+    r'payer\s+(?:d\'abord|avant)',
+    r'frais?\s+(?:de|à)\s+(?:déblocage|activation)',
+    r'envoyer\s+de\s+l\'argent',
+    r'transfert\s+d\'argent'
+]
+
+# Menaces et références à la violence
+THREAT_PATTERNS = [
+    r'je\s+(?:vais|vais\s+te)\s+(?:tuer|frapper|attaquer)',
+    r'(?:mort|suicide|violence)',
+]
+
+
+# ============================================
+# MOTEUR DE DÉTECTION (UNE PASSE SUR LE TEXTE)
+# ============================================
+
+class KeywordAutomaton:
+    """
+    Automate d'Aho–Corasick sur un ensemble de mots-clés classés par catégorie.
+
+    Construit une fois; find() parcourt le texte en une seule passe et trouve toutes
+    les occurrences (y compris imbriquées) en temps linéaire dans la longueur du
+    texte, quel que soit le nombre de mots-clés.
+    """
+
+    def __init__(self, keywords_by_category):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for category, keywords in keywords_by_category.items():
+            for keyword in keywords:
+                state = 0
+                for char in keyword.lower():
+                    next_state = self._goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][char] = next_state
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._output.append(())
+                    state = next_state
+                self._output[state] += ((category, keyword),)
+
+        # Liens d'échec en largeur; les sorties héritent de celles du lien d'échec
+        pending = list(self._goto[0].values())
+        while pending:
+            state = pending.pop(0)
+            for char, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """Occurrences dans text (déjà en minuscules): (position de fin, catégorie, mot-clé)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for category, keyword in output[state]:
+                    yield position, category, keyword
+
+    def find(self, text):
+        """Mots-clés présents dans text (déjà en minuscules): {catégorie: set(mots-clés)}"""
+        found = {}
+        for _, category, keyword in self.iter_matches(text):
+            found.setdefault(category, set()).add(keyword)
+        return found
+
+    def __len__(self):
+        return len(self._goto)
+
+
+# Règles par expression régulière: l'automate repère leurs ancrages (chaque motif
+# commence par l'un d'eux) et l'expression n'est essayée qu'à ces positions
+RULE_PATTERNS = {
+    'url': re.compile(r'https?://[^\s<>"\']+'),
+    'money': re.compile('|'.join(MONEY_PATTERNS)),
+    'threat': re.compile('|'.join(THREAT_PATTERNS)),
+}
+RULE_ANCHORS = {
+    'url': ['http'],
+    'money': ['virement', 'payer', 'frai', 'envoyer', 'transfert'],
+    'threat': ['je', 'mort', 'suicide', 'violence'],
+}
+
+KEYWORD_AUTOMATON = KeywordAutomaton({
+    'spam': SPAM_KEYWORDS,
+    'fraud': FRAUD_KEYWORDS,
+    'inappropriate': INAPPROPRIATE_KEYWORDS,
+    'short_domain': SUSPICIOUS_DOMAINS,
+    'too_good': TOO_GOOD_PHRASES,
+    'message': MESSAGE_SUSPICIOUS_KEYWORDS,
+    **{f'rule:{rule}': anchors for rule, anchors in RULE_ANCHORS.items()},
+})
+
+
+def scan_content(content):
+    """
+    Analyse un contenu en une seule passe de l'automate (mots-clés et ancrages des
+    règles), les expressions régulières n'étant vérifiées qu'aux ancrages trouvés.
+
+    Returns:
+        dict: {
+            'keywords': {catégorie: set(mots-clés trouvés)},
+            'urls': list,
+            'suspicious_urls': int,
+            'money_request': bool,
+            'threat': bool
+        }
+    """
+    content_lower = (content or '').lower()
+    keywords = {}
+    rules = {'url': [], 'money': False, 'threat': False}
+
+    for end, category, keyword in KEYWORD_AUTOMATON.iter_matches(content_lower):
+        if not category.startswith('rule:'):
+            keywords.setdefault(category, set()).add(keyword)
+            continue
+        rule = category[5:]
+        if rules[rule] is True:
+            continue
+        match = RULE_PATTERNS[rule].match(content_lower, end - len(keyword) + 1)
+        if match:
+            if rule == 'url':
+                rules['url'].append(match.group())
+            else:
+                rules[rule] = True
+
+    return {
+        'keywords': keywords,
+        'urls': rules['url'],
+        'suspicious_urls': sum(1 for url in rules['url'] if SUSPICIOUS_URL_PATTERN.match(url)),
+        'money_request': rules['money'],
+        'threat': rules['threat'],
+    }
+
 
 # ============================================
 # DÉTECTION DE SPAM
 # ============================================
 
-def detect_spam(content, user=None):
+def detect_spam(content, user=None, scan=None):
     """
     Détecte si un contenu est du spam
     
+    Args:
+        scan: résultat de scan_content(content) déjà calculé (évite une seconde passe)
+    
     Returns:
         dict: {
             'is_spam': bool,
@@ -67,24 +228,25 @@ def detect_spam(content, user=None):
             'auto_quarantine': bool
         }
     """
-    content_lower = content.lower()
+    scan = scan or scan_content(content)
+    keywords = scan['keywords']
     score = 0
     reasons = []
     
     # Vérifier les mots-clés spam
-    spam_count = sum(1 for keyword in SPAM_KEYWORDS if keyword in content_lower)
+    spam_count = len(keywords.get('spam', ()))
     if spam_count > 0:
         score += spam_count * 10
         reasons.append(f"Contient {spam_count} mot(s)-clé(s) suspect(s)")
     
     # Vérifier les liens suspects
-    suspicious_links = SUSPICIOUS_URL_PATTERN.findall(content)
+    suspicious_links = scan['suspicious_urls']
     if suspicious_links:
-        score += len(suspicious_links) * 15
-        reasons.append(f"Contient {len(suspicious_links)} lien(s) suspect(s)")
+        score += suspicious_links * 15
+        reasons.append(f"Contient {suspicious_links} lien(s) suspect(s)")
     
     # Vérifier les liens raccourcis
-    short_urls = [domain for domain in SUSPICIOUS_DOMAINS if domain in content_lower]
+    short_urls = keywords.get('short_domain', ())
     if short_urls:
         score += len(short_urls) * 20
         reasons.append(f"Contient {len(short_urls)} lien(s) raccourci(s) suspect(s)")
@@ -118,10 +280,13 @@ def detect_spam(content, user=None):
 # DÉTECTION D'ARNAQUES
 # ============================================
 
-def detect_fraud(content, user=None):
+def detect_fraud(content, user=None, scan=None):
     """
     Détecte si un contenu est une arnaque
     
+    Args:
+        scan: résultat de scan_content(content) déjà calculé (évite une seconde passe)
+    
     Returns:
         dict: {
             'is_fraud': bool,
@@ -130,33 +295,24 @@ def detect_fraud(content, user=None):
             'alert_admin': bool
         }
     """
-    content_lower = content.lower()
+    scan = scan or scan_content(content)
+    keywords = scan['keywords']
     score = 0
     reasons = []
     
     # Vérifier les mots-clés d'arnaque
-    fraud_count = sum(1 for keyword in FRAUD_KEYWORDS if keyword in content_lower)
+    fraud_count = len(keywords.get('fraud', ()))
     if fraud_count > 0:
         score += fraud_count * 25
         reasons.append(f"Contient {fraud_count} mot(s)-clé(s) d'arnaque")
     
     # Vérifier les demandes d'argent hors plateforme
-    money_patterns = [
-        r'virement\s+(?:bancaire|urgent)',
-        r'payer\s+(?:d\'abord|avant)',
-        r'frais?\s+(?:de|à)\s+(?:déblocage|activation)',
-        r'envoyer\s+de\s+l\'argent',
-        r'transfert\s+d\'argent'
-    ]
-    
-    for pattern in money_patterns:
-        if re.search(pattern, content_lower):
-            score += 30
-            reasons.append("Demande d'argent suspecte")
-            break
+    if scan['money_request']:
+        score += 30
+        reasons.append("Demande d'argent suspecte")
     
     # Vérifier les offres trop bonnes pour être vraies
-    if any(phrase in content_lower for phrase in ['gagnez rapidement', 'rendement garanti', '100% sûr']):
+    if keywords.get('too_good'):
         score += 20
         reasons.append("Offre suspecte (trop belle pour être vraie)")
     
@@ -175,10 +331,13 @@ def detect_fraud(content, user=None):
 # DÉTECTION DE CONTENUS INAPPROPRIÉS
 # ============================================
 
-def detect_inappropriate(content, user=None):
+def detect_inappropriate(content, user=None, scan=None):
     """
     Détecte si un contenu est inapproprié (insultes, violence)
     
+    Args:
+        scan: résultat de scan_content(content) déjà calculé (évite une seconde passe)
+    
     Returns:
         dict: {
             'is_inappropriate': bool,
@@ -187,27 +346,20 @@ def detect_inappropriate(content, user=None):
             'auto_quarantine': bool
         }
     """
-    content_lower = content.lower()
+    scan = scan or scan_content(content)
     score = 0
     reasons = []
     
     # Vérifier les mots-clés inappropriés
-    inappropriate_count = sum(1 for keyword in INAPPROPRIATE_KEYWORDS if keyword in content_lower)
+    inappropriate_count = len(scan['keywords'].get('inappropriate', ()))
     if inappropriate_count > 0:
         score += inappropriate_count * 20
         reasons.append(f"Contient {inappropriate_count} mot(s) inapproprié(s)")
     
     # Vérifier les menaces
-    threat_patterns = [
-        r'je\s+(?:vais|vais\s+te)\s+(?:tuer|frapper|attaquer)',
-        r'(?:mort|suicide|violence)',
-    ]
-    
-    for pattern in threat_patterns:
-        if re.search(pattern, content_lower):
-            score += 40
-            reasons.append("Contient des menaces ou références à la violence")
-            break
+    if scan['threat']:
+        score += 40
+        reasons.append("Contient des menaces ou références à la violence")
     
     is_inappropriate = score >= 20
     auto_quarantine = score >= 50
@@ -239,9 +391,10 @@ def detect_suspicious_content(content, user=None):
             'should_alert_admin': bool
         }
     """
-    spam_result = detect_spam(content, user)
-    fraud_result = detect_fraud(content, user)
-    inappropriate_result = detect_inappropriate(content, user)
+    scan = scan_content(content)
+    spam_result = detect_spam(content, user, scan)
+    fraud_result = detect_fraud(content, user, scan)
+    inappropriate_result = detect_inappropriate(content, user, scan)
     
     max_score = max(
         spam_result['score'],
@@ -276,6 +429,20 @@ def detect_suspicious_content(content, user=None):
     }
 
 
+def score_rows(rows):
+    """
+    Analyse un lot de contenus (fonction de worker multiprocessing: aucune requête
+    en base, arguments et résultat sérialisables).
+
+    Args:
+        rows: [(id, content)]
+
+    Returns:
+        list: [(id, résultat de detect_suspicious_content)]
+    """
+    return [(row_id, detect_suspicious_content(content or '')) for row_id, content in rows]
+
+
 # ============================================
 # DÉTECTION DE BOTS
 # ============================================
@@ -368,25 +535,12 @@ def check_rate_limit(user, action_type, limit, window_seconds=3600):
     if not user or not user.is_authenticated:
         return {'allowed': False, 'remaining': 0, 'reset_at': None}
     
-    cache_key = f'rate_limit_{action_type}_{user.id}'
-    current_count = cache.get(cache_key, 0)
-    
-    if current_count >= limit:
-        ttl = cache.ttl(cache_key)
-        reset_at = timezone.now() + timedelta(seconds=ttl if ttl else window_seconds)
-        return {
-            'allowed': False,
-            'remaining': 0,
-            'reset_at': reset_at
-        }
-    
-    # Incrémenter le compteur
-    cache.set(cache_key, current_count + 1, window_seconds)
-    
+    from .rate_limit import hit
+    status = hit(f'action:{action_type}', user.id, limit, window_seconds)
     return {
-        'allowed': True,
-        'remaining': limit - (current_count + 1),
-        'reset_at': timezone.now() + timedelta(seconds=window_seconds)
+        'allowed': status['allowed'],
+        'remaining': status['remaining'],
+        'reset_at': status['reset_at']
     }
 
 
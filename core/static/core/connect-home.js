@@ -558,6 +558,146 @@ if (notificationsBtn) {
     });
 }
 
+// ========== NOTIFICATIONS TEMPS RÉEL ==========
+// Poussées sur le groupe user_<id> du WebSocket de messagerie; à chaque
+// (re)connexion le client envoie le dernier id reçu et le serveur renvoie
+// les notifications manquées (trame notifications_sync). Le dernier id est
+// conservé par utilisateur: un autre compte sur le même navigateur repart de zéro.
+
+const notificationStream = {
+    socket: null,
+    retryDelay: 1000,
+    memoryLastId: null,
+
+    get storageKey() {
+        const userId = notificationsBtn && notificationsBtn.dataset.userId;
+        return userId ? `connect.notifications.lastId.${userId}` : null;
+    },
+
+    get lastId() {
+        const stored = this.storageKey ? localStorage.getItem(this.storageKey) : this.memoryLastId;
+        const value = parseInt(stored, 10);
+        return Number.isNaN(value) ? null : value;
+    },
+
+    set lastId(value) {
+        if (this.storageKey) {
+            localStorage.setItem(this.storageKey, String(value));
+        } else {
+            this.memoryLastId = value;
+        }
+    },
+
+    connect() {
+        // Ancienne clé commune à tous les comptes
+        localStorage.removeItem('connect.notifications.lastId');
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        try {
+            this.socket = new WebSocket(`${protocol}//${window.location.host}/ws/messages/`);
+        } catch (error) {
+            console.error('Notifications WebSocket error:', error);
+            return;
+        }
+
+        this.socket.onopen = () => {
+            this.retryDelay = 1000;
+            this.socket.send(JSON.stringify({ type: 'notifications_resume', last_id: this.lastId }));
+        };
+
+        this.socket.onmessage = (event) => {
+            let data;
+            try {
+                data = JSON.parse(event.data);
+            } catch (e) {
+                return;
+            }
+            if (data.type === 'notification') {
+                const notification = data.notification;
+                // Une notification regroupée ne compte que si elle avait été lue
+                if (this.receive([notification]) && (!notification.collapsed || notification.reopened)) {
+                    setNotificationBadge(getNotificationBadgeCount() + 1);
+                }
+            } else if (data.type === 'notifications_sync') {
+                this.receive(data.notifications);
+                setNotificationBadge(data.unread_count);
+                if (data.last_id > (this.lastId || 0)) {
+                    this.lastId = data.last_id;
+                }
+            }
+        };
+
+        this.socket.onclose = () => {
+            // Reconnexion avec attente croissante (max 30s)
+            setTimeout(() => this.connect(), this.retryDelay);
+            this.retryDelay = Math.min(this.retryDelay * 2, 30000);
+        };
+    },
+
+    receive(notifications) {
+        let received = 0;
+        (notifications || []).forEach((notification) => {
+            // Ignorer les doublons (poussée reçue pendant la reprise)
+            if (this.lastId !== null && notification.id <= this.lastId) return;
+            this.lastId = notification.id;
+            prependNotificationPreview(notification);
+            received += 1;
+        });
+        return received;
+    }
+};
+
+function getNotificationBadgeCount() {
+    const badge = notificationsBtn && notificationsBtn.querySelector('.nav-badge');
+    return badge ? parseInt(badge.textContent, 10) || 0 : 0;
+}
+
+function setNotificationBadge(count) {
+    if (!notificationsBtn) return;
+    let badge = notificationsBtn.querySelector('.nav-badge');
+    if (count > 0) {
+        if (!badge) {
+            badge = document.createElement('span');
+            badge.className = 'nav-badge';
+            notificationsBtn.insertBefore(badge, notificationsDropdown);
+        }
+        badge.textContent = count;
+    } else if (badge) {
+        badge.remove();
+    }
+}
+
+function prependNotificationPreview(notification) {
+    const list = document.getElementById('notifications-preview');
+    if (!list) return;
+    const previous = list.querySelector(`[data-notification-id="${notification.id}"]`);
+    if (previous) previous.remove();
+    // Notification regroupée: réinsérée sous un nouvel id, remplace l'élément de même clé
+    if (notification.collapse_key) {
+        list.querySelectorAll('[data-collapse-key]').forEach((element) => {
+            if (element.dataset.collapseKey === notification.collapse_key) element.remove();
+        });
+    }
+    const item = document.createElement('a');
+    item.className = 'notification-item unread';
+    item.dataset.notificationId = notification.id;
+    if (notification.collapse_key) item.dataset.collapseKey = notification.collapse_key;
+    item.href = notification.action_url || '#';
+    const title = document.createElement('strong');
+    title.textContent = notification.title;
+    const message = document.createElement('p');
+    message.textContent = notification.message;
+    item.append(title, message);
+    list.prepend(item);
+    // Garder l'aperçu court
+    while (list.children.length > 10) {
+        list.lastElementChild.remove();
+    }
+}
+
+if (notificationsBtn && 'WebSocket' in window) {
+    notificationStream.connect();
+}
+
 // User menu dropdown
 const userMenuBtn = document.getElementById('user-menu-btn');
 const userMenu = document.getElementById('user-menu');
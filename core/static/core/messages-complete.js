@@ -15,11 +15,15 @@ window.messagesState = {
     unreadCounts: {},
     onlineUsers: new Set(),
     typingUsers: new Set(),
+    conversationsCursor: null,
+    isLoadingConversations: false,
     websocket: null,
+    heartbeatTimer: null,
     searchDebounceTimer: null,
     typingDebounceTimer: null,
     voiceRecording: null,
     mediaRecorder: null,
+    activeCall: null,
     selectedMedia: [],
     selectedFiles: [],
     selectedRecipients: [],
@@ -85,6 +89,16 @@ document.addEventListener('DOMContentLoaded', function() {
     // Setup event listeners
     setupEventListeners();
     
+    // Charger la page suivante de conversations en fin de liste
+    const conversationsList = document.getElementById('conversations-list');
+    if (conversationsList) {
+        conversationsList.addEventListener('scroll', function() {
+            if (this.scrollTop + this.clientHeight >= this.scrollHeight - 200) {
+                loadMoreConversations();
+            }
+        });
+    }
+    
     // S'assurer que le bouton détails est bien attaché
     const detailsBtn = document.querySelector('[onclick="toggleDetailsPanel()"]');
     if (detailsBtn) {
@@ -115,6 +129,13 @@ function initWebSocket() {
         
         state.websocket.onopen = function() {
             console.log('✓ WebSocket connected');
+            // Heartbeat de présence (le serveur expire la présence après 60s)
+            clearInterval(state.heartbeatTimer);
+            state.heartbeatTimer = setInterval(() => {
+                if (state.websocket && state.websocket.readyState === WebSocket.OPEN) {
+                    state.websocket.send(JSON.stringify({ type: 'heartbeat' }));
+                }
+            }, 20000);
             if (state.currentUserId) {
                 state.websocket.send(JSON.stringify({
                     type: 'subscribe',
@@ -157,7 +178,7 @@ function handleWebSocketMessage(data) {
             handleNewMessage(data.message);
             break;
         case 'message_read':
-            handleMessageRead(data.messageId, data.userId);
+            handleMessageRead(data.messageId, data.userId, data.conversationId);
             break;
         case 'typing_start':
             handleTypingStart(data.conversationId, data.userId);
@@ -174,6 +195,16 @@ function handleWebSocketMessage(data) {
         case 'reaction_update':
             handleReactionUpdate(data.reaction);
             break;
+        case 'call':
+            handleCallEvent(data.call);
+            break;
+        case 'call_error':
+            console.warn('Appel:', data.error);
+            if (state.activeCall && (!data.callId || data.callId === state.activeCall.id)) {
+                alert(data.error);
+                endLocalCall();
+            }
+            break;
     }
 }
 
@@ -183,21 +214,35 @@ function handleNewMessage(message) {
         addMessageToUI(message);
         scrollToBottom(false); // Auto-scroll seulement si en bas
         markMessageAsRead(message.id);
+    } else if (message.sender_id !== state.currentUserId) {
+        sendReceipt(message.conversation_id, 'delivered', message.id);
     }
     // Mettre à jour la liste des conversations
     updateConversationInList(message.conversation_id);
     loadConversations();
 }
 
-function handleMessageRead(messageId, userId) {
-    const messageEl = document.querySelector(`[data-message-id="${messageId}"]`);
-    if (messageEl) {
+function handleMessageRead(messageId, userId, conversationId) {
+    // L'accusé couvre tous les messages jusqu'à messageId inclus
+    if (userId === state.currentUserId) {
+        return;
+    }
+    const messages = state.messages[conversationId] || [];
+    messages.forEach(msg => {
+        if (msg.id <= messageId && msg.sender_id === state.currentUserId) {
+            msg.read = true;
+        }
+    });
+    document.querySelectorAll('[data-message-id]').forEach(messageEl => {
+        if (parseInt(messageEl.dataset.messageId) > messageId) {
+            return;
+        }
         const statusEl = messageEl.querySelector('.message-status');
         if (statusEl) {
             statusEl.innerHTML = '<svg viewBox="0 0 24 24" fill="currentColor"><path d="M9 16.17L4.83 12l-1.42 1.41L9 19 21 7l-1.41-1.41z"/></svg>';
             statusEl.classList.add('read');
         }
-    }
+    });
 }
 
 function handleTypingStart(conversationId, userId) {
@@ -234,7 +279,8 @@ function handleReactionUpdate(reaction) {
 // CHARGEMENT DONNÉES
 // ============================================
 
-function loadConversations() {
+function loadConversations(cursor = null) {
+    // Liste paginée: la première page remplace la liste, les suivantes s'ajoutent
     const filter = state.currentFilter;
     const search = state.searchQuery;
     
@@ -242,8 +288,10 @@ function loadConversations() {
     const params = new URLSearchParams();
     if (filter !== 'all') params.append('filter', filter);
     if (search) params.append('search', search);
+    if (cursor) params.append('cursor', cursor);
     if (params.toString()) url += '?' + params.toString();
     
+    state.isLoadingConversations = true;
     fetch(url, {
         credentials: 'same-origin',
         headers: {
@@ -253,16 +301,31 @@ function loadConversations() {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-            state.conversations = data.conversations || [];
-                state.unreadCounts = data.unread_counts || {};
-            renderConversationsList();
+                if (cursor) {
+                    state.conversations = state.conversations.concat(data.conversations || []);
+                    Object.assign(state.unreadCounts, data.unread_counts || {});
+                } else {
+                    state.conversations = data.conversations || [];
+                    state.unreadCounts = data.unread_counts || {};
+                }
+                state.conversationsCursor = data.next_cursor || null;
+                renderConversationsList();
             }
         })
         .catch(error => {
             console.error('Error loading conversations:', error);
+        })
+        .finally(() => {
+            state.isLoadingConversations = false;
         });
 }
 
+function loadMoreConversations() {
+    if (state.conversationsCursor && !state.isLoadingConversations) {
+        loadConversations(state.conversationsCursor);
+    }
+}
+
 function loadMessages(conversationId, before = null) {
     if (!conversationId) {
         console.error('loadMessages: conversationId is required');
@@ -498,6 +561,7 @@ function renderMessages(before = null) {
                             <span class="message-time">${formatTime(messageDate)}</span>
                             ${isSent ? renderMessageStatus(message) : ''}
                         </div>
+                        ${renderReactions(message.reactions)}
                     </div>
                 </div>
             `;
@@ -907,17 +971,20 @@ window.sendMessage = function() {
         formData.append(`image_${index}`, file);
     });
     
-    state.selectedFiles.forEach((file, index) => {
-        formData.append(`file_${index}`, file);
-    });
-    
-    fetch('/api/connect/messages/', {
-        method: 'POST',
-        credentials: 'same-origin',
-        headers: {
-            'X-CSRFToken': csrfToken
-        },
-        body: formData
+    // Documents: téléversement fractionné et reprenable avant l'envoi du message
+    Promise.all(state.selectedFiles.map(file => uploadAttachmentChunked(file, csrfToken)))
+    .then(uploadIds => {
+        if (uploadIds.length > 0) {
+            formData.append('attachment_ids', uploadIds.join(','));
+        }
+        return fetch('/api/connect/messages/', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {
+                'X-CSRFToken': csrfToken
+            },
+            body: formData
+        });
     })
     .then(async response => {
         const contentType = response.headers.get('content-type');
@@ -968,6 +1035,70 @@ window.sendMessage = function() {
     });
 };
 
+async function sha256Hex(file) {
+    if (!window.crypto || !window.crypto.subtle) {
+        return '';
+    }
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function uploadAttachmentChunked(file, csrfToken) {
+    const initData = new FormData();
+    initData.append('filename', file.name);
+    initData.append('size', file.size);
+    initData.append('content_type', file.type || '');
+    initData.append('checksum', await sha256Hex(file));
+    
+    const initResponse = await fetch('/api/connect/uploads/', {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'X-CSRFToken': csrfToken },
+        body: initData
+    });
+    const upload = await initResponse.json();
+    if (!initResponse.ok) {
+        throw new Error(upload.error || 'Téléversement impossible');
+    }
+    
+    const url = `/api/connect/uploads/${upload.upload_id}/`;
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + upload.chunk_size);
+        try {
+            const response = await fetch(url, {
+                method: 'PUT',
+                credentials: 'same-origin',
+                headers: {
+                    'X-CSRFToken': csrfToken,
+                    'Upload-Offset': offset,
+                    'Content-Type': 'application/octet-stream'
+                },
+                body: chunk
+            });
+            const data = await response.json();
+            if (response.status === 409 && typeof data.offset === 'number') {
+                offset = data.offset;  // Reprendre à l'offset connu du serveur
+                continue;
+            }
+            if (!response.ok) {
+                throw new Error(data.error || `HTTP error! status: ${response.status}`);
+            }
+            offset = data.offset;
+            retries = 0;
+        } catch (error) {
+            if (++retries > 3) {
+                throw error;
+            }
+            // Coupure réseau: relire l'offset côté serveur puis reprendre
+            const status = await fetch(url, { credentials: 'same-origin' }).then(r => r.json());
+            offset = status.offset;
+        }
+    }
+    return upload.upload_id;
+}
+
 function addMessageToUI(message) {
     const container = document.getElementById('messages-container');
     if (!container) return;
@@ -1446,10 +1577,23 @@ window.handleInputChange = function() {
 };
 
 function sendTypingIndicator(isTyping) {
-    if (!state.activeConversationId || !state.websocket || state.websocket.readyState !== WebSocket.OPEN) {
+    if (!state.activeConversationId) {
+        return;
+    }
+    if (!state.websocket || state.websocket.readyState !== WebSocket.OPEN) {
+        sendTypingIndicatorHttp(isTyping);
         return;
     }
     
+    // Les trames sont regroupées et limitées côté serveur (aucune écriture en base)
+    state.websocket.send(JSON.stringify({
+        type: 'typing',
+        conversation_id: state.activeConversationId,
+        is_typing: isTyping
+    }));
+}
+
+function sendTypingIndicatorHttp(isTyping) {
     fetch(`/api/connect/conversations/${state.activeConversationId}/typing/`, {
         method: 'POST',
         credentials: 'same-origin',
@@ -1654,22 +1798,48 @@ function scrollToBottom(force = false) {
 }
 
 function markConversationAsRead(conversationId) {
-    // Marquer tous les messages non lus comme lus
+    // Un seul accusé "lu jusqu'au dernier message reçu" pour toute la conversation
     const messages = state.messages[conversationId] || [];
+    let upTo = null;
     messages.forEach(msg => {
-        if (msg.sender_id !== state.currentUserId && !msg.read) {
-            markMessageAsRead(msg.id);
+        if (msg.sender_id !== state.currentUserId && !msg.read && (upTo === null || msg.id > upTo)) {
+            upTo = msg.id;
         }
     });
+    if (upTo !== null) {
+        sendReceipt(conversationId, 'read', upTo);
+    }
 }
 
 function markMessageAsRead(messageId) {
-    fetch(`/api/connect/messages/${messageId}/read/`, {
+    if (state.activeConversationId) {
+        sendReceipt(state.activeConversationId, 'read', messageId);
+    }
+}
+
+function sendReceipt(conversationId, kind, upTo) {
+    // Accusés regroupés côté serveur; repli HTTP si le WebSocket est fermé
+    if (state.websocket && state.websocket.readyState === WebSocket.OPEN) {
+        state.websocket.send(JSON.stringify({
+            type: 'ack',
+            kind: kind,
+            conversation_id: conversationId,
+            up_to: upTo
+        }));
+        return;
+    }
+    if (kind !== 'read') {
+        return;
+    }
+    const formData = new FormData();
+    formData.append('up_to', upTo);
+    fetch(`/api/connect/conversations/${conversationId}/read/`, {
         method: 'POST',
         credentials: 'same-origin',
         headers: {
             'X-CSRFToken': getCSRFToken()
-        }
+        },
+        body: formData
     }).catch(error => {
         console.error('Error marking message as read:', error);
     });
@@ -1681,18 +1851,63 @@ function updateConversationInList(conversationId) {
 }
 
 function updateOnlineStatus(userId, isOnline) {
-    // Mettre à jour le badge online dans la liste
-    const conversationItem = document.querySelector(`[data-conversation-id]`);
-    if (conversationItem) {
-        const badge = conversationItem.querySelector('.online-badge');
+    // Mettre à jour le badge online des conversations avec cet utilisateur
+    state.conversations.forEach(conv => {
+        const otherUser = conv.other_user || {};
+        if (otherUser.id !== userId) return;
+        otherUser.is_online = isOnline;
+        
+        const avatar = document.querySelector(`[data-conversation-id="${conv.id}"] .conversation-avatar`);
+        if (!avatar) return;
+        let badge = avatar.querySelector('.online-badge');
+        if (isOnline && !badge) {
+            badge = document.createElement('span');
+            badge.className = 'online-badge';
+            avatar.appendChild(badge);
+        }
         if (badge) {
             badge.style.display = isOnline ? 'block' : 'none';
         }
+    });
+}
+
+function renderReactions(reactions) {
+    if (!reactions || reactions.length === 0) {
+        return '';
     }
+    return `<div class="message-reactions">${reactions.map(r => `
+        <span class="reaction-chip ${r.me ? 'mine' : ''}" data-emoji="${escapeHtml(r.emoji)}">${escapeHtml(r.emoji)} ${r.count}</span>
+    `).join('')}</div>`;
 }
 
 function updateMessageReactions(messageEl, reaction) {
-    // À implémenter
+    // Résumé complet {emoji: nombre} poussé par le serveur; "moi" déduit de l'auteur
+    const messageId = parseInt(messageEl.dataset.messageId);
+    const conversationMessages = state.messages[state.activeConversationId] || [];
+    const message = conversationMessages.find(m => m.id === messageId);
+    const previous = message && message.reactions ? message.reactions : [];
+    
+    const reactions = Object.entries(reaction.counts || {})
+        .sort((a, b) => b[1] - a[1])
+        .map(([emoji, count]) => {
+            let me = previous.some(r => r.emoji === emoji && r.me);
+            if (reaction.user_id === state.currentUserId && emoji === reaction.emoji) {
+                me = reaction.action === 'added';
+            }
+            return { emoji: emoji, count: count, me: me };
+        });
+    if (message) {
+        message.reactions = reactions;
+    }
+    
+    const bubble = messageEl.querySelector('.message-bubble');
+    const existing = messageEl.querySelector('.message-reactions');
+    if (existing) {
+        existing.remove();
+    }
+    if (bubble && reactions.length > 0) {
+        bubble.insertAdjacentHTML('beforeend', renderReactions(reactions));
+    }
 }
 
 function updateMediaPreview() {
@@ -2261,16 +2476,182 @@ function insertGif(url) {
         });
 }
 
+// ============================================
+// APPELS (WebRTC, signalisation par WebSocket)
+// ============================================
+
+const CALL_ICE_SERVERS = [{ urls: 'stun:stun.l.google.com:19302' }];
+
+function sendCallSignal(action, payload) {
+    if (!state.websocket || state.websocket.readyState !== WebSocket.OPEN) {
+        alert('Connexion temps réel indisponible');
+        return false;
+    }
+    state.websocket.send(JSON.stringify(Object.assign({ type: 'call', action: action }, payload)));
+    return true;
+}
+
+function createCallConnection(call) {
+    const pc = new RTCPeerConnection({ iceServers: CALL_ICE_SERVERS });
+    pc.onicecandidate = function(event) {
+        if (!event.candidate) return;
+        if (call.id) {
+            sendCallSignal('ice', { call_id: call.id, candidate: event.candidate });
+        } else {
+            // Identifiant d'appel pas encore reçu (événement "ringing")
+            call.pendingCandidates.push(event.candidate);
+        }
+    };
+    pc.ontrack = function(event) {
+        showCallMedia(call, event.streams[0]);
+    };
+    return pc;
+}
+
+function showCallMedia(call, remoteStream) {
+    let overlay = document.getElementById('call-overlay');
+    if (!overlay) {
+        overlay = document.createElement('div');
+        overlay.id = 'call-overlay';
+        overlay.className = 'call-overlay';
+        overlay.innerHTML = `
+            <video id="call-remote-media" autoplay playsinline></video>
+            <button type="button" class="call-hangup-btn">Raccrocher</button>
+        `;
+        overlay.querySelector('.call-hangup-btn').addEventListener('click', hangUpCall);
+        document.body.appendChild(overlay);
+    }
+    overlay.querySelector('#call-remote-media').srcObject = remoteStream;
+}
+
+async function startCall(callType) {
+    if (!state.activeConversationId || state.activeCall) return;
+    
+    const call = { id: null, type: callType, pendingCandidates: [], isCaller: true };
+    try {
+        call.localStream = await navigator.mediaDevices.getUserMedia({ audio: true, video: callType === 'video' });
+    } catch (error) {
+        alert('Micro ou caméra inaccessible');
+        return;
+    }
+    call.pc = createCallConnection(call);
+    call.localStream.getTracks().forEach(track => call.pc.addTrack(track, call.localStream));
+    state.activeCall = call;
+    
+    const offer = await call.pc.createOffer();
+    await call.pc.setLocalDescription(offer);
+    if (!sendCallSignal('offer', {
+        conversation_id: state.activeConversationId,
+        call_type: callType,
+        sdp: offer
+    })) {
+        endLocalCall();
+    }
+}
+
+async function acceptIncomingCall(event) {
+    const call = { id: event.id, type: event.call_type, pendingCandidates: [], isCaller: false };
+    try {
+        call.localStream = await navigator.mediaDevices.getUserMedia({ audio: true, video: event.call_type === 'video' });
+    } catch (error) {
+        sendCallSignal('reject', { call_id: event.id });
+        return;
+    }
+    call.pc = createCallConnection(call);
+    call.localStream.getTracks().forEach(track => call.pc.addTrack(track, call.localStream));
+    state.activeCall = call;
+    
+    await call.pc.setRemoteDescription(event.sdp);
+    const answer = await call.pc.createAnswer();
+    await call.pc.setLocalDescription(answer);
+    sendCallSignal('answer', { call_id: event.id, sdp: answer });
+}
+
+function hangUpCall() {
+    if (state.activeCall && state.activeCall.id) {
+        sendCallSignal('hangup', { call_id: state.activeCall.id });
+    }
+    endLocalCall();
+}
+
+function endLocalCall() {
+    const call = state.activeCall;
+    if (!call) return;
+    if (call.localStream) {
+        call.localStream.getTracks().forEach(track => track.stop());
+    }
+    if (call.pc) {
+        call.pc.close();
+    }
+    const overlay = document.getElementById('call-overlay');
+    if (overlay) {
+        overlay.remove();
+    }
+    state.activeCall = null;
+}
+
+function handleCallEvent(event) {
+    const call = state.activeCall;
+    
+    switch (event.event) {
+        case 'incoming': {
+            if (call) {
+                // Déjà en ligne: occupé
+                sendCallSignal('reject', { call_id: event.id });
+                return;
+            }
+            const label = event.call_type === 'video' ? 'Appel vidéo entrant' : 'Appel vocal entrant';
+            if (confirm(`${label}. Répondre ?`)) {
+                acceptIncomingCall(event);
+            } else {
+                sendCallSignal('reject', { call_id: event.id });
+            }
+            break;
+        }
+        case 'ringing':
+            if (call && call.isCaller && !call.id) {
+                call.id = event.id;
+                call.pendingCandidates.forEach(candidate => {
+                    sendCallSignal('ice', { call_id: call.id, candidate: candidate });
+                });
+                call.pendingCandidates = [];
+            }
+            break;
+        case 'answered':
+            if (call && call.id === event.id && call.isCaller && event.sdp) {
+                call.pc.setRemoteDescription(event.sdp);
+            } else if (!call || call.id !== event.id) {
+                // Décroché depuis un autre appareil
+                console.log('Appel décroché ailleurs');
+            }
+            break;
+        case 'ice':
+            if (call && call.id === event.id && event.candidate) {
+                call.pc.addIceCandidate(event.candidate).catch(error => {
+                    console.error('ICE candidate error:', error);
+                });
+            }
+            break;
+        case 'ended':
+        case 'rejected':
+        case 'cancelled':
+        case 'missed':
+            if (call && call.id === event.id) {
+                endLocalCall();
+                if (event.event === 'rejected' || event.event === 'missed') {
+                    alert(event.event === 'rejected' ? 'Appel refusé' : 'Pas de réponse');
+                }
+            }
+            break;
+    }
+}
+
 window.startVoiceCall = function() {
-    // À implémenter - appel vocal
-    console.log('Start voice call');
-    alert('Appel vocal à implémenter');
+    startCall('voice');
 };
 
 window.startVideoCall = function() {
-    // À implémenter - appel vidéo
-    console.log('Start video call');
-    alert('Appel vidéo à implémenter');
+    startCall('video');
 };
 
 // ============================================
@@ -0,0 +1,139 @@
+"""
+Indicateurs de frappe pour Transpareo Connect
+Machine à états en mémoire par (conversation, utilisateur) : les trames "typing"
+des clients sont regroupées et limitées avant diffusion dans la couche Channels.
+Aucun accès à la base de données.
+"""
+import asyncio
+import time
+
+from django.conf import settings
+
+
+# Au plus une diffusion "en train d'écrire" par utilisateur et par intervalle (secondes)
+TYPING_THROTTLE = getattr(settings, 'TYPING_THROTTLE', 2.0)
+
+# Arrêt automatique sans nouvelle trame pendant ce délai (secondes)
+TYPING_TIMEOUT = getattr(settings, 'TYPING_TIMEOUT', 6.0)
+
+
+class TypingTracker:
+    """
+    États de frappe en cours.
+
+    Transitions:
+        inactif --typing--> en frappe        (diffusé)
+        en frappe --typing--> en frappe      (diffusé au plus une fois par TYPING_THROTTLE)
+        en frappe --stop/expiration--> inactif (diffusé)
+    """
+
+    def __init__(self, throttle=TYPING_THROTTLE, timeout=TYPING_TIMEOUT):
+        self.throttle = throttle
+        self.timeout = timeout
+        self._states = {}
+
+    def update(self, conversation_id, user_id, is_typing, now=None):
+        """Applique une trame client; retourne True si elle doit être diffusée"""
+        now = now if now is not None else time.monotonic()
+        key = (conversation_id, user_id)
+        state = self._states.get(key)
+
+        if not is_typing:
+            return self._states.pop(key, None) is not None
+
+        if state is None or now >= state['deadline']:
+            # Nouvelle frappe (ou état expiré sans minuteur pour le retirer)
+            self._states[key] = {'last_broadcast': now, 'deadline': now + self.timeout}
+            return True
+
+        state['deadline'] = now + self.timeout
+        if now - state['last_broadcast'] >= self.throttle:
+            state['last_broadcast'] = now
+            return True
+        return False
+
+    def expire(self, conversation_id, user_id, now=None):
+        """
+        Vérifie l'expiration d'un état de frappe.
+
+        Returns:
+            tuple: (expiré, secondes restantes ou None)
+        """
+        now = now if now is not None else time.monotonic()
+        key = (conversation_id, user_id)
+        state = self._states.get(key)
+        if state is None:
+            return False, None
+        if now >= state['deadline']:
+            del self._states[key]
+            return True, None
+        return False, state['deadline'] - now
+
+    def is_typing(self, conversation_id, user_id, now=None):
+        """État courant, expiration vérifiée à la lecture"""
+        return self.expire(conversation_id, user_id, now)[1] is not None
+
+
+typing_tracker = TypingTracker()
+
+# Minuteurs d'expiration en cours: (conversation, utilisateur) -> (boucle, TimerHandle)
+_timers = {}
+
+
+async def _broadcast(channel_layer, conversation_id, user_id, username, is_typing):
+    await channel_layer.group_send(
+        f'messages_{conversation_id}',
+        {
+            'type': 'typing_indicator',
+            'user_id': user_id,
+            'username': username,
+            'is_typing': is_typing,
+            'conversation_id': conversation_id
+        }
+    )
+
+
+def _schedule_expiry(channel_layer, conversation_id, user_id, username, delay):
+    loop = asyncio.get_running_loop()
+    _timers[(conversation_id, user_id)] = (loop, loop.call_later(
+        delay,
+        lambda: asyncio.ensure_future(
+            _check_expiry(channel_layer, conversation_id, user_id, username)
+        )
+    ))
+
+
+async def _check_expiry(channel_layer, conversation_id, user_id, username):
+    _timers.pop((conversation_id, user_id), None)
+    expired, remaining = typing_tracker.expire(conversation_id, user_id)
+    if expired:
+        await _broadcast(channel_layer, conversation_id, user_id, username, False)
+    elif remaining is not None:
+        # Frappe prolongée depuis la programmation: un seul minuteur, reprogrammé
+        _schedule_expiry(channel_layer, conversation_id, user_id, username, remaining)
+
+
+async def handle_typing_frame(channel_layer, conversation_id, user_id, username, is_typing):
+    """
+    Traite une trame "typing" d'un client (WebSocket ou repli HTTP via
+    async_to_sync), diffuse si nécessaire et arme le minuteur d'expiration.
+
+    Returns:
+        bool: True si la trame a été diffusée
+    """
+    broadcast = typing_tracker.update(conversation_id, user_id, is_typing)
+    if broadcast:
+        await _broadcast(channel_layer, conversation_id, user_id, username, is_typing)
+
+    key = (conversation_id, user_id)
+    if is_typing:
+        # Un minuteur armé dans une boucle terminée (async_to_sync hors ASGI) ne se
+        # déclenchera jamais: il est remplacé
+        timer = _timers.get(key)
+        if timer is None or timer[0].is_closed():
+            _schedule_expiry(channel_layer, conversation_id, user_id, username, typing_tracker.timeout)
+    else:
+        timer = _timers.pop(key, None)
+        if timer and not timer[0].is_closed():
+            timer[1].cancel()
+    return broadcast
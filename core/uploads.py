@@ -0,0 +1,312 @@
+"""
+Téléversement fractionné et reprenable des pièces jointes de messages
+Le client crée un téléversement, envoie des morceaux (PUT avec offset) assemblés
+sur disque côté serveur, puis référence le téléversement terminé à l'envoi du message.
+"""
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttachmentUpload, MessageAttachment
+
+
+# Taille maximale d'une pièce jointe (octets)
+MESSAGE_ATTACHMENT_MAX_SIZE = getattr(settings, 'MESSAGE_ATTACHMENT_MAX_SIZE', 100 * 1024 * 1024)
+
+# Taille maximale d'un morceau (octets)
+MESSAGE_UPLOAD_CHUNK_MAX_SIZE = getattr(settings, 'MESSAGE_UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024)
+
+# Répertoire des fichiers partiels
+MESSAGE_UPLOAD_TEMP_DIR = Path(getattr(
+    settings, 'MESSAGE_UPLOAD_TEMP_DIR', Path(settings.MEDIA_ROOT) / 'uploads' / 'partial'
+))
+
+# Taille des blocs lus/écrits lors des copies et du calcul d'empreinte
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Erreur de téléversement (message destiné au client, code HTTP associé)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def partial_path(upload):
+    """Chemin du fichier partiel d'un téléversement"""
+    return MESSAGE_UPLOAD_TEMP_DIR / f'{upload.id}.part'
+
+
+def current_offset(upload):
+    """Nombre d'octets déjà reçus (taille du fichier partiel)"""
+    try:
+        return partial_path(upload).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def guess_kind(content_type):
+    """Type de pièce jointe à partir du type MIME"""
+    content_type = content_type or ''
+    if content_type.startswith('image/'):
+        return 'image'
+    if content_type.startswith('audio/'):
+        return 'audio'
+    return 'document'
+
+
+# ============================================
+# CYCLE DE VIE D'UN TÉLÉVERSEMENT
+# ============================================
+
+def create_upload(user, filename, size, content_type='', checksum=''):
+    """Crée un téléversement en attente"""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('Taille invalide')
+    if size <= 0:
+        raise UploadError('Taille invalide')
+    if size > MESSAGE_ATTACHMENT_MAX_SIZE:
+        raise UploadError('Fichier trop volumineux', status=413)
+    if not filename:
+        raise UploadError('Nom de fichier requis')
+
+    MESSAGE_UPLOAD_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    upload = AttachmentUpload.objects.create(
+        user=user,
+        filename=os.path.basename(filename)[:255],
+        content_type=(content_type or '')[:100],
+        size=size,
+        checksum=(checksum or '').lower()[:64],
+    )
+    partial_path(upload).touch()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Ajoute un morceau au fichier partiel en le lisant par blocs depuis stream.
+
+    L'offset doit correspondre aux octets déjà reçus (reprise après coupure:
+    le client relit l'offset courant et renvoie à partir de là).
+
+    Returns:
+        int: nouvel offset
+    """
+    if upload.status != 'pending':
+        raise UploadError('Téléversement déjà terminé', status=409)
+    if length > MESSAGE_UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError('Morceau trop volumineux', status=413)
+
+    lock_key = f'upload_lock:{upload.id}'
+    if not cache.add(lock_key, 1, 60):
+        raise UploadError('Un morceau est déjà en cours de réception', status=409)
+
+    try:
+        expected = current_offset(upload)
+        if offset != expected:
+            raise UploadError(f"Offset invalide (attendu: {expected})", status=409)
+        if offset + length > upload.size:
+            raise UploadError('Le morceau dépasse la taille annoncée', status=413)
+
+        received = 0
+        with open(partial_path(upload), 'ab') as partial:
+            while received < length:
+                block = stream.read(min(STREAM_BLOCK_SIZE, length - received))
+                if not block:
+                    break
+                partial.write(block)
+                received += len(block)
+        new_offset = offset + received
+    finally:
+        cache.delete(lock_key)
+
+    if new_offset == upload.size:
+        finalize_upload(upload)
+    return new_offset
+
+
+def compute_checksum(path):
+    """SHA-256 d'un fichier, calculé par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(STREAM_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(upload):
+    """Vérifie l'empreinte du fichier assemblé et marque le téléversement terminé"""
+    path = partial_path(upload)
+    checksum = compute_checksum(path)
+
+    if upload.checksum and checksum != upload.checksum:
+        path.unlink(missing_ok=True)
+        upload.status = 'failed'
+        upload.save(update_fields=['status'])
+        raise UploadError('Empreinte SHA-256 invalide', status=422)
+
+    upload.checksum = checksum
+    upload.status = 'complete'
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['checksum', 'status', 'completed_at'])
+
+
+# ============================================
+# RATTACHEMENT AUX MESSAGES
+# ============================================
+
+def get_completed_uploads(user, upload_ids):
+    """Téléversements terminés de l'utilisateur, dans l'ordre demandé"""
+    try:
+        upload_ids = [uuid.UUID(str(upload_id)) for upload_id in upload_ids if upload_id]
+    except ValueError:
+        raise UploadError('Identifiant de téléversement invalide')
+    if not upload_ids:
+        return []
+
+    uploads = AttachmentUpload.objects.filter(user=user).in_bulk(upload_ids)
+
+    ordered = []
+    for upload_id in upload_ids:
+        upload = uploads.get(upload_id)
+        if upload is None:
+            raise UploadError('Téléversement introuvable', status=404)
+        if upload.status != 'complete':
+            raise UploadError(f"Téléversement incomplet: {upload.filename}", status=409)
+        ordered.append(upload)
+    return ordered
+
+
+def build_attachment(upload, position=0):
+    """
+    Prépare (sans l'enregistrer) la pièce jointe correspondant à un téléversement.
+
+    Le fichier est copié vers le stockage au moment de l'INSERT (bulk_create).
+    """
+    attachment = MessageAttachment(
+        kind=guess_kind(upload.content_type),
+        original_name=upload.filename,
+        content_type=upload.content_type,
+        size=upload.size,
+        checksum=upload.checksum,
+        position=position,
+    )
+    attachment.file = File(open(partial_path(upload), 'rb'), name=upload.filename)
+    return attachment
+
+
+def build_attachment_from_file(uploaded_file, kind, position=0):
+    """Prépare une pièce jointe à partir d'un fichier multipart classique"""
+    return MessageAttachment(
+        kind=kind,
+        file=uploaded_file,
+        original_name=os.path.basename(uploaded_file.name)[:255],
+        content_type=getattr(uploaded_file, 'content_type', '') or '',
+        size=uploaded_file.size,
+        position=position,
+    )
+
+
+def save_attachments(message, attachments, uploads=()):
+    """
+    Enregistre les pièces jointes d'un message en une requête et libère les
+    fichiers partiels des téléversements utilisés.
+
+    Les fichiers partiels ne sont supprimés qu'après validation de la transaction :
+    en cas d'annulation les téléversements restent réutilisables. Les fichiers déjà
+    copiés vers le stockage sont alors à retirer avec discard_attachment_files.
+    """
+    pending_files = []
+    for attachment in attachments:
+        attachment.message = message
+        if not attachment.file._committed:
+            pending_files.append(attachment.file.file)
+
+    try:
+        created = MessageAttachment.objects.bulk_create(attachments)
+    finally:
+        for pending_file in pending_files:
+            pending_file.close()
+
+    if uploads:
+        AttachmentUpload.objects.filter(id__in=[u.id for u in uploads]).update(status='attached')
+        paths = [partial_path(upload) for upload in uploads]
+
+        def release_partials():
+            for path in paths:
+                path.unlink(missing_ok=True)
+
+        transaction.on_commit(release_partials)
+    return created
+
+
+def discard_attachment_files(attachments):
+    """
+    Supprime du stockage les fichiers copiés par save_attachments quand la
+    transaction englobante est annulée (aucune ligne ne les référence plus).
+    """
+    for attachment in attachments:
+        if attachment.file and attachment.file._committed:
+            attachment.file.storage.delete(attachment.file.name)
+
+
+def serialize_attachment(attachment):
+    """Représentation JSON d'une pièce jointe"""
+    return {
+        'id': attachment.id,
+        'kind': attachment.kind,
+        'url': attachment.file.url if attachment.file else None,
+        'name': attachment.original_name,
+        'content_type': attachment.content_type,
+        'size': attachment.size,
+    }
+
+
+def purge_stale_uploads(max_age=timedelta(days=1)):
+    """
+    Supprime les téléversements abandonnés (non attachés, créés il y a plus de
+    max_age) et leurs fichiers partiels, puis les fichiers .part orphelins de
+    MESSAGE_UPLOAD_TEMP_DIR (ligne supprimée, téléversement déjà attaché).
+
+    Returns:
+        dict: {'uploads': lignes supprimées, 'files': fichiers partiels supprimés}
+    """
+    cutoff = timezone.now() - max_age
+    stale = AttachmentUpload.objects.filter(
+        status__in=['pending', 'complete', 'failed'],
+        created_at__lt=cutoff,
+    )
+    stats = {'uploads': 0, 'files': 0}
+    for upload in stale.iterator():
+        path = partial_path(upload)
+        if path.exists():
+            path.unlink(missing_ok=True)
+            stats['files'] += 1
+    stats['uploads'], _ = stale.delete()
+
+    if not MESSAGE_UPLOAD_TEMP_DIR.is_dir():
+        return stats
+    live = {
+        str(upload_id) for upload_id in AttachmentUpload.objects.filter(
+            status__in=['pending', 'complete', 'failed']
+        ).values_list('id', flat=True)
+    }
+    for path in MESSAGE_UPLOAD_TEMP_DIR.glob('*.part'):
+        try:
+            if path.stem not in live and path.stat().st_mtime < cutoff.timestamp():
+                path.unlink()
+                stats['files'] += 1
+        except FileNotFoundError:
+            continue
+    return stats
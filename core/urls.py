@@ -157,6 +157,9 @@ urlpatterns = [
     path('api/connect/conversations/<int:conversation_id>/important/', views.api_toggle_important, name='api-toggle-important'),
     path('api/connect/conversations/<int:conversation_id>/', views.api_delete_conversation, name='api-delete-conversation'),
     path('api/connect/messages/', views.api_send_message, name='api-send-message'),
+    path('api/connect/uploads/', views.api_create_upload, name='api-create-upload'),
+    path('api/connect/uploads/<uuid:upload_id>/', views.api_upload_chunk, name='api-upload-chunk'),
+    path('api/connect/messages/search/', views.api_search_messages, name='api-search-messages'),
     path('api/connect/messages/reaction/', views.api_add_message_reaction, name='api-add-message-reaction'),
     path('api/connect/messages/pin/', views.api_pin_message, name='api-pin-message'),
     path('api/connect/messages/unpin/', views.api_unpin_message, name='api-unpin-message'),
@@ -166,9 +169,9 @@ urlpatterns = [
     path('api/connect/users/search/', views.api_search_users, name='api-search-users'),
     # ========== CONNECT - API APPELS ==========
     path('api/connect/calls/initiate/', views.api_initiate_call, name='api-initiate-call'),
-    path('api/connect/calls/<int:call_id>/answer/', views.api_answer_call, name='api-answer-call'),
-    path('api/connect/calls/<int:call_id>/end/', views.api_end_call, name='api-end-call'),
-    path('api/connect/calls/<int:call_id>/reject/', views.api_reject_call, name='api-reject-call'),
+    path('api/connect/calls/<str:call_id>/answer/', views.api_answer_call, name='api-answer-call'),
+    path('api/connect/calls/<str:call_id>/end/', views.api_end_call, name='api-end-call'),
+    path('api/connect/calls/<str:call_id>/reject/', views.api_reject_call, name='api-reject-call'),
     # ========== SIGNALEMENTS (PHASE 12.3) ==========
     path('connect/posts/<int:post_id>/report/', views.report_post, name='report-post'),
     path('connect/comments/<int:comment_id>/report/', views.report_comment, name='report-comment'),
@@ -309,6 +312,7 @@ urlpatterns = [
     
     path('connect-admin/statistics/', views.admin_statistics, name='admin-statistics'),
     path('connect-admin/logs/', views.admin_logs, name='admin-logs'),
+    path('connect-admin/cache/', views.admin_cache_metrics, name='admin-cache-metrics'),
     path('connect-admin/export/csv/', views.admin_export_csv, name='admin-export-csv'),
     
     # ========== BUSINESS MODEL CANVAS - PHASE 4 ==========
@@ -10,6 +10,7 @@ from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Count, Q, Avg, Sum, Min, Max
 from django.core.paginator import Paginator
 from datetime import datetime, timedelta
@@ -1442,6 +1443,7 @@ def admin_statistics(request):
     from datetime import timedelta
     from django.utils import timezone
     from django.db.models import Count, Q
+    from .metrics import series_many
     
     # Filtre période
     period = request.GET.get('period', '30')
@@ -1458,29 +1460,17 @@ def admin_statistics(request):
     new_users = CustomUser.objects.filter(date_joined__date__gte=start_date).count()
     active_users = CustomUser.objects.filter(last_activity__date__gte=start_date).count()
     
-    # Croissance utilisateurs (par jour)
-    user_growth_data = []
-    for i in range(period_days):
-        day = start_date + timedelta(days=i)
-        count = CustomUser.objects.filter(date_joined__date=day).count()
-        user_growth_data.append({
-            'date': day.strftime('%Y-%m-%d'),
-            'count': count
-        })
+    # Séries par jour (jours terminés, lues dans DailyMetric en une requête)
+    daily = series_many(
+        ['users.new', 'posts.new', 'messages.new'], start_date, today - timedelta(days=1)
+    )
+    user_growth_data = daily['users.new']
     
     # Statistiques posts
     total_posts = Post.objects.count()
     posts_this_period = Post.objects.filter(created_at__date__gte=start_date).count()
     
-    # Posts par jour
-    posts_per_day = []
-    for i in range(period_days):
-        day = start_date + timedelta(days=i)
-        count = Post.objects.filter(created_at__date=day).count()
-        posts_per_day.append({
-            'date': day.strftime('%Y-%m-%d'),
-            'count': count
-        })
+    posts_per_day = daily['posts.new']
     
     # Statistiques groupes
     total_groups = Group.objects.count()
@@ -1490,15 +1480,7 @@ def admin_statistics(request):
     total_messages = Message.objects.count()
     messages_this_period = Message.objects.filter(created_at__date__gte=start_date).count()
     
-    # Messages par jour
-    messages_per_day = []
-    for i in range(period_days):
-        day = start_date + timedelta(days=i)
-        count = Message.objects.filter(created_at__date=day).count()
-        messages_per_day.append({
-            'date': day.strftime('%Y-%m-%d'),
-            'count': count
-        })
+    messages_per_day = daily['messages.new']
     
     # Statistiques logements
     total_logements = Logement.objects.count()
@@ -1551,6 +1533,33 @@ def admin_statistics(request):
 def admin_logs(request):
     return stub_view(request)
 
+@admin_required
+@login_required
+def admin_cache_metrics(request):
+    """
+    Métriques des caches (par alias) et du pipeline de modération, pour ce processus;
+    état de la file des rappels automatisés (base, tous workers confondus)
+    """
+    import os
+    from django.conf import settings
+    from .cache_metrics import cache_metrics, reset_cache_metrics
+    from .leases import reminder_queue_stats
+    from .moderation import moderation_stats
+    
+    if request.method == 'POST':
+        reset_cache_metrics()
+        messages.success(request, 'Compteurs des caches remis à zéro.')
+        return redirect('admin-cache-metrics')
+    
+    context = {
+        'caches': cache_metrics(),
+        'moderation': moderation_stats(),
+        'reminders': reminder_queue_stats(),
+        'shared_backend': bool(settings.REDIS_URL),
+        'pid': os.getpid(),
+    }
+    return render(request, 'core/admin/cache_metrics.html', context)
+
 @admin_required
 @login_required
 def admin_export_csv(request):
@@ -2019,11 +2028,8 @@ def login_view(request):
     if request.method == 'POST':
         email = request.POST.get('username', '').lower().strip()
         if email:
-            from django.core.cache import cache
-            login_key = f"login_failed:{email}"
-            failed_attempts = cache.get(login_key, 0)
-            
-            if failed_attempts >= 5:
+            from .rate_limit import peek
+            if not peek('login_failed', email, limit=5, window=900)['allowed']:
                 messages.error(request, 'Trop de tentatives de connexion échouées. Veuillez réessayer dans 15 minutes ou utiliser la réinitialisation de mot de passe.')
                 form = LoginForm()
                 return render(request, 'core/login_modern.html', {'form': form, 'rate_limited': True})
@@ -2064,9 +2070,8 @@ def login_view(request):
             
             if user is not None:
                 # Réinitialiser les tentatives échouées
-                from django.core.cache import cache
-                login_key = f"login_failed:{email}"
-                cache.delete(login_key)
+                from .rate_limit import reset
+                reset('login_failed', email, window=900)
                 
                 # Vérifier si 2FA est activé
                 if user.two_factor_enabled:
@@ -2113,10 +2118,8 @@ def login_view(request):
                 return redirect(next_url)
             else:
                 # Incrémenter les tentatives échouées
-                from django.core.cache import cache
-                login_key = f"login_failed:{email}"
-                failed_attempts = cache.get(login_key, 0) + 1
-                cache.set(login_key, failed_attempts, 900)  # 15 minutes
+                from .rate_limit import hit
+                failed_attempts = hit('login_failed', email, limit=5, window=900)['count']  # 15 minutes
                 
                 messages.error(request, 'Email ou mot de passe incorrect.')
                 # Logger tentative échouée
@@ -2180,17 +2183,6 @@ def request_magic_link(request):
         if not email:
             return JsonResponse({'success': False, 'error': 'Email requis'}, status=400)
         
-        # Vérifier le rate limiting par email
-        from django.core.cache import cache
-        magic_link_key = f"magic_link:{email}"
-        magic_link_count = cache.get(magic_link_key, 0)
-        
-        if magic_link_count >= 3:
-            return JsonResponse({
-                'success': False, 
-                'error': 'Trop de demandes de magic link. Veuillez réessayer dans 15 minutes.'
-            }, status=429)
-        
         try:
             user = CustomUser.objects.get(email=email)
             
@@ -2203,9 +2195,6 @@ def request_magic_link(request):
             token = create_magic_link(user, ip)
             send_magic_link_email(user, token)
             
-            # Incrémenter le compteur
-            cache.set(magic_link_key, magic_link_count + 1, 900)  # 15 minutes
-            
             # Logger la demande
             log_login_attempt(user, request, success=True, reason='Demande magic link')
             create_security_alert(
@@ -2338,15 +2327,6 @@ def password_reset_request(request):
         if form.is_valid():
             email = form.cleaned_data['email'].lower().strip()
             
-            # Vérifier le rate limiting par email
-            from django.core.cache import cache
-            reset_key = f"password_reset:{email}"
-            reset_count = cache.get(reset_key, 0)
-            
-            if reset_count >= 3:
-                messages.error(request, 'Trop de demandes de réinitialisation pour cet email. Veuillez réessayer dans 1 heure.')
-                return render(request, 'core/password_reset_request.html', {'form': form})
-            
             try:
                 user = CustomUser.objects.get(email=email)
                 
@@ -2360,9 +2340,6 @@ def password_reset_request(request):
                 token = create_password_reset_token(user, ip)
                 send_password_reset_email(user, token.token)
                 
-                # Incrémenter le compteur
-                cache.set(reset_key, reset_count + 1, 3600)
-                
                 # Logger la demande
                 log_login_attempt(user, request, success=True, reason='Demande réinitialisation mot de passe')
                 create_security_alert(
@@ -3135,25 +3112,29 @@ def connect_messages(request):
     if not request.user.is_authenticated:
         return redirect('login')
     
-    # Conversations de l'utilisateur
-    conversations = Conversation.objects.filter(participants=request.user).prefetch_related(
-        'participants', 
-        'messages',
-        'last_message__sender'
-    ).order_by('-updated_at')
+    # Première page de conversations seulement (le reste est chargé par l'API JSON)
+    from .inbox import get_inbox_page, get_total_unread_count
+    from .presence import get_online_user_ids
+    conversations, next_cursor = get_inbox_page(request.user)
+    
+    # Présence en ligne des interlocuteurs (lecture groupée)
+    online_user_ids = get_online_user_ids(
+        conv.other_user.id for conv in conversations if conv.other_user
+    )
     
     # Préparer données conversations avec autres participants
     conversations_data = []
     for conv in conversations:
-        other_user = conv.get_other_participant(request.user)
+        if conv.other_user:
+            conv.other_user.is_online = conv.other_user.id in online_user_ids
         conversations_data.append({
             'conversation': conv,
-            'other_user': other_user,
-            'unread_count': conv.get_unread_count(request.user)
+            'other_user': conv.other_user,
+            'unread_count': conv.unread_count
         })
     
-    # Calculer compteur total non lus
-    unread_count = sum(data['unread_count'] for data in conversations_data)
+    # Calculer compteur total non lus (toutes conversations, une requête)
+    unread_count = get_total_unread_count(request.user)
     
     # Conversation active (depuis query param)
     active_conversation_id = request.GET.get('conversation')
@@ -3161,21 +3142,24 @@ def connect_messages(request):
     active_other_user = None
     active_messages = []
     if active_conversation_id:
-        try:
-            active_conversation = conversations.get(id=active_conversation_id)
+        active_conversation = Conversation.objects.filter(
+            id=active_conversation_id, participants=request.user
+        ).first() if active_conversation_id.isdigit() else None
+        if active_conversation:
             if active_conversation.participants.count() == 2:
                 active_other_user = active_conversation.get_other_participant(request.user)
+                if active_other_user:
+                    active_other_user.is_online = active_other_user.id in get_online_user_ids([active_other_user.id])
             
-            # Charger messages initiaux pour rendu serveur
-            active_messages = Message.objects.filter(
+            # Charger les 50 derniers messages pour rendu serveur
+            active_messages = list(reversed(Message.objects.filter(
                 conversation=active_conversation
-            ).select_related('sender').order_by('created_at')[:50]
-        except Conversation.DoesNotExist:
-            pass
+            ).select_related('sender').order_by('-created_at')[:50]))
     
     context = {
         'conversations_data': conversations_data,
         'conversations': conversations,  # Garder pour compatibilité
+        'conversations_next_cursor': next_cursor,
         'unread_count': unread_count,
         'active_conversation_id': active_conversation_id,
         'active_conversation': active_conversation,
@@ -3218,68 +3202,28 @@ def connect_user_search(request):
 
 def connect_properties(request):
     """Gérer mes locations"""
+    from .portfolio import owner_leases, owner_summary
+    
     if not request.user.is_authenticated:
         return redirect('login')
     
-    # Récupérer les baux du propriétaire
-    baux = Bail.objects.filter(proprietaire=request.user).select_related('logement', 'locataire').order_by('-date_debut')
-    
     # Filtre par statut
     statut_filter = request.GET.get('statut', 'all')
-    if statut_filter != 'all':
-        baux = baux.filter(statut=statut_filter)
     
-    # Statistiques globales
-    baux_actifs = Bail.objects.filter(proprietaire=request.user, statut='actif')
-    nombre_biens_loues = baux_actifs.count()
-    
-    # Calculer le revenu mensuel total (somme des loyers + charges)
-    revenu_mensuel_total = sum(
-        float(bail.get_montant_total_mensuel()) for bail in baux_actifs
-    )
-    
-    # Calculer les paiements en retard avec PaiementLoyer
-    from datetime import date
-    today = date.today()
-    loyers_en_retard = PaiementLoyer.objects.filter(
-        bail__in=baux_actifs,
-        statut='en_retard'
-    ).count()
-    
-    # Demandes en attente (candidatures pour les logements du propriétaire)
-    logements_ids = Logement.objects.filter(proprietaire=request.user).values_list('id', flat=True)
-    demandes_attente = Candidature.objects.filter(
-        logement_id__in=logements_ids,
-        statut='en_attente'
-    ).count()
-    
-    # Préparer les données pour chaque bail
-    baux_data = []
-    for bail in baux:
-        # Calculer paiements en retard pour ce bail
-        paiements_en_retard = PaiementLoyer.objects.filter(
-            bail=bail,
-            statut='en_retard'
-        ).count()
-        
-        # Demandes en attente pour ce logement
-        demandes_en_attente = Candidature.objects.filter(
-            logement=bail.logement,
-            statut='en_attente'
-        ).count()
-        
-        baux_data.append({
+    # Baux annotés (retards, candidatures, montant mensuel) en une requête
+    baux = owner_leases(request.user, None if statut_filter == 'all' else statut_filter)
+    baux_data = [
+        {
             'bail': bail,
-            'paiements_en_retard': paiements_en_retard,
-            'demandes_en_attente': demandes_en_attente,
-        })
+            'paiements_en_retard': bail.paiements_en_retard,
+            'demandes_en_attente': bail.demandes_en_attente,
+        }
+        for bail in baux
+    ]
     
     context = {
         'page_title': 'Gérer mes locations',
-        'nombre_biens_loues': nombre_biens_loues,
-        'revenu_mensuel_total': revenu_mensuel_total,
-        'loyers_en_retard': loyers_en_retard,
-        'demandes_attente': demandes_attente,
+        **owner_summary(request.user.id),
         'statut_filter': statut_filter,
         'baux_data': baux_data,
     }
@@ -3506,6 +3450,46 @@ def owner_dashboard(request):
 # API CONNECT - POSTS
 # ============================================
 
+def notify_group_post(post):
+    """Notifie les membres du groupe d'un nouveau post (distribution en arrière-plan)"""
+    from .notifications import notify
+    notify(
+        'group_post',
+        f'Nouveau post dans {post.group.name}',
+        f'{post.author.username} a publié : {post.content[:120]}',
+        audience={'group': post.group_id},
+        exclude=[post.author_id],
+        from_user=post.author_id,
+        icon='👥',
+        action_url=f'/connect/groups/{post.group_id}/',
+        related_post=post,
+        related_group=post.group_id,
+    )
+
+def notify_post_activity(post, actor, notification_type):
+    """
+    Notifie l'auteur d'un like ou d'un commentaire sur son post (regroupé par post:
+    "Alice et 23 autre(s) ont aimé votre publication")
+    """
+    if post.author_id == actor.id:
+        return
+    from .notifications import notify
+    verbs = {
+        'post_liked': ('a aimé votre publication', '❤️'),
+        'post_commented': ('a commenté votre publication', '💬'),
+    }
+    verb, icon = verbs[notification_type]
+    notify(
+        notification_type,
+        f'{actor.username} {verb}',
+        post.content[:120],
+        recipients=[post.author_id],
+        from_user=actor.id,
+        icon=icon,
+        action_url=f'/connect/?post={post.id}',
+        related_post=post,
+    )
+
 def create_post(request):
     """Créer un post"""
     if not request.user.is_authenticated:
@@ -3536,6 +3520,8 @@ def create_post(request):
             visibility=visibility,
             content_type='text'
         )
+        if group:
+            notify_group_post(post)
         
         return JsonResponse({
             'success': True,
@@ -3572,6 +3558,8 @@ def toggle_post_like(request, post_id):
             is_liked = True
         
         post.save()
+        if is_liked:
+            notify_post_activity(post, request.user, 'post_liked')
         
         return JsonResponse({
             'success': True,
@@ -3613,6 +3601,7 @@ def create_comment(request, post_id):
             
             post.comments_count = (post.comments_count or 0) + 1
             post.save()
+            notify_post_activity(post, request.user, 'post_commented')
             
             return JsonResponse({
                 'success': True,
@@ -3773,6 +3762,8 @@ def api_create_post(request):
             group_id=group_id if group_id else None,
             hashtags=data.get('hashtags', ''),
         )
+        if post.group_id:
+            notify_group_post(post)
         
         # Gérer les médias (images/vidéos) si présents
         # TODO: Implémenter upload de fichiers
@@ -3816,6 +3807,8 @@ def api_toggle_like(request, post_id):
         # Mettre à jour le compteur
         post.likes_count = PostLike.objects.filter(post=post, active=True).count()
         post.save()
+        if like.active:
+            notify_post_activity(post, request.user, 'post_liked')
         
         return JsonResponse({
             'success': True,
@@ -3861,6 +3854,7 @@ def api_create_comment(request, post_id):
         # Mettre à jour le compteur
         post.comments_count = PostComment.objects.filter(post=post).count()
         post.save()
+        notify_post_activity(post, request.user, 'post_commented')
         
         return JsonResponse({
             'success': True,
@@ -4255,6 +4249,10 @@ def send_message(request):
                 sender=request.user,
                 content=content
             )
+            from .message_search import index_message
+            from .moderation import enqueue_message_moderation
+            index_message(message)
+            enqueue_message_moderation(message.id)
             
             conversation.updated_at = timezone.now()
             conversation.save()
@@ -4307,33 +4305,37 @@ def api_add_message_reaction(request):
             return JsonResponse({'error': 'Accès refusé'}, status=403)
         
         # Vérifier si l'emoji est valide
-        valid_emojis = ['👍', '❤️', '😂', '😮', '😢', '🔥', '👏', '✅']
-        if emoji not in valid_emojis:
+        from .reactions import VALID_EMOJIS, toggle_message_reaction, get_user_reactions, summarize_reactions
+        if emoji not in VALID_EMOJIS:
             return JsonResponse({'error': 'Emoji invalide'}, status=400)
         
-        # Créer ou récupérer la réaction
-        reaction, created = MessageReaction.objects.get_or_create(
-            message=message,
-            user=request.user,
-            emoji=emoji,
-            defaults={'emoji': emoji}
+        # Ajouter ou retirer (toggle) avec mise à jour incrémentale des compteurs
+        action, counts = toggle_message_reaction(message, request.user, emoji)
+        my_emojis = get_user_reactions(request.user, [message.id]).get(message.id, set())
+        
+        # Diffuser le résumé aux participants de la conversation
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+        async_to_sync(get_channel_layer().group_send)(
+            f'messages_{message.conversation_id}',
+            {
+                'type': 'message_reaction',
+                'reaction': {
+                    'message_id': message.id,
+                    'user_id': request.user.id,
+                    'emoji': emoji,
+                    'action': action,
+                    'counts': counts
+                }
+            }
         )
         
-        if not created:
-            # Si la réaction existe déjà, la supprimer (toggle)
-            reaction.delete()
-            action = 'removed'
-        else:
-            action = 'added'
-        
-        # Compter les réactions pour ce message
-        reactions_count = MessageReaction.objects.filter(message=message, emoji=emoji).count()
-        
         return JsonResponse({
             'success': True,
             'action': action,
             'emoji': emoji,
-            'count': reactions_count
+            'count': counts.get(emoji, 0),
+            'reactions': summarize_reactions(counts, my_emojis)
         })
     except Message.DoesNotExist:
         return JsonResponse({'error': 'Message introuvable'}, status=404)
@@ -4348,9 +4350,29 @@ def api_unpin_message(request):
     """API désépingler message"""
     return JsonResponse({'error': 'Non implémenté'}, status=501)
 
+@login_required
+@require_POST
 def api_set_typing(request, conversation_id):
-    """API définir typing"""
-    return JsonResponse({'error': 'Non implémenté'}, status=501)
+    """API définir typing (repli HTTP du WebSocket, sans écriture en base)"""
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+    from .typing_indicators import handle_typing_frame
+    
+    if not Conversation.objects.filter(id=conversation_id, participants=request.user).exists():
+        return JsonResponse({'success': False, 'error': 'Accès refusé'}, status=403)
+    
+    try:
+        data = json.loads(request.body or '{}')
+    except ValueError:
+        data = {}
+    is_typing = bool(data.get('typing', request.POST.get('typing') == 'true'))
+    
+    # Même limitation et même expiration automatique que MessageConsumer
+    broadcast = async_to_sync(handle_typing_frame)(
+        get_channel_layer(), conversation_id, request.user.id, request.user.username, is_typing
+    )
+    
+    return JsonResponse({'success': True, 'broadcast': broadcast})
 
 def api_get_user_logements(request):
     """API récupérer logements utilisateur"""
@@ -4364,142 +4386,46 @@ def api_get_user_documents(request):
 # API APPELS
 # ============================================
 
-@login_required
-def api_initiate_call(request):
-    """API initier un appel vocal ou vidéo"""
+def _call_action(request, action, data):
+    """Action de signalisation d'appel via HTTP (repli du WebSocket, voir core.calls)"""
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+    from .calls import CallError, handle_call_action
+    
     if request.method != 'POST':
         return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
     
     try:
-        conversation_id = request.POST.get('conversation_id')
-        call_type = request.POST.get('call_type', 'voice')  # 'voice' ou 'video'
-        
-        if not conversation_id:
-            return JsonResponse({'error': 'Conversation requise'}, status=400)
-        
-        if call_type not in ['voice', 'video']:
-            return JsonResponse({'error': 'Type d\'appel invalide'}, status=400)
-        
-        conversation = Conversation.objects.get(id=conversation_id)
-        if request.user not in conversation.participants.all():
-            return JsonResponse({'error': 'Accès refusé'}, status=403)
-        
-        # Créer l'appel
-        call = Call.objects.create(
-            conversation=conversation,
-            caller=request.user,
-            call_type=call_type,
-            status='initiated'
-        )
-        
-        # Ajouter les participants
-        for participant in conversation.participants.all():
-            if participant != request.user:
-                call.participants.add(participant)
-        
-        return JsonResponse({
-            'success': True,
-            'call': {
-                'id': call.id,
-                'conversation_id': conversation_id,
-                'caller_id': request.user.id,
-                'call_type': call_type,
-                'status': call.status,
-                'started_at': call.started_at.isoformat()
-            }
-        })
-    except Conversation.DoesNotExist:
-        return JsonResponse({'error': 'Conversation introuvable'}, status=404)
+        call = async_to_sync(handle_call_action)(get_channel_layer(), request.user.id, action, data)
+        return JsonResponse({'success': True, 'call': call})
+    except CallError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@login_required
+def api_initiate_call(request):
+    """API initier un appel vocal ou vidéo (les appelés sont notifiés par WebSocket)"""
+    return _call_action(request, 'offer', {
+        'conversation_id': request.POST.get('conversation_id'),
+        'call_type': request.POST.get('call_type', 'voice'),  # 'voice' ou 'video'
+        'sdp': request.POST.get('sdp'),
+    })
+
 @login_required
 def api_answer_call(request, call_id):
     """API répondre à un appel"""
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
-    
-    try:
-        call = Call.objects.get(id=call_id)
-        if request.user not in call.participants.all():
-            return JsonResponse({'error': 'Accès refusé'}, status=403)
-        
-        if call.status != 'ringing' and call.status != 'initiated':
-            return JsonResponse({'error': 'Appel non disponible'}, status=400)
-        
-        call.status = 'answered'
-        call.answered_at = timezone.now()
-        call.save()
-        
-        return JsonResponse({
-            'success': True,
-            'call': {
-                'id': call.id,
-                'status': call.status,
-                'answered_at': call.answered_at.isoformat()
-            }
-        })
-    except Call.DoesNotExist:
-        return JsonResponse({'error': 'Appel introuvable'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    return _call_action(request, 'answer', {'call_id': call_id, 'sdp': request.POST.get('sdp')})
 
 @login_required
 def api_end_call(request, call_id):
-    """API terminer un appel"""
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
-    
-    try:
-        call = Call.objects.get(id=call_id)
-        if request.user not in call.participants.all() and request.user != call.caller:
-            return JsonResponse({'error': 'Accès refusé'}, status=403)
-        
-        call.status = 'ended'
-        call.ended_at = timezone.now()
-        call.calculate_duration()
-        call.save()
-        
-        return JsonResponse({
-            'success': True,
-            'call': {
-                'id': call.id,
-                'status': call.status,
-                'ended_at': call.ended_at.isoformat(),
-                'duration': call.duration
-            }
-        })
-    except Call.DoesNotExist:
-        return JsonResponse({'error': 'Appel introuvable'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    """API terminer un appel (annule l'appel s'il sonne encore)"""
+    return _call_action(request, 'hangup', {'call_id': call_id})
 
 @login_required
 def api_reject_call(request, call_id):
     """API rejeter un appel"""
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
-    
-    try:
-        call = Call.objects.get(id=call_id)
-        if request.user not in call.participants.all():
-            return JsonResponse({'error': 'Accès refusé'}, status=403)
-        
-        call.status = 'rejected'
-        call.ended_at = timezone.now()
-        call.save()
-        
-        return JsonResponse({
-            'success': True,
-            'call': {
-                'id': call.id,
-                'status': call.status
-            }
-        })
-    except Call.DoesNotExist:
-        return JsonResponse({'error': 'Appel introuvable'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    return _call_action(request, 'reject', {'call_id': call_id})
 
 # ============================================
 # API MESSAGES COMPLETE
@@ -4507,24 +4433,32 @@ def api_reject_call(request, call_id):
 
 @login_required
 def api_get_conversations(request):
-    """API récupérer liste conversations"""
-    conversations = Conversation.objects.filter(participants=request.user).prefetch_related(
-        'participants', 'messages'
-    ).order_by('-updated_at')
+    """API récupérer liste conversations (paginée: ?limit=&cursor=)"""
+    from .inbox import get_inbox_page
+    from .presence import get_online_user_ids
+    
+    try:
+        limit = int(request.GET.get('limit', 0)) or None
+    except ValueError:
+        limit = None
+    conversations, next_cursor = get_inbox_page(request.user, limit=limit, cursor=request.GET.get('cursor'))
+    
+    # Présence en ligne: une seule lecture groupée pour tous les interlocuteurs
+    online_user_ids = get_online_user_ids(
+        conv.other_user.id for conv in conversations if conv.other_user
+    )
     
     conversations_data = []
+    unread_counts = {}
     for conv in conversations:
-        other_user = conv.get_other_participant(request.user)
+        other_user = conv.other_user
         # Ignorer les conversations où l'autre participant n'existe pas ou est inactif
         if not other_user or not other_user.is_active:
             continue
             
         last_message = conv.last_message
-        unread_count = conv.get_unread_count(request.user)
-        
-        # Récupérer le statut de la conversation pour l'utilisateur
-        from core.models import ConversationStatus
-        status = ConversationStatus.objects.filter(conversation=conv, user=request.user).first()
+        status = conv.user_status
+        unread_counts[conv.id] = conv.unread_count
         
         conversations_data.append({
             'id': conv.id,
@@ -4536,7 +4470,7 @@ def api_get_conversations(request):
                 'display_name': getattr(other_user, 'display_name', None) or other_user.get_full_name() or other_user.username,
                 'avatar': other_user.avatar.url if other_user.avatar else None,
                 'profile_picture': other_user.avatar.url if other_user.avatar else None,  # Alias pour compatibilité
-                'is_online': False  # À implémenter avec WebSocket
+                'is_online': other_user.id in online_user_ids
             },
             'participants': [{
                 'id': p.id,
@@ -4544,22 +4478,24 @@ def api_get_conversations(request):
                 'get_full_name': p.get_full_name(),
                 'avatar': p.avatar.url if p.avatar else None,
                 'profile_picture': p.avatar.url if p.avatar else None  # Alias pour compatibilité
-            } for p in conv.participants.filter(is_active=True).all()],
+            } for p in conv.active_participants],
             'last_message': {
                 'id': last_message.id if last_message else None,
                 'content': last_message.content if last_message else '',
-                'sender_id': last_message.sender.id if last_message else None,
+                'sender_id': last_message.sender_id if last_message else None,
                 'created_at': last_message.created_at.isoformat() if last_message else conv.updated_at.isoformat()
             } if last_message else None,
             'updated_at': conv.updated_at.isoformat(),
-            'unread_count': unread_count,
+            'unread_count': conv.unread_count,
             'archived': status.archived if status else False,
             'favorited': status.favorited if status else False
         })
     
     return JsonResponse({
         'success': True,
-        'conversations': conversations_data
+        'conversations': conversations_data,
+        'unread_counts': unread_counts,
+        'next_cursor': next_cursor
     })
 
 @login_required
@@ -4574,19 +4510,80 @@ def api_get_messages(request, conversation_id):
             return JsonResponse({'success': False, 'error': 'Accès refusé'}, status=403)
         
         before = request.GET.get('before')
-        limit = int(request.GET.get('limit', 30))
-        
-        messages_query = Message.objects.filter(conversation=conversation).select_related('sender')
-        
-        if before:
-            try:
-                before_msg = Message.objects.get(id=before)
-                messages_query = messages_query.filter(created_at__lt=before_msg.created_at)
-            except Message.DoesNotExist:
-                pass
+        after = request.GET.get('after')
+        around = request.GET.get('around')  # Contexte d'un résultat de recherche
+        limit = max(int(request.GET.get('limit', 30)), 0)
+        
+        messages_query = Message.objects.filter(
+            conversation=conversation, sender__is_active=True
+        ).select_related('sender').prefetch_related('attachments')
+        
+        # Archives froides (core.archive): relues seulement quand le curseur
+        # dépasse la fenêtre chaude de la table Message
+        from . import archive
+        latest_archived = archive.latest_archived_at(conversation.id)
+        
+        def anchor_of(message_id):
+            # Curseur keyset (created_at, id) d'un message de la conversation
+            anchor = Message.objects.filter(
+                conversation=conversation, id=message_id
+            ).values_list('created_at', 'id').first()
+            if anchor is None and latest_archived:
+                anchor = archive.archived_anchor(conversation.id, int(message_id))
+            return anchor
+        
+        def sort_key(msg):
+            return (msg.created_at, msg.id)
+        
+        def older_than(anchor, count):
+            if count <= 0:
+                return []
+            older = messages_query
+            if anchor:
+                created_at, anchor_id = anchor
+                older = older.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=anchor_id)
+                )
+            older = list(reversed(older.order_by('-created_at', '-id')[:count]))
+            if latest_archived and (len(older) < count or older[0].created_at <= latest_archived):
+                older = sorted(older + archive.messages_before(conversation.id, anchor, count), key=sort_key)
+            return older[-count:]
+        
+        def newer_than(anchor, count, inclusive=False):
+            created_at, anchor_id = anchor
+            id_lookup = Q(id__gte=anchor_id) if inclusive else Q(id__gt=anchor_id)
+            newer = list(messages_query.filter(
+                Q(created_at__gt=created_at) | (Q(created_at=created_at) & id_lookup)
+            ).order_by('created_at', 'id')[:count + 1])
+            if latest_archived and created_at <= latest_archived:
+                newer = sorted(newer + archive.messages_after(conversation.id, anchor, count + 1, inclusive), key=sort_key)
+            return newer[:count + 1]
+        
+        from .uploads import serialize_attachment
+        from .reactions import get_user_reactions, summarize_reactions
+        has_more_after = False
+        anchor = anchor_of(around or after or before) if (around or after or before) else None
+        if around and anchor:
+            messages = older_than(anchor, limit // 2)
+            newer = newer_than(anchor, limit - len(messages), inclusive=True)
+            has_more_after = len(newer) > limit - len(messages)
+            messages += newer[:limit - len(messages)]
+        elif after and anchor:
+            messages = newer_than(anchor, limit)
+            has_more_after = len(messages) > limit
+            messages = messages[:limit]
+        elif before and anchor:
+            messages = older_than(anchor, limit)
+        else:
+            messages = older_than(None, limit)  # Plus ancien en premier
         
-        messages = messages_query.filter(sender__is_active=True).order_by('-created_at')[:limit]
-        messages = list(reversed(messages))  # Plus ancien en premier
+        # Réactions: compteurs portés par les messages, "les miennes" en une requête
+        my_reactions = get_user_reactions(
+            request.user, [msg.id for msg in messages if msg.reaction_counts and not getattr(msg, 'is_archived', False)]
+        )
+        for msg in messages:
+            if getattr(msg, 'is_archived', False):
+                my_reactions[msg.id] = {emoji for user_id, emoji in msg.archived_reactions if user_id == request.user.id}
         
         messages_data = []
         for msg in messages:
@@ -4611,6 +4608,10 @@ def api_get_messages(request, conversation_id):
                 'document': msg.document.url if msg.document else None,
                 'document_name': msg.document_name,
                 'document_size': msg.document.size if msg.document else None,
+                'audio': msg.audio.url if msg.audio else None,
+                'audio_duration': msg.audio_duration,
+                'attachments': [serialize_attachment(a) for a in (msg.archived_attachments if getattr(msg, 'is_archived', False) else msg.attachments.all())],
+                'reactions': summarize_reactions(msg.reaction_counts, my_reactions.get(msg.id, ())),
                 'read': msg.read,
                 'delivered': msg.delivered,
                 'created_at': msg.created_at.isoformat(),
@@ -4619,7 +4620,8 @@ def api_get_messages(request, conversation_id):
         
         return JsonResponse({
             'success': True,
-            'messages': messages_data
+            'messages': messages_data,
+            'has_more_after': has_more_after
         })
     except Conversation.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Conversation introuvable'}, status=404)
@@ -4628,6 +4630,37 @@ def api_get_messages(request, conversation_id):
         traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+@login_required
+def api_search_messages(request):
+    """API recherche plein texte dans les conversations de l'utilisateur"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'success': True, 'results': [], 'next_cursor': None})
+    
+    try:
+        from .message_search import search_messages
+        conversation_id = request.GET.get('conversation_id')
+        limit = request.GET.get('limit')
+        cursor = request.GET.get('cursor')
+        results, next_cursor = search_messages(
+            request.user,
+            query,
+            conversation_id=int(conversation_id) if conversation_id else None,
+            limit=int(limit) if limit else None,
+            cursor=int(cursor) if cursor else None,
+        )
+        return JsonResponse({
+            'success': True,
+            'results': results,
+            'next_cursor': next_cursor
+        })
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Paramètres invalides'}, status=400)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
 @login_required
 @login_required
 def api_send_message(request):
@@ -4664,39 +4697,65 @@ def api_send_message(request):
         # Gérer upload audio (message vocal)
         audio_file = request.FILES.get('audio')
         audio_duration = request.POST.get('audio_duration')
-        
-        # Créer message
-        message = Message.objects.create(
-            conversation=conversation,
-            sender=request.user,
-            content=content
+        try:
+            audio_duration = int(audio_duration) if audio_file and audio_duration else None
+        except ValueError:
+            audio_duration = None
+        
+        # Pièces jointes déjà téléversées par morceaux (api_create_upload)
+        from .uploads import (
+            UploadError, get_completed_uploads, build_attachment,
+            build_attachment_from_file, save_attachments, serialize_attachment,
+            discard_attachment_files
         )
+        from .message_search import index_message
+        from .moderation import enqueue_message_moderation
+        attachment_ids = [i.strip() for i in request.POST.get('attachment_ids', '').split(',') if i.strip()]
+        try:
+            uploads = get_completed_uploads(request.user, attachment_ids)
+        except UploadError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+        
+        # Première image / premier fichier sur le message (compatibilité),
+        # les suivants et les téléversements en pièces jointes
+        extra_attachments = [
+            build_attachment_from_file(f, 'image') for f in images[1:]
+        ] + [
+            build_attachment_from_file(f, 'document') for f in files[1:]
+        ] + [
+            build_attachment(upload) for upload in uploads
+        ]
+        for position, attachment in enumerate(extra_attachments):
+            attachment.position = position
         
-        # Upload première image si présente
-        if images:
-            message.image = images[0]
-            message.save()
-        
-        # Upload premier fichier si présent
-        if files:
-            message.document = files[0]
-            message.document_name = files[0].name
-            message.save()
-        
-        # Upload message vocal si présent
-        if audio_file:
-            message.audio = audio_file
-            if audio_duration:
-                try:
-                    message.audio_duration = int(audio_duration)
-                except ValueError:
-                    pass
-            message.save()
-        
-        # Mettre à jour conversation
-        conversation.last_message = message
-        conversation.updated_at = timezone.now()
-        conversation.save()
+        try:
+            with transaction.atomic():
+                # Créer message (une seule écriture, fichiers compris)
+                message = Message.objects.create(
+                    conversation=conversation,
+                    sender=request.user,
+                    content=content,
+                    image=images[0] if images else None,
+                    document=files[0] if files else None,
+                    document_name=files[0].name if files else None,
+                    audio=audio_file,
+                    audio_duration=audio_duration
+                )
+            
+                attachments = []
+                if extra_attachments:
+                    attachments = save_attachments(message, extra_attachments, uploads)
+                index_message(message)
+                # Analyse anti-spam en arrière-plan, après validation de la transaction
+                enqueue_message_moderation(message.id)
+            
+                # Mettre à jour conversation
+                conversation.last_message = message
+                conversation.save(update_fields=['last_message', 'updated_at'])
+        except Exception:
+            # Transaction annulée : les fichiers déjà copiés ne sont plus référencés
+            discard_attachment_files(extra_attachments)
+            raise
         
         return JsonResponse({
             'success': True,
@@ -4717,6 +4776,7 @@ def api_send_message(request):
                 'document_name': message.document_name,
                 'audio': message.audio.url if message.audio else None,
                 'audio_duration': message.audio_duration,
+                'attachments': [serialize_attachment(a) for a in attachments],
                 'read': False,
                 'delivered': False,
                 'created_at': message.created_at.isoformat()
@@ -4730,6 +4790,83 @@ def api_send_message(request):
         print(f"Error in api_send_message: {error_trace}")
         return JsonResponse({'success': False, 'error': f'Erreur serveur: {str(e)}'}, status=500)
 
+@login_required
+@require_POST
+def api_create_upload(request):
+    """API créer un téléversement fractionné de pièce jointe"""
+    from .uploads import UploadError, create_upload, MESSAGE_UPLOAD_CHUNK_MAX_SIZE
+    
+    try:
+        upload = create_upload(
+            request.user,
+            filename=request.POST.get('filename', ''),
+            size=request.POST.get('size'),
+            content_type=request.POST.get('content_type', ''),
+            checksum=request.POST.get('checksum', '')
+        )
+    except UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+    
+    return JsonResponse({
+        'success': True,
+        'upload_id': str(upload.id),
+        'offset': 0,
+        'size': upload.size,
+        'chunk_size': MESSAGE_UPLOAD_CHUNK_MAX_SIZE
+    }, status=201)
+
+@login_required
+def api_upload_chunk(request, upload_id):
+    """
+    API téléversement par morceaux
+    GET/HEAD: offset courant (reprise), PUT: ajoute un morceau à l'offset Upload-Offset
+    """
+    from .models import AttachmentUpload
+    from .uploads import UploadError, append_chunk, current_offset
+    
+    upload = AttachmentUpload.objects.filter(id=upload_id, user=request.user).first()
+    if not upload:
+        return JsonResponse({'success': False, 'error': 'Téléversement introuvable'}, status=404)
+    
+    if request.method in ('GET', 'HEAD'):
+        response = JsonResponse({
+            'success': True,
+            'offset': current_offset(upload),
+            'size': upload.size,
+            'status': upload.status
+        })
+        response['Upload-Offset'] = current_offset(upload)
+        return response
+    
+    if request.method != 'PUT':
+        return JsonResponse({'success': False, 'error': 'Méthode non autorisée'}, status=405)
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'En-têtes Upload-Offset et Content-Length requis'}, status=400)
+    
+    try:
+        # Lecture en flux du corps: le morceau n'est jamais chargé entier en mémoire
+        new_offset = append_chunk(upload, offset, request, length)
+    except UploadError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'offset': current_offset(upload)
+        }, status=e.status)
+    
+    response = JsonResponse({
+        'success': True,
+        'offset': new_offset,
+        'size': upload.size,
+        'status': upload.status,
+        'checksum': upload.checksum if upload.status == 'complete' else None
+    })
+    response['Upload-Offset'] = new_offset
+    return response
+
 @login_required
 def api_mark_conversation_read(request, conversation_id):
     """API marquer conversation comme lue"""
@@ -4741,13 +4878,26 @@ def api_mark_conversation_read(request, conversation_id):
         if request.user not in conversation.participants.all():
             return JsonResponse({'success': False, 'error': 'Accès refusé'}, status=403)
         
-        # Marquer tous les messages non lus comme lus
-        Message.objects.filter(
-            conversation=conversation,
-            read=False
-        ).exclude(sender=request.user).update(read=True)
+        # Marquer comme lus jusqu'au message indiqué (par défaut le dernier reçu)
+        up_to = request.POST.get('up_to')
+        if up_to:
+            try:
+                up_to = int(up_to)
+            except (TypeError, ValueError):
+                return JsonResponse({'success': False, 'error': 'Message invalide'}, status=400)
+            if not Message.objects.filter(conversation=conversation, id=up_to).exists():
+                return JsonResponse({'success': False, 'error': 'Message introuvable dans cette conversation'}, status=400)
+        else:
+            up_to = Message.objects.filter(
+                conversation=conversation
+            ).exclude(sender=request.user).aggregate(max_id=Max('id'))['max_id']
         
-        return JsonResponse({'success': True})
+        updated = 0
+        if up_to:
+            from .receipts import apply_receipts
+            updated = apply_receipts('read', conversation.id, request.user.id, up_to)
+        
+        return JsonResponse({'success': True, 'updated': updated})
     except Conversation.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Conversation introuvable'}, status=404)
     except Exception as e:
@@ -4768,7 +4918,7 @@ def api_mark_all_conversations_read(request):
         Message.objects.filter(
             conversation__in=conversations,
             read=False
-        ).exclude(sender=request.user).update(read=True)
+        ).exclude(sender=request.user).update(read=True, read_at=timezone.now())
         
         return JsonResponse({'success': True, 'message': 'Toutes les conversations ont été marquées comme lues'})
     except Exception as e:
@@ -5010,6 +5160,10 @@ def api_create_conversation(request):
                 sender=request.user,
                 content=initial_message
             )
+            from .message_search import index_message
+            from .moderation import enqueue_message_moderation
+            index_message(message)
+            enqueue_message_moderation(message.id)
             
             # Ajouter les images
             for img_file in images:
@@ -5117,12 +5271,46 @@ def mark_notification_not_interested(request, notification_id):
     return JsonResponse({'error': 'Non implémenté'}, status=501)
 
 def api_get_notifications_realtime(request):
-    """API notifications temps réel"""
-    return JsonResponse({'error': 'Non implémenté'}, status=501)
+    """
+    API notifications temps réel: reprise depuis ?after=<id> (même réponse que la
+    trame WebSocket notifications_sync, pour les clients sans WebSocket)
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Non authentifié'}, status=401)
+    
+    from .notifications import notifications_since
+    after = request.GET.get('after')
+    try:
+        after = int(after) if after not in (None, '') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Paramètre after invalide'}, status=400)
+    
+    return JsonResponse({'success': True, **notifications_since(request.user.id, after)})
 
 def api_get_email_summary(request):
-    """API résumé email"""
-    return JsonResponse({'error': 'Non implémenté'}, status=501)
+    """API résumé email: aperçu du prochain résumé quotidien/hebdomadaire"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Non authentifié'}, status=401)
+    
+    from .digests import user_digest
+    digest = user_digest(request.user)
+    if digest is None:
+        return JsonResponse({
+            'success': True,
+            'frequency': request.user.notification_email_frequency,
+            'count': 0,
+            'subject': None,
+            'body': None,
+        })
+    
+    return JsonResponse({
+        'success': True,
+        'frequency': digest['frequency'],
+        'since': digest['since'].isoformat(),
+        'count': digest['count'],
+        'subject': digest['subject'],
+        'body': digest['body'],
+    })
 
 # ============================================
 # API CONNECT - BAIL
@@ -5200,9 +5388,120 @@ def api_export_history(request, bail_id):
     """API exporter historique"""
     return JsonResponse({'error': 'Non implémenté'}, status=501)
 
+@login_required
 def api_create_reminder(request, bail_id):
-    """API créer rappel"""
-    return JsonResponse({'error': 'Non implémenté'}, status=501)
+    """
+    API créer rappel (envoyé par "manage.py process_reminders").
+
+    Corps JSON: titre, message, date_rappel (ISO 8601), type_rappel, destinataire
+    ('locataire' par défaut, 'proprietaire'), canaux (parmi in_app, push, email,
+    sms; défaut in_app et push), date_echeance, repeter, intervalle_jours,
+    nombre_repetitions.
+    """
+    from django.utils.dateparse import parse_date, parse_datetime
+    from .models import RappelAutomatise
+
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Non authentifié'}, status=401)
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    bail = get_object_or_404(Bail, id=bail_id)
+    if request.user.id not in (bail.proprietaire_id, bail.locataire_id):
+        return JsonResponse({'error': 'Accès refusé'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Objet JSON attendu'}, status=400)
+
+    titre = data.get('titre') or ''
+    message = data.get('message') or ''
+    if not isinstance(titre, str) or not isinstance(message, str):
+        return JsonResponse({'error': 'Le titre et le message doivent être du texte'}, status=400)
+    titre, message = titre.strip(), message.strip()
+    if not titre or not message:
+        return JsonResponse({'error': 'Le titre et le message sont requis'}, status=400)
+    if len(titre) > 200:
+        return JsonResponse({'error': 'Le titre ne peut pas dépasser 200 caractères'}, status=400)
+
+    type_rappel = data.get('type_rappel', 'autre')
+    if not isinstance(type_rappel, str) or type_rappel not in dict(RappelAutomatise.TYPE_RAPPEL_CHOICES):
+        return JsonResponse({'error': 'Type de rappel invalide'}, status=400)
+
+    # parse_datetime/parse_date: None si le format est invalide, ValueError si la
+    # date est impossible (30 février, mois 13)
+    try:
+        date_rappel = parse_datetime(str(data.get('date_rappel') or ''))
+    except ValueError:
+        date_rappel = None
+    if date_rappel is None:
+        return JsonResponse({'error': 'date_rappel invalide (ISO 8601 attendu)'}, status=400)
+    if timezone.is_naive(date_rappel):
+        date_rappel = timezone.make_aware(date_rappel)
+
+    date_echeance = None
+    if data.get('date_echeance'):
+        try:
+            date_echeance = parse_date(str(data['date_echeance']))
+        except ValueError:
+            date_echeance = None
+        if date_echeance is None:
+            return JsonResponse({'error': 'date_echeance invalide'}, status=400)
+
+    destinataire = data.get('destinataire', 'locataire')
+    if destinataire not in ('locataire', 'proprietaire'):
+        return JsonResponse({'error': 'Destinataire invalide'}, status=400)
+
+    canaux = data.get('canaux') or ['in_app', 'push']
+    if (
+        not isinstance(canaux, list)
+        or not all(isinstance(canal, str) for canal in canaux)
+        or not set(canaux) <= set(dict(RappelAutomatise.CANAL_CHOICES))
+    ):
+        return JsonResponse({'error': 'Canaux invalides'}, status=400)
+
+    repeter = bool(data.get('repeter'))
+    try:
+        intervalle_jours = int(data.get('intervalle_jours') or 0)
+        nombre_repetitions = int(data.get('nombre_repetitions') or 0)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Répétition invalide'}, status=400)
+    if repeter and not (1 <= intervalle_jours <= 365 and 1 <= nombre_repetitions <= 52):
+        return JsonResponse({
+            'error': 'Un rappel répété demande un intervalle (1 à 365 jours) et 1 à 52 répétitions'
+        }, status=400)
+
+    rappel = RappelAutomatise.objects.create(
+        bail=bail,
+        destinataire_id=bail.locataire_id if destinataire == 'locataire' else bail.proprietaire_id,
+        type_rappel=type_rappel,
+        titre=titre,
+        message=message,
+        envoyer_email='email' in canaux,
+        envoyer_sms='sms' in canaux,
+        envoyer_push='push' in canaux,
+        envoyer_in_app='in_app' in canaux,
+        date_rappel=date_rappel,
+        date_echeance=date_echeance,
+        repeter=repeter,
+        intervalle_jours=intervalle_jours if repeter else 0,
+        nombre_repetitions=nombre_repetitions if repeter else 0,
+    )
+
+    return JsonResponse({
+        'success': True,
+        'reminder': {
+            'id': rappel.id,
+            'titre': rappel.titre,
+            'date_rappel': rappel.date_rappel.isoformat(),
+            'canaux': canaux,
+            'repeter': rappel.repeter,
+        }
+    }, status=201)
 
 def api_delete_reminder(request, reminder_id):
     """API supprimer rappel"""
@@ -5216,21 +5515,67 @@ def republish_property(request, bail_id):
     """Republier propriété"""
     return JsonResponse({'error': 'Non implémenté'}, status=501)
 
+@login_required
 def generate_quittance(request, paiement_id):
-    """Générer quittance"""
-    return JsonResponse({'error': 'Non implémenté'}, status=501)
+    """Quittance PDF d'un paiement réglé (bailleur ou locataire du bail)"""
+    from .documents import quittance_pdf
+    
+    paiement = get_object_or_404(PaiementLoyer.objects.select_related('bail'), id=paiement_id)
+    if request.user.id not in (paiement.bail.proprietaire_id, paiement.locataire_id):
+        return JsonResponse({'error': 'Accès refusé'}, status=403)
+    if paiement.statut != 'paye':
+        return JsonResponse({'error': 'Quittance disponible une fois le loyer payé'}, status=400)
+    
+    filename, pdf = quittance_pdf(paiement.id)
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 def send_payment_reminder(request, paiement_id):
     """Envoyer rappel paiement"""
     return JsonResponse({'error': 'Non implémenté'}, status=501)
 
+@login_required
 def generate_bulk_quittances(request):
-    """Générer quittances en lot"""
-    return JsonResponse({'error': 'Non implémenté'}, status=501)
+    """
+    Quittances des paiements réglés du bailleur, en archive zip envoyée en flux.
+    
+    Paramètres GET: mois (AAAA-MM, défaut: mois en cours), bail (optionnel).
+    """
+    from django.http import StreamingHttpResponse
+    from .documents import iter_quittances, quittance_queryset, stream_zip
+    from .leases import month_bounds
+    
+    mois = request.GET.get('mois') or timezone.localdate().strftime('%Y-%m')
+    try:
+        first, last = month_bounds(datetime.strptime(mois, '%Y-%m').date())
+    except ValueError:
+        return JsonResponse({'error': 'Mois invalide (format attendu: AAAA-MM)'}, status=400)
+    
+    filters = {'bail__proprietaire': request.user, 'date_echeance__range': (first, last)}
+    if request.GET.get('bail'):
+        if not request.GET['bail'].isdigit():
+            return JsonResponse({'error': 'Bail invalide'}, status=400)
+        filters['bail_id'] = int(request.GET['bail'])
+    queryset = quittance_queryset(**filters)
+    if not queryset.exists():
+        return JsonResponse({'error': 'Aucun paiement réglé sur cette période'}, status=404)
+    
+    response = StreamingHttpResponse(stream_zip(iter_quittances(queryset)), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="quittances-{mois}.zip"'
+    return response
 
+@login_required
 def generate_fiscal_summary(request, annee):
-    """Générer résumé fiscal"""
-    return JsonResponse({'error': 'Non implémenté'}, status=501)
+    """Récapitulatif PDF des loyers encaissés dans l'année (revenus fonciers)"""
+    from .documents import fiscal_summary_pdf
+    
+    if not 2000 <= annee <= timezone.localdate().year:
+        return JsonResponse({'error': 'Année invalide'}, status=400)
+    
+    response = HttpResponse(fiscal_summary_pdf(request.user, annee), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="recapitulatif-loyers-{annee}.pdf"'
+    return response
 
 def mark_payment_paid(request):
     """Marquer paiement payé"""